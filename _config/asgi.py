@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "_config.settings")
 
 application = get_asgi_application()
+
+# Evict this worker's cached reference data when another process changes it.
+from _config.invalidation import start_listener  # noqa: E402
+
+start_listener()
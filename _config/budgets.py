@@ -0,0 +1,97 @@
+# _config/budgets.py
+"""
+Query and latency budgets for performance regression tests.
+
+    class OrderAdminPerformanceTests(BudgetTestMixin, TestCase):
+        def test_changelist(self):
+            self.assertWithinBudget("admin.order.changelist", self.client.get, url)
+
+``assertWithinBudget`` runs the code once to warm caches, then
+``BUDGET_RUNS`` more times, and compares the queries of the last run and
+the median duration with the entry of that name in ``PERF_BASELINE_FILE``.
+The test fails when the code runs more queries than the baseline, or
+takes longer than the baseline times (1 + ``PERF_TOLERANCE``) plus
+``PERF_TOLERANCE_MS``. Setting ``PERF_TOLERANCE=inf`` checks query counts
+only, e.g. on shared CI machines.
+
+``PERF_UPDATE_BASELINE=1 manage.py test`` records the measurements as the
+new baseline instead; commit the file with the change that moved them.
+"""
+
+import json
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from _config.profiling import INSTRUMENTATION_FILES
+
+BUDGET_RUNS = 5
+
+INSTRUMENTATION_FILES.add(__file__)
+
+_baseline_lock = threading.Lock()
+
+
+def load_baseline():
+    try:
+        return json.loads(settings.PERF_BASELINE_FILE.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def record_baseline(name, queries, ms):
+    with _baseline_lock:
+        baseline = load_baseline()
+        baseline[name] = {"queries": queries, "ms": round(ms, 2)}
+        settings.PERF_BASELINE_FILE.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n"
+        )
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, *args, **kwargs):
+    """Queries run and seconds taken by one ``func(*args, **kwargs)`` call."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        duration = time.perf_counter() - start
+    return counter.count, duration
+
+
+class BudgetTestMixin:
+    def assertWithinBudget(self, name, func, *args, **kwargs):
+        """Fail if ``func(*args, **kwargs)`` exceeds the ``name`` baseline."""
+        measure(func, *args, **kwargs)  # warm caches and lazy imports
+        runs = [measure(func, *args, **kwargs) for _ in range(BUDGET_RUNS)]
+        queries = runs[-1][0]
+        ms = statistics.median(duration for _, duration in runs) * 1000
+
+        if settings.PERF_UPDATE_BASELINE:
+            record_baseline(name, queries, ms)
+            return
+        budget = load_baseline().get(name)
+        if budget is None:
+            self.fail(
+                f"No baseline for {name!r} in {settings.PERF_BASELINE_FILE}; "
+                "record one with PERF_UPDATE_BASELINE=1"
+            )
+        self.assertLessEqual(
+            queries, budget["queries"], f"{name}: {queries} queries, budget {budget}"
+        )
+        limit = budget["ms"] * (1 + settings.PERF_TOLERANCE) + settings.PERF_TOLERANCE_MS
+        self.assertLessEqual(ms, limit, f"{name}: {ms:.1f} ms, budget {limit:.1f} ms")
@@ -1,4 +1,150 @@
-from django.db import models
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from _config.invalidation import invalidate, invalidate_deleted, invalidate_rows
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+def _pks(objs):
+    """The primary keys of ``objs``, or None if any is unknown."""
+    pks = [obj.pk for obj in objs]
+    return None if None in pks else pks
+
+
+class TimeStampedQuerySet(models.QuerySet):
+    # Writes that send no post_save signal invalidate the rows they wrote,
+    # or the whole model where those are unknown.
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            invalidate(self.model, using=self.db)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            invalidate_rows(self.model, _pks(objs), using=self.db)
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, batch_size)
+        if rows:
+            invalidate_rows(self.model, _pks(objs), using=self.db)
+        return rows
+
+    def delete(self):
+        deleted, per_model = super().delete()
+        invalidate_deleted(per_model, using=self.db)
+        return deleted, per_model
+
+    def bulk_upsert(self, objs, unique_fields, update_fields=None, batch_size=1000):
+        """
+        Insert ``objs``, or update the existing row with the same
+        ``unique_fields``, with one INSERT ... ON CONFLICT DO UPDATE per batch.
+        ``update_fields`` defaults to every other column; rows whose values
+        are unchanged are left alone. New rows get created_at and updated_at
+        set to the same timestamp, changed rows only updated_at, and the
+        objects of both get the stored values. Of several objects with the
+        same ``unique_fields``, only the last is written.
+
+        Returns ``(inserted, updated)``. Like bulk_create(), save() and
+        signals are skipped, and primary keys the database assigns are not
+        set on the objects; without them, cached rows of the model are
+        invalidated as a whole.
+        """
+        opts = self.model._meta
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        unique = [opts.get_field(name) for name in unique_fields]
+        if update_fields is None:
+            update = [
+                f
+                for f in opts.concrete_fields
+                if not f.primary_key and f not in unique and f.name not in TIMESTAMP_FIELDS
+            ]
+        else:
+            update = [
+                opts.get_field(name) for name in update_fields if name not in TIMESTAMP_FIELDS
+            ]
+        changed = " OR ".join(
+            f"{table}.{qn(f.column)} IS DISTINCT FROM EXCLUDED.{qn(f.column)}" for f in update
+        )
+        if update:
+            assignments = ", ".join(
+                f"{qn(f.column)} = EXCLUDED.{qn(f.column)}"
+                for f in [*update, opts.get_field("updated_at")]
+            )
+            action = f"DO UPDATE SET {assignments} WHERE {changed}"
+        else:
+            action = "DO NOTHING"
+        conflict = ", ".join(qn(f.column) for f in unique)
+
+        def key(obj):
+            return tuple(f.to_python(getattr(obj, f.attname)) for f in unique)
+
+        # One statement cannot update a row twice. Of objects with the same
+        # key, keep the last, as saving them one after another would; keys
+        # with NULLs never conflict.
+        keys = [key(obj) for obj in objs]
+        last = {k: obj for k, obj in zip(keys, objs) if None not in k}
+        objs = [obj for k, obj in zip(keys, objs) if last.get(k, obj) is obj]
+
+        # Objects without a primary key leave it to the column default.
+        with_pk = [obj for obj in objs if obj.pk is not None]
+        without_pk = [obj for obj in objs if obj.pk is None]
+        timestamps = [opts.get_field(name) for name in TIMESTAMP_FIELDS]
+        returning = ", ".join(f"{table}.{qn(f.column)}" for f in [*unique, timestamps[0]])
+        inserted = updated = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            for group in (with_pk, without_pk):
+                fields = [f for f in opts.concrete_fields if group is with_pk or f != opts.pk]
+                columns = ", ".join(qn(f.column) for f in fields)
+                row = f"({', '.join(['%s'] * len(fields))})"
+                for start in range(0, len(group), batch_size):
+                    batch = group[start : start + batch_size]
+                    # Rows inserted by this statement are the ones that return
+                    # this exact created_at; updates keep the stored value.
+                    # (xmax = 0 cannot be used on partitioned tables.)
+                    now = timezone.now()
+                    params = []
+                    for obj in batch:
+                        params.extend(
+                            f.get_db_prep_save(
+                                now if f in timestamps else getattr(obj, f.attname),
+                                connection,
+                            )
+                            for f in fields
+                        )
+                    params.append(timestamps[0].get_db_prep_save(now, connection))
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f"INSERT INTO {table} ({columns}) VALUES "
+                            f"{', '.join([row] * len(batch))} "
+                            f"ON CONFLICT ({conflict}) {action} "
+                            f"RETURNING {returning}, {table}.{qn('created_at')} = %s",
+                            params,
+                        )
+                        rows = cursor.fetchall()
+                    # Unchanged rows return nothing and keep their timestamps.
+                    by_key = {key(obj): obj for obj in batch}
+                    for *values, created_at, is_new in rows:
+                        if is_new:
+                            inserted += 1
+                        else:
+                            updated += 1
+                        obj = by_key.get(
+                            tuple(f.to_python(value) for f, value in zip(unique, values))
+                        )
+                        if obj is not None:
+                            obj.created_at, obj.updated_at = created_at, now
+            if inserted or updated:
+                invalidate_rows(self.model, _pks(objs), using=self.db)
+        return inserted, updated
 
 
 class TimeStampedModel(models.Model):
@@ -10,5 +156,26 @@ class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True, blank=True, null=True)
 
+    objects = TimeStampedQuerySet.as_manager()
+
     class Meta:
         abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        pk = self.pk
+        deleted, per_model = super().delete(using, keep_parents)
+        invalidate_deleted(per_model, using=using, model=type(self), pk=pk)
+        return deleted, per_model
+
+
+def timestamp_brin_indexes(prefix):
+    """
+    BRIN indexes on created_at/updated_at for append-mostly tables, where
+    both columns correlate with physical row order. ``prefix`` keeps the
+    index names unique (Django limits them to 30 characters).
+    """
+    return [
+        BrinIndex(fields=["created_at"], name=f"{prefix}_created_brin"),
+        BrinIndex(fields=["updated_at"], name=f"{prefix}_updated_brin"),
+    ]
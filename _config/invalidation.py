@@ -0,0 +1,233 @@
+# _config/invalidation.py
+"""
+Cross-process invalidation of in-process caches.
+
+Caches register an eviction callback per model with ``subscribe()``, or
+for every model with ``subscribe_all()``. Every save of a model in the
+connected apps, and every delete or bulk write through TimeStampedQuerySet,
+then calls ``invalidate()``, which evicts the rows in this process at once
+and again when the transaction commits.
+
+Only changes to models listed in ``settings.CACHED_MODELS``, or with a
+subscriber in this process, are sent to other processes, unless the
+_config.query_cache backend lives in each process's memory: its results
+may read any table, so then every change is sent. Each committed
+transaction sends one PostgreSQL NOTIFY on ``CHANNEL`` naming every such
+row it changed, from ``on_commit``. Other processes never hear about
+rolled-back changes, and transactions that change no cached model (orders,
+stock) send nothing. Each web worker runs a ``Listener`` thread (started
+from wsgi.py/asgi.py) on a dedicated connection that receives the
+notifications and evicts its own copies.
+
+Deletes are not hooked with post_delete: a receiver would stop Django from
+deleting querysets with a single DELETE. Raw SQL must call
+``invalidate(model)`` itself.
+If the listener loses its connection, notifications sent meanwhile are
+lost, so every cache is cleared when it reconnects; so are those of a
+process that dies between a commit and its NOTIFY.
+"""
+
+import json
+import logging
+import os
+import threading
+import weakref
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "model_invalidation"
+RECONNECT_DELAY = 5.0
+# Beyond this many rows of a model, a notification names the whole model.
+MAX_NOTIFIED_PKS = 100
+# PostgreSQL limits NOTIFY payloads to 8000 bytes.
+MAX_PAYLOAD = 7500
+# Cache backends whose entries other processes cannot see or invalidate.
+PER_PROCESS_BACKENDS = {"django.core.cache.backends.locmem.LocMemCache"}
+
+# model label ("northwind.category") -> callbacks taking a pk, or None for all rows
+_handlers = defaultdict(list)
+# callbacks taking a model label and a pk, for every model
+_global_handlers = []
+_listener = None
+# connection -> {label: set of pks, or None for all rows} to send on commit
+_pending = weakref.WeakKeyDictionary()
+
+
+def subscribe(model, handler):
+    """Call ``handler(pk)`` whenever a ``model`` row changes; pk is None for any row."""
+    _handlers[model._meta.label_lower].append(handler)
+
+
+def unsubscribe(model, handler):
+    _handlers[model._meta.label_lower].remove(handler)
+
+
+def subscribe_all(handler):
+    """Call ``handler(label, pk)`` whenever any row changes; pk is None for any row."""
+    _global_handlers.append(handler)
+
+
+def unsubscribe_all(handler):
+    _global_handlers.remove(handler)
+
+
+def evict(label, pks=None):
+    """Evict rows ``pks`` of model ``label`` (every row if None) in this process."""
+    for handler in _handlers.get(label, ()):
+        for pk in [None] if pks is None else pks:
+            handler(pk)
+    for handler in _global_handlers:
+        handler(label, pks[0] if pks is not None and len(pks) == 1 else None)
+
+
+def evict_all():
+    for label in list(_handlers):
+        evict(label)
+    for handler in _global_handlers:
+        handler(None, None)
+
+
+def is_broadcast(label):
+    """Whether other processes may cache rows of model ``label``."""
+    if label in settings.CACHED_MODELS or _handlers.get(label):
+        return True
+    backend = settings.CACHES[settings.QUERY_CACHE_ALIAS]["BACKEND"]
+    return backend in PER_PROCESS_BACKENDS
+
+
+def invalidate(model, pk=None, using="default"):
+    """
+    Evict ``model`` row ``pk`` (every row if None) from in-process caches
+    here and, once the current transaction commits, everywhere.
+    """
+    invalidate_rows(model, None if pk is None else [pk], using)
+
+
+def invalidate_rows(model, pks=None, using="default"):
+    """invalidate() for rows ``pks`` of ``model``, or every row if None."""
+    label = model._meta.label_lower
+    pks = None if pks is None else list(pks)
+    # Evict now so this transaction reads its own write, and again after
+    # commit in case another thread cached the old row in between.
+    evict(label, pks)
+    connection = connections[using]
+    if not connection.run_on_commit:
+        # Nothing waits for a commit, so rows still pending were rolled back.
+        _pending.pop(connection, None)
+    pending = _pending.setdefault(connection, {})
+    if pks is None or pending.get(label, ()) is None:
+        pending[label] = None
+    else:
+        pending.setdefault(label, set()).update(pks)
+        if len(pending[label]) > MAX_NOTIFIED_PKS:
+            pending[label] = None
+    # Every write registers the flush, as a rolled-back savepoint discards
+    # its own; the first to run after commit sends everything.
+    transaction.on_commit(lambda: _flush(connection), using=using)
+
+
+def _flush(connection):
+    pending = _pending.pop(connection, None)
+    if not pending:
+        return
+    message = {}
+    for label, pks in pending.items():
+        pks = None if pks is None else sorted(pks)
+        evict(label, pks)
+        if is_broadcast(label):
+            message[label] = pks
+    if not message or connection.vendor != "postgresql":
+        return
+    payload = json.dumps(message, default=str)
+    if len(payload) > MAX_PAYLOAD:
+        payload = json.dumps(dict.fromkeys(message))
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+def invalidate_deleted(deleted, using="default", model=None, pk=None):
+    """
+    Invalidate after a delete, given the ``{label: count}`` that delete()
+    returns: row ``pk`` of ``model`` when a single instance was deleted, and
+    every other model with deleted rows (cascades) as a whole.
+    """
+    for label, count in deleted.items():
+        deleted_model = apps.get_model(label)
+        if deleted_model is model and pk is not None:
+            invalidate(model, pk, using=using)
+        elif count:
+            invalidate(deleted_model, using=using)
+
+
+def _saved(sender, instance, using, **kwargs):
+    invalidate(sender, instance.pk, using=using)
+
+
+def connect_signals(app_config):
+    """Invalidate on every save of ``app_config``'s models."""
+    for model in app_config.get_models():
+        post_save.connect(
+            _saved, sender=model, dispatch_uid=f"invalidation:{model._meta.label_lower}"
+        )
+
+
+class Listener(threading.Thread):
+    """Evicts cache entries named by notifications from other processes."""
+
+    def __init__(self, using="default", timeout=5.0):
+        super().__init__(name="cache-invalidation", daemon=True)
+        self.using = using
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.listen()
+            except Exception:
+                logger.exception("Cache invalidation listener failed; reconnecting.")
+            self.stopped.wait(RECONNECT_DELAY)
+
+    def listen(self):
+        wrapper = connections[self.using]
+        params = {**wrapper.get_connection_params(), "autocommit": True}
+        with wrapper.Database.connect(**params) as conn:
+            conn.execute(f"LISTEN {CHANNEL}")
+            # Changes made before LISTEN took effect were never heard.
+            evict_all()
+            while not self.stopped.is_set():
+                for notify in conn.notifies(timeout=self.timeout):
+                    self.dispatch(notify.payload)
+
+    def dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+            for label, pks in message.items():
+                evict(label, pks)
+        except (ValueError, AttributeError, TypeError):
+            logger.warning("Ignoring malformed invalidation message %r", payload)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_listener(using="default"):
+    """
+    Start this process's listener, once. Safe to call again after a fork
+    (e.g. gunicorn --preload calling it from post_fork): threads do not
+    survive fork, so the child starts its own.
+    """
+    global _listener
+    if connections[using].vendor != "postgresql":
+        return None
+    if _listener is None or _listener.pid != os.getpid() or not _listener.is_alive():
+        _listener = Listener(using)
+        _listener.start()
+    return _listener
@@ -0,0 +1,449 @@
+# _config/loadtest.py
+"""
+HTTP load testing without external tools.
+
+A scenario is a list of steps that each virtual user repeats until the
+run ends, after running the scenario's "setup" steps once (unmeasured):
+
+    {
+      "setup": [{"method": "POST", "path": "/user_accounts/login/",
+                 "data": {"username": "{email}", "password": "{password}"},
+                 "expect": 302}],
+      "steps": [{"name": "orders", "method": "GET",
+                 "path": "/admin/northwind/order/"}]
+    }
+
+Steps may send form ``data`` or a ``json`` body. A step fails when the
+response status is not ``expect``, or is 400 or more if it has no
+``expect``; a failed setup step aborts the run with ``SetupFailed``.
+``{email}``, ``{password}`` and other run variables are filled into paths
+and data. ``SCENARIOS`` holds the built-in scenarios, and JSON files in
+the same format can add more.
+
+Virtual users keep their own cookies and send the CSRF token back as
+Django expects. They reach the app through one of three transports:
+``WSGITransport`` calls the WSGI application in this process (one thread
+per user), ``ASGITransport`` the ASGI application (one task per user),
+and ``HTTPTransport`` a running server over keep-alive connections.
+"""
+
+import asyncio
+import gc
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from io import BytesIO, StringIO
+from urllib.parse import urlencode, urlsplit
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+LOGIN = {
+    "name": "login",
+    "method": "POST",
+    "path": "/user_accounts/login/",
+    "data": {"username": "{email}", "password": "{password}"},
+    "expect": 302,
+}
+LOGIN_PAGE = {"name": "login page", "method": "GET", "path": "/user_accounts/login/"}
+
+SCENARIOS = {
+    "login": {
+        "steps": [
+            LOGIN_PAGE,
+            LOGIN,
+            {
+                "name": "logout",
+                "method": "POST",
+                "path": "/user_accounts/logout/",
+                "expect": 302,
+            },
+        ],
+    },
+    "admin_orders": {
+        "setup": [LOGIN_PAGE, LOGIN],
+        "steps": [
+            # Without a login, the admin redirects to its login page.
+            {
+                "name": "order list",
+                "method": "GET",
+                "path": "/admin/northwind/order/",
+                "expect": 200,
+            },
+            {
+                "name": "order list, page 2",
+                "method": "GET",
+                "path": "/admin/northwind/order/?p=2",
+                "expect": 200,
+            },
+        ],
+    },
+}
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS", "TRACE"}
+
+
+class SetupFailed(Exception):
+    """A setup step failed, so the measured steps would not test what they should."""
+
+    def __init__(self, step, status):
+        self.step = step
+        self.status = status
+        expected = step.get("expect", "below 400")
+        super().__init__(
+            f"Setup step {step.get('name', step['path'])!r} got status {status}, "
+            f"expected {expected}"
+        )
+
+
+def load_scenario(name_or_path):
+    """A built-in scenario by name, or one read from a JSON file."""
+    if name_or_path in SCENARIOS:
+        return SCENARIOS[name_or_path]
+    with open(name_or_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fill(value, variables):
+    if isinstance(value, str):
+        return value.format_map(variables)
+    if isinstance(value, dict):
+        return {key: _fill(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, variables) for item in value]
+    return value
+
+
+class VirtualUser:
+    """Cookies and request encoding of one simulated client."""
+
+    def __init__(self, host, variables):
+        self.host = host
+        self.variables = variables
+        self.cookies = SimpleCookie()
+
+    def prepare(self, step):
+        """(method, path, body, headers) of ``step``."""
+        method = step.get("method", "GET").upper()
+        path = _fill(step["path"], self.variables)
+        headers = {"Host": self.host}
+        body = b""
+        if "json" in step:
+            body = json.dumps(_fill(step["json"], self.variables)).encode()
+            headers["Content-Type"] = "application/json"
+        elif "data" in step:
+            body = urlencode(_fill(step["data"], self.variables)).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(
+                f"{name}={morsel.value}" for name, morsel in self.cookies.items()
+            )
+        if method not in SAFE_METHODS and "csrftoken" in self.cookies:
+            headers["X-CSRFToken"] = self.cookies["csrftoken"].value
+        headers["Content-Length"] = str(len(body))
+        return method, path, body, headers
+
+    def receive(self, headers):
+        for name, value in headers:
+            if name.lower() != "set-cookie":
+                continue
+            cookie = SimpleCookie(value)
+            for key, morsel in cookie.items():
+                if morsel["max-age"] == "0" or not morsel.value:
+                    self.cookies.pop(key, None)
+                else:
+                    self.cookies[key] = morsel.value
+
+
+class WSGITransport:
+    def __init__(self, application=None):
+        self.application = application or get_wsgi_application()
+
+    def send(self, method, path, body, headers):
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SCRIPT_NAME": "",
+            "SERVER_NAME": headers["Host"],
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(body),
+            "wsgi.errors": StringIO(),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = f"HTTP_{key}"
+            environ[key] = value
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started.update(status=int(status.split()[0]), headers=response_headers)
+
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        return started["status"], started["headers"]
+
+    def close(self):
+        connections.close_all()
+
+
+class ASGITransport:
+    def __init__(self, application=None):
+        self.application = application or get_asgi_application()
+
+    async def send(self, method, path, body, headers):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "server": (headers["Host"], 80),
+            "client": ("127.0.0.1", 0),
+        }
+        done = asyncio.Event()
+        requested = False
+        response = {}
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()  # the client stays connected until the response ends
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (k.decode("latin-1"), v.decode("latin-1")) for k, v in message["headers"]
+                ]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                done.set()
+
+        await self.application(scope, receive, send)
+        done.set()
+        return response["status"], response["headers"]
+
+
+class HTTPTransport:
+    """Keep-alive connection of one virtual user to a running server."""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.connection = None
+
+    def send(self, method, path, body, headers):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, self.prefix + path, body, headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, response.getheaders()
+            except (ConnectionError, OSError):
+                # A keep-alive connection the server closed: retry once on a new one.
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Results:
+    def __init__(self):
+        self.samples = []  # (step name, seconds, ok)
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds, ok):
+        with self.lock:
+            self.samples.append((name, seconds, ok))
+
+
+def _ok(step, status):
+    if status is None:  # the request raised
+        return False
+    return status == step["expect"] if "expect" in step else status < 400
+
+
+def _check_setup(step, status):
+    if not _ok(step, status):
+        raise SetupFailed(step, status)
+
+
+def _run_user(user, transport, scenario, deadline, iterations, results):
+    try:
+        for step in scenario.get("setup", []):
+            status, headers = transport.send(*user.prepare(step))
+            _check_setup(step, status)
+            user.receive(headers)
+        done = 0
+        while time.monotonic() < deadline and (iterations is None or done < iterations):
+            for step in scenario["steps"]:
+                start = time.perf_counter()
+                try:
+                    status, headers = transport.send(*user.prepare(step))
+                except Exception:
+                    status, headers = None, []
+                elapsed = time.perf_counter() - start
+                results.add(step.get("name", step["path"]), elapsed, _ok(step, status))
+                user.receive(headers)
+            done += 1
+    finally:
+        transport.close()
+
+
+async def _run_async_user(user, transport, scenario, deadline, iterations, results):
+    for step in scenario.get("setup", []):
+        status, headers = await transport.send(*user.prepare(step))
+        _check_setup(step, status)
+        user.receive(headers)
+    done = 0
+    while time.monotonic() < deadline and (iterations is None or done < iterations):
+        for step in scenario["steps"]:
+            start = time.perf_counter()
+            try:
+                status, headers = await transport.send(*user.prepare(step))
+            except Exception:
+                status, headers = None, []
+            elapsed = time.perf_counter() - start
+            results.add(step.get("name", step["path"]), elapsed, _ok(step, status))
+            user.receive(headers)
+        done += 1
+
+
+def _latency(seconds):
+    ms = sorted(s * 1000 for s in seconds)
+    if not ms:
+        return {}
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "p50": round(cuts[49], 2),
+        "p95": round(cuts[94], 2),
+        "p99": round(cuts[98], 2),
+        "max": round(ms[-1], 2),
+    }
+
+
+def run(
+    scenario,
+    interface="wsgi",
+    url=None,
+    concurrency=10,
+    duration=10.0,
+    iterations=None,
+    host="localhost",
+    variables=None,
+):
+    """
+    Run ``scenario`` with ``concurrency`` users and return the report dict.
+    Raises SetupFailed if a user's setup step fails.
+    """
+    variables = variables or {}
+    if interface == "http":
+        host = urlsplit(url).netloc
+    results = Results()
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    if interface == "asgi":
+        transport = ASGITransport()
+
+        async def main():
+            await asyncio.gather(
+                *(
+                    _run_async_user(
+                        VirtualUser(host, variables),
+                        transport,
+                        scenario,
+                        deadline,
+                        iterations,
+                        results,
+                    )
+                    for _ in range(concurrency)
+                )
+            )
+
+        asyncio.run(main())
+        # Connections left in finished request contexts close only once
+        # garbage collected; don't hold them past the run.
+        gc.collect()
+    else:
+        application = get_wsgi_application() if interface == "wsgi" else None
+
+        def transport():
+            return HTTPTransport(url) if interface == "http" else WSGITransport(application)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            futures = [
+                pool.submit(
+                    _run_user,
+                    VirtualUser(host, variables),
+                    transport(),
+                    scenario,
+                    deadline,
+                    iterations,
+                    results,
+                )
+                for _ in range(concurrency)
+            ]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - started
+
+    samples = results.samples
+    errors = sum(1 for *_, ok in samples if not ok)
+    steps = {}
+    for name in dict.fromkeys(name for name, *_ in samples):
+        own = [(seconds, ok) for step, seconds, ok in samples if step == name]
+        steps[name] = {
+            "requests": len(own),
+            "errors": sum(1 for _, ok in own if not ok),
+            "latency_ms": _latency(seconds for seconds, _ in own),
+        }
+    return {
+        "interface": interface,
+        "target": url if interface == "http" else "in-process",
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _latency(seconds for _, seconds, _ in samples),
+        "steps": steps,
+    }
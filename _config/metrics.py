@@ -0,0 +1,223 @@
+# _config/metrics.py
+"""
+Prometheus metrics, served at /metrics.
+
+``MetricsMiddleware`` counts requests and their latency per URL name,
+and the queries and database time they spend per database. The query
+cache and the reference caches count hits and misses, and the populate_*
+import commands report rows processed, errors and rows per second
+through ``import_job()``. Pool gauges come from _config.pooling.
+
+Under several worker processes (gunicorn, uvicorn workers), export
+``PROMETHEUS_MULTIPROC_DIR`` as an empty directory before they start,
+for the web workers and the import commands alike: every process then
+writes its metrics there and /metrics adds them up, so a scrape sees all
+workers whichever one answers it. Call
+``prometheus_client.multiprocess.mark_process_dead(pid)`` from the
+server's child-exit hook (gunicorn: ``child_exit``) so the pool gauges of
+a dead worker are dropped.
+
+Each request costs two counter updates, one histogram observation and
+one counter update per database it queried; queries are tallied in plain
+integers and added at the end of the request.
+"""
+
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from _config.pooling import all_pool_stats
+from _config.profiling import INSTRUMENTATION_FILES
+from _config.tracing import span, trace
+
+# MetricsMiddleware's execute wrapper is the outermost one of every request.
+INSTRUMENTATION_FILES.add(__file__)
+
+REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by URL name, method and status",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by URL name",
+    ["view"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter("db_queries", "Queries run by web requests", ["database"])
+DB_TIME = Counter("db_query_seconds", "Time web requests spent in queries", ["database"])
+CACHE_REQUESTS = Counter(
+    "cache_requests", "Cache lookups by cache and outcome (hit, miss)", ["cache", "outcome"]
+)
+POOL = Gauge(
+    "db_pool",
+    "Connection pool state of live workers (_config.pooling.pool_stats)",
+    ["database", "stat"],
+    multiprocess_mode="livesum",
+)
+IMPORT_ROWS = Counter("import_rows", "Rows read by import commands", ["command"])
+IMPORT_ERRORS = Counter(
+    "import_errors", "Rows import commands skipped, by error", ["command", "error"]
+)
+IMPORT_RUNS = Counter("import_runs", "Import command runs by outcome", ["command", "outcome"])
+IMPORT_RATE = Gauge(
+    "import_rows_per_second",
+    "Rows per second of the latest run of each import command",
+    ["command"],
+    multiprocess_mode="mostrecent",
+)
+
+POOL_REFRESH_SECONDS = 1.0
+IMPORT_FLUSH_SECONDS = 1.0
+_pool_refreshed = 0.0
+
+
+def refresh_pool_gauges():
+    """Copy this process's pool stats into POOL, at most once a second."""
+    global _pool_refreshed
+    now = time.monotonic()
+    if now - _pool_refreshed < POOL_REFRESH_SECONDS:
+        return
+    _pool_refreshed = now
+    for alias, stats in all_pool_stats().items():
+        for stat, value in stats.items():
+            POOL.labels(alias, stat).set(value)
+
+
+class _QueryTally:
+    def __init__(self):
+        self.counts = {}  # alias -> [queries, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            tally = self.counts.setdefault(context["connection"].alias, [0, 0.0])
+            tally[0] += 1
+            tally[1] += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Keep first in MIDDLEWARE, so latency covers the whole stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tally = _QueryTally()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tally))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        # URL names, not paths, keep the number of series bounded.
+        view = (match.view_name or "<unnamed>") if match else "<unresolved>"
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        REQUEST_LATENCY.labels(view).observe(elapsed)
+        for alias, (queries, seconds) in tally.counts.items():
+            DB_QUERIES.labels(alias).inc(queries)
+            DB_TIME.labels(alias).inc(seconds)
+        refresh_pool_gauges()
+        return response
+
+
+class ImportJob:
+    """Progress of one import command run; see import_job()."""
+
+    def __init__(self, command):
+        self.command = command
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._unflushed = 0
+        self._flushed_at = self.started
+
+    def rows_from(self, reader):
+        """Yield ``reader``'s rows, counting each as processed."""
+        for row in reader:
+            self.row()
+            yield row
+
+    def row(self, count=1):
+        self.rows += count
+        self._unflushed += count
+        now = time.perf_counter()
+        if now - self._flushed_at >= IMPORT_FLUSH_SECONDS:
+            self.flush(now)
+
+    def batch(self, rows):
+        """A tracing span around writing one batch of ``rows`` rows."""
+        return span(
+            "import batch", attributes={"import.command": self.command, "import.rows": rows}
+        )
+
+    def error(self, error):
+        """Count a skipped row; ``error`` is an exception or a short reason."""
+        kind = error if isinstance(error, str) else type(error).__name__
+        IMPORT_ERRORS.labels(self.command, kind).inc()
+
+    def flush(self, now=None):
+        now = now or time.perf_counter()
+        IMPORT_ROWS.labels(self.command).inc(self._unflushed)
+        self._unflushed = 0
+        self._flushed_at = now
+        elapsed = now - self.started
+        if elapsed > 0:
+            IMPORT_RATE.labels(self.command).set(self.rows / elapsed)
+
+
+@contextmanager
+def import_job(command):
+    """
+    Report an import command's progress while it runs, and trace the run
+    (sampled at TRACE_SAMPLE_RATE, see _config.tracing):
+
+        with import_job("populate_orders") as job:
+            for row in job.rows_from(reader):
+                ...
+                job.error(e)  # for a skipped row
+            with job.batch(len(orders)):
+                Order.objects.bulk_upsert(orders, ...)
+    """
+    job = ImportJob(command)
+    try:
+        with trace(f"import {command}", attributes={"import.command": command}) as root:
+            yield job
+            root.set_attribute("import.rows", job.rows)
+    except BaseException:
+        IMPORT_RUNS.labels(command, "failed").inc()
+        raise
+    else:
+        IMPORT_RUNS.labels(command, "succeeded").inc()
+    finally:
+        job.flush()
+
+
+def metrics_view(request):
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponseForbidden()
+    refresh_pool_gauges()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,214 @@
+# _config/nplusone.py
+"""
+N+1 query detection for development and staging.
+
+``detect_n_plus_one()`` watches every statement run on any database while
+it is active and groups them by shape (the SQL with its parameters left
+out) and by the project line that ran them. A shape run at least
+``NPLUSONE_MIN_REPEATS`` times from one line, typically a lazy related
+object loaded once per row of a loop or a template, is reported as an
+``NPlusOne`` finding: the statement, the project stack that led to it and
+the ``select_related``/``prefetch_related`` (or bulk fetch) that removes it.
+
+``NPlusOneMiddleware`` checks each request and the ``profile_command``
+management command each command run, as set by ``NPLUSONE_DETECTION``:
+"log" logs findings to ``_config.nplusone``, "raise" raises
+``NPlusOneError`` (an AssertionError, so ``NPLUSONE_DETECTION=raise
+manage.py test`` fails the tests that hit one) and "" turns checking off.
+Tests can also wrap code in ``forbid_n_plus_one()``.
+"""
+
+import logging
+import re
+import sys
+from contextlib import ExitStack, contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor,
+    ReverseOneToOneDescriptor,
+)
+from django.db.models.query_utils import DeferredAttribute
+
+from _config.profiling import INSTRUMENTATION_FILES, project_frames
+
+logger = logging.getLogger(__name__)
+INSTRUMENTATION_FILES.add(__file__)
+
+STACK_DEPTH = 5
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_FIRST_CONDITION = re.compile(r'WHERE \(?"(\w+)"\."(\w+)" = %s')
+_LOADERS = (ForwardManyToOneDescriptor, ReverseOneToOneDescriptor, DeferredAttribute)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+class NPlusOne:
+    """One statement shape repeated from one line."""
+
+    def __init__(self, alias, sql, call_site, stack, suggestion):
+        self.alias = alias
+        self.sql = sql
+        self.call_site = call_site
+        self.stack = stack
+        self.suggestion = suggestion
+        self.count = 0
+
+    def __str__(self):
+        lines = [
+            f"{self.count} similar queries on {self.alias!r} from {self.call_site}",
+            f"  {self.sql[:200]}",
+            *(f"    at {frame}" for frame in self.stack),
+            f"  Fix: {self.suggestion}",
+        ]
+        return "\n".join(lines)
+
+
+def shape(sql):
+    """``sql`` with IN lists of any length written the same way."""
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def _loaded_by(frame):
+    """The related descriptor or deferred field, if any, that ran the query."""
+    # Only library frames lie between the query and the code that caused it.
+    while frame is not None and (
+        "site-packages" in frame.f_code.co_filename
+        or frame.f_code.co_filename in INSTRUMENTATION_FILES
+    ):
+        owner = frame.f_locals.get("self")
+        # type(), not isinstance(): that would evaluate a lazy object such as
+        # request.user, and with it run a query inside this one.
+        if issubclass(type(owner), _LOADERS):
+            return owner
+        frame = frame.f_back
+    return None
+
+
+def _reverse_foreign_key(sql):
+    """The ForeignKey a ``WHERE <table>.<fk column> = %s`` query filters on."""
+    match = _FIRST_CONDITION.search(sql)
+    if match is None:
+        return None
+    table, column = match.groups()
+    for model in apps.get_models():
+        if model._meta.db_table != table:
+            continue
+        for field in model._meta.concrete_fields:
+            if field.column == column and field.many_to_one and not field.primary_key:
+                return field
+    return None
+
+
+def suggest(sql, frame):
+    """How to load the rows a repeated ``sql`` fetches in one or two queries."""
+    owner = _loaded_by(frame)
+    if isinstance(owner, ForwardManyToOneDescriptor):
+        field = owner.field
+        return f"select_related({field.name!r}) on the {field.model.__name__} queryset"
+    if isinstance(owner, ReverseOneToOneDescriptor):
+        related = owner.related
+        return (
+            f"select_related({related.get_accessor_name()!r}) "
+            f"on the {related.model.__name__} queryset"
+        )
+    if isinstance(owner, DeferredAttribute):
+        field = owner.field
+        return (
+            f"load {field.name!r} with the {field.model.__name__} queryset: "
+            "remove it from defer() or add it to only()"
+        )
+    field = _reverse_foreign_key(sql)
+    if field is not None:
+        accessor = field.remote_field.get_accessor_name()
+        return (
+            f"prefetch_related({accessor!r}) on the "
+            f"{field.remote_field.model.__name__} queryset"
+        )
+    return (
+        "fetch the rows once before the loop, with filter(pk__in=...) or in_bulk(), "
+        "or reference_cache() for lookup tables"
+    )
+
+
+class NPlusOneDetector:
+    def __init__(self, label=""):
+        self.label = label
+        self.found = {}  # (alias, shape, call site) -> NPlusOne
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            frame = sys._getframe(1)
+            stack = list(project_frames(frame))
+            alias = context["connection"].alias
+            key = (alias, shape(sql), stack[0] if stack else None)
+            finding = self.found.get(key)
+            if finding is None:
+                finding = self.found[key] = NPlusOne(
+                    alias, key[1], key[2], stack[:STACK_DEPTH], suggest(sql, frame)
+                )
+            finding.count += 1
+        return execute(sql, params, many, context)
+
+    def findings(self):
+        """Shapes repeated at least NPLUSONE_MIN_REPEATS times, most repeated first."""
+        repeated = [
+            finding
+            for finding in self.found.values()
+            if finding.count >= settings.NPLUSONE_MIN_REPEATS
+        ]
+        return sorted(repeated, key=lambda finding: finding.count, reverse=True)
+
+    def report(self):
+        findings = self.findings()
+        if not findings:
+            return None
+        header = f"{len(findings)} N+1 query pattern(s) in {self.label or 'block'}"
+        return "\n".join([header, *map(str, findings)])
+
+
+@contextmanager
+def detect_n_plus_one(label=""):
+    """Watch the queries of every database connection of this thread."""
+    detector = NPlusOneDetector(label)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+
+
+def handle_findings(detector, mode=None):
+    """Log or raise ``detector``'s findings as ``mode`` (NPLUSONE_DETECTION) says."""
+    mode = settings.NPLUSONE_DETECTION if mode is None else mode
+    report = detector.report()
+    if report is None or not mode:
+        return
+    if mode == "raise":
+        raise NPlusOneError(report)
+    logger.warning(report)
+
+
+@contextmanager
+def forbid_n_plus_one(label=""):
+    """Raise NPlusOneError when the block repeats a query per row."""
+    with detect_n_plus_one(label) as detector:
+        yield detector
+    handle_findings(detector, "raise")
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.NPLUSONE_DETECTION:
+            return self.get_response(request)
+        with detect_n_plus_one(f"{request.method} {request.path}") as detector:
+            response = self.get_response(request)
+        handle_findings(detector)
+        return response
@@ -0,0 +1,38 @@
+# _config/pooling.py
+"""Metrics of the psycopg connection pools enabled by DATABASE_POOL."""
+
+from django.db import connections
+
+
+def pool_stats(alias="default"):
+    """
+    Counters of ``alias``'s pool in this process, or None without pooling:
+    connections checked out, idle and being waited for, cumulative wait
+    time, and connection and request errors since the pool opened.
+    """
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    return {
+        "min_size": stats.get("pool_min", pool.min_size),
+        "max_size": stats.get("pool_max", pool.max_size),
+        "size": size,
+        "checked_out": size - available,
+        "available": available,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": stats.get("requests_num", 0),
+        "requests_queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "request_errors": stats.get("requests_errors", 0),
+        "connection_errors": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+    }
+
+
+def all_pool_stats():
+    """``{alias: pool_stats(alias)}`` for every pooled database."""
+    stats = {alias: pool_stats(alias) for alias in connections}
+    return {alias: value for alias, value in stats.items() if value is not None}
@@ -0,0 +1,134 @@
+# _config/profiling.py
+"""
+Per-request and per-command SQL profiling.
+
+``profile_queries()`` records every statement run on any database while
+it is active: its duration and the project line that issued it. The
+result is a ``QueryProfile`` with the query count, total database time and
+the slowest statements.
+
+``SQLProfilingMiddleware`` profiles a random ``SQL_PROFILE_SAMPLE_RATE``
+share of requests, so the cost at high traffic is that share of one
+timer and one stack walk per query; unsampled requests run untouched.
+Sampled requests slower than ``SQL_PROFILE_SLOW_MS`` are logged to the
+``_config.profiling`` logger as one JSON object. The ``profile_command``
+management command does the same for any command.
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SQL_PREVIEW_CHARS = 500
+# Files whose frames are never reported as the project code running a query:
+# modules with execute wrappers add themselves.
+INSTRUMENTATION_FILES = {__file__}
+
+
+def project_frames(frame):
+    """``path:line in function`` of each project frame from ``frame`` outwards."""
+    root = str(settings.BASE_DIR)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(root)
+            and "site-packages" not in filename
+            and filename not in INSTRUMENTATION_FILES
+        ):
+            path = Path(filename).relative_to(root)
+            yield f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+
+
+def call_site():
+    """``path:line in function`` of the innermost project frame issuing a query."""
+    return next(project_frames(sys._getframe(2)), None)
+
+
+class QueryProfile:
+    def __init__(self, kind, label):
+        self.kind = kind
+        self.label = label
+        self.queries = []  # (duration in seconds, alias, sql, call site)
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def __call__(self, execute, sql, params, many, context):
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            alias = context["connection"].alias
+            self.queries.append((time.perf_counter() - start, alias, sql, site))
+
+    @property
+    def db_time(self):
+        return sum(duration for duration, *_ in self.queries)
+
+    def slowest(self, n=None):
+        n = settings.SQL_PROFILE_TOP_N if n is None else n
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:n]
+
+    def summary(self, **extra):
+        return {
+            "kind": self.kind,
+            "label": self.label,
+            **extra,
+            "duration_ms": round(self.duration * 1000, 2),
+            "queries": len(self.queries),
+            "db_ms": round(self.db_time * 1000, 2),
+            "slowest": [
+                {
+                    "ms": round(duration * 1000, 2),
+                    "database": alias,
+                    "sql": sql[:SQL_PREVIEW_CHARS],
+                    "call_site": site,
+                }
+                for duration, alias, sql, site in self.slowest()
+            ],
+        }
+
+
+@contextmanager
+def profile_queries(kind="block", label=""):
+    """Profile the queries of every database connection of this thread."""
+    profile = QueryProfile(kind, label)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        try:
+            yield profile
+        finally:
+            profile.duration = time.perf_counter() - profile.started
+
+
+def log_if_slow(profile, **extra):
+    if profile.duration * 1000 >= settings.SQL_PROFILE_SLOW_MS:
+        logger.warning(json.dumps(profile.summary(**extra)))
+
+
+class SQLProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SQL_PROFILE_SAMPLE_RATE:
+            return self.get_response(request)
+        label = f"{request.method} {request.path}"
+        with profile_queries("request", label) as profile:
+            response = self.get_response(request)
+        match = request.resolver_match
+        log_if_slow(
+            profile, view=match.view_name if match else None, status=response.status_code
+        )
+        return response
@@ -0,0 +1,160 @@
+# _config/query_cache.py
+"""
+Versioned cache of evaluated querysets and aggregates.
+
+    from _config.query_cache import cached, cached_aggregate
+
+    late = cached(Order.objects.unshipped().filter(required_date__lt=cutoff))
+    totals = cached_aggregate(OrderDetail.objects.all(), revenue=Sum("unit_price"))
+
+Results live in the ``QUERY_CACHE_ALIAS`` backend of ``CACHES`` under a
+key built from the database alias, the SQL, its parameters and the
+version of every model whose table the SQL reads. Any write to one of
+those models bumps its version (through _config.invalidation), so every
+dependent result is skipped from then on and simply expires; nothing has
+to be found and deleted. With a per-process backend (LocMemCache), writes
+in other processes bump this process's versions when they commit, as every
+change is then broadcast; a shared backend (Redis, Memcached) is bumped
+by the writer itself. Dependencies on tables that only prefetch_related()
+reads must be passed as ``depends_on``.
+
+Versions start from a nanosecond timestamp, so a version the backend
+evicted or lost never comes back with a number used before.
+"""
+
+import hashlib
+import re
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+
+from _config.invalidation import subscribe_all
+from _config.metrics import CACHE_REQUESTS
+from _config.tracing import span
+
+VERSION_PREFIX = "query-cache:version:"
+RESULT_PREFIX = "query-cache:result:"
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+_tables = None
+
+
+def _cache():
+    return caches[settings.QUERY_CACHE_ALIAS]
+
+
+def _models_by_table():
+    global _tables
+    if _tables is None:
+        _tables = {model._meta.db_table: model for model in apps.get_models()}
+    return _tables
+
+
+def dependencies(sql):
+    """Models whose tables ``sql`` reads, joins included."""
+    tables = _models_by_table()
+    return {tables[name] for name in re.findall(r'"([^"]+)"', sql) if name in tables}
+
+
+def versions(models):
+    """Current version of each model, starting any that have none."""
+    cache = _cache()
+    keys = {VERSION_PREFIX + model._meta.label_lower: model for model in models}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        found[key] = cache.get(key)
+    return sorted(found.items())
+
+
+def bump_version(label, pk=None):
+    """Invalidate every cached result that reads ``label`` (any model if None)."""
+    cache = _cache()
+    if label is None:
+        cache.delete_many(
+            [VERSION_PREFIX + model._meta.label_lower for model in apps.get_models()]
+        )
+        return
+    key = VERSION_PREFIX + label
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+subscribe_all(bump_version)
+
+
+def _key(queryset, sql, params, depends_on, extra=()):
+    models = dependencies(sql) | {queryset.model, *depends_on}
+    parts = [
+        queryset.db,
+        queryset._iterable_class.__name__,
+        repr(queryset._fields),
+        repr(queryset._prefetch_related_lookups),
+        sql,
+        repr(params),
+        repr(versions(models)),
+        *extra,
+    ]
+    return RESULT_PREFIX + hashlib.sha256("\x00".join(parts).encode()).hexdigest()
+
+
+def _fetch(key, compute, timeout):
+    cache = _cache()
+    with span("cache get", attributes={"cache.name": "query"}) as lookup:
+        result = cache.get(key)
+        lookup.set_attribute("cache.hit", result is not None)
+    if result is not None:
+        _count("hits")
+        return result
+    _count("misses")
+    result = compute()
+    cache.set(key, result, settings.QUERY_CACHE_TIMEOUT if timeout is None else timeout)
+    return result
+
+
+def cached(queryset, timeout=None, depends_on=()):
+    """Evaluate ``queryset`` through the cache and return its rows as a list."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:  # e.g. filter(pk__in=[]): no query to cache
+        return list(queryset.all())
+    key = _key(queryset, sql, params, depends_on)
+    # all(): a clone, in case ``queryset`` itself was evaluated before.
+    return _fetch(key, lambda: list(queryset.all()), timeout)
+
+
+def cached_aggregate(queryset, timeout=None, depends_on=(), **aggregates):
+    """``queryset.aggregate(**aggregates)`` through the cache."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return queryset.aggregate(**aggregates)
+    extra = [f"{name}={expression!r}" for name, expression in sorted(aggregates.items())]
+    key = _key(queryset, sql, params, depends_on, extra)
+    return _fetch(key, lambda: queryset.aggregate(**aggregates), timeout)
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+    CACHE_REQUESTS.labels("query", "hit" if outcome == "hits" else "miss").inc()
+
+
+def stats():
+    """Hits and misses of this process since start or reset_stats()."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
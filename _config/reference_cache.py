@@ -0,0 +1,131 @@
+# _config/reference_cache.py
+"""
+Read-through, in-process cache of small lookup tables.
+
+    from _config.reference_cache import reference_cache
+
+    shipper = reference_cache(Shipper).get_by_id(3)
+    regions = reference_cache(Region).all()
+
+Rows are evicted through _config.invalidation whenever they are saved or
+deleted, in this process or another, so entries need no expiry. Other
+processes only send the changes of models in ``settings.CACHED_MODELS``,
+so reference_cache() only accepts those. Cached instances are shared
+between callers and must be treated as read-only.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+
+from _config.invalidation import subscribe
+from _config.metrics import CACHE_REQUESTS
+from _config.tracing import span
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class ReferenceCache:
+    def __init__(self, model, max_size=None):
+        """``max_size`` caps the rows kept by id; least recently used go first."""
+        self.model = model
+        self.max_size = max_size
+        self._rows = OrderedDict()  # pk -> instance, least recently used first
+        self._all = None  # every row in model ordering, once loaded
+        self._generation = 0  # bumped on eviction so stale loads are discarded
+        self._lock = threading.Lock()
+        self._name = f"reference:{model._meta.label_lower}"
+        self._hits = CACHE_REQUESTS.labels(self._name, "hit")
+        self._misses = CACHE_REQUESTS.labels(self._name, "miss")
+        subscribe(model, self.evict)
+
+    def get_by_id(self, pk):
+        """The row with primary key ``pk``; raises ``model.DoesNotExist`` like get()."""
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise self._missing(pk)
+        with span("cache get", attributes={"cache.name": self._name}) as lookup:
+            with self._lock:
+                if pk in self._rows:
+                    self._rows.move_to_end(pk)
+                    self._hit(lookup)
+                    return self._rows[pk]
+                if self._all is not None:
+                    self._hit(lookup)
+                    raise self._missing(pk)
+                generation = self._generation
+            self._miss(lookup)
+            obj = self.model.objects.get(pk=pk)
+            with self._lock:
+                if generation == self._generation:
+                    self._store(obj)
+            return obj
+
+    def all(self):
+        """Every row, in the model's default ordering, loaded with one query."""
+        with span("cache get all", attributes={"cache.name": self._name}) as lookup:
+            with self._lock:
+                if self._all is not None:
+                    self._hit(lookup)
+                    return list(self._all)
+                generation = self._generation
+            self._miss(lookup)
+            rows = list(self.model.objects.all())
+            with self._lock:
+                if generation == self._generation and (
+                    self.max_size is None or len(rows) <= self.max_size
+                ):
+                    self._all = rows
+                    for obj in rows:
+                        self._store(obj)
+            return rows
+
+    def _hit(self, lookup):
+        self._hits.inc()
+        lookup.set_attribute("cache.hit", True)
+
+    def _miss(self, lookup):
+        self._misses.inc()
+        lookup.set_attribute("cache.hit", False)
+
+    def _missing(self, pk):
+        return self.model.DoesNotExist(f"{self.model.__name__} {pk!r} does not exist.")
+
+    def _store(self, obj):
+        self._rows[obj.pk] = obj
+        self._rows.move_to_end(obj.pk)
+        if self.max_size is not None and len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+            self._all = None
+
+    def evict(self, pk=None):
+        """Forget row ``pk``, or every row if None."""
+        with self._lock:
+            self._generation += 1
+            self._all = None
+            if pk is None:
+                self._rows.clear()
+            else:
+                try:
+                    pk = self.model._meta.pk.to_python(pk)
+                except ValidationError:
+                    self._rows.clear()
+                else:
+                    self._rows.pop(pk, None)
+
+
+def reference_cache(model):
+    """The process-wide cache of ``model``, created on first use."""
+    if model._meta.label_lower not in settings.CACHED_MODELS:
+        raise ImproperlyConfigured(
+            f"Add {model._meta.label_lower!r} to CACHED_MODELS to cache it: other "
+            "processes do not send its changes."
+        )
+    with _caches_lock:
+        if model not in _caches:
+            _caches[model] = ReferenceCache(model, settings.REFERENCE_CACHE_MAX_SIZE)
+        return _caches[model]
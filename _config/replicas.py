@@ -0,0 +1,129 @@
+# _config/replicas.py
+"""
+Read replicas.
+
+``ReplicaRouter`` sends writes to ``default`` (the primary) and the reads
+of web requests to the aliases in ``DATABASE_REPLICAS``. Once a request
+has written, its later reads go to the primary as well, so it reads its
+own writes, and ``ReplicaMiddleware`` keeps the client on the primary for
+``REPLICA_STICKY_SECONDS`` so the next page does not miss them either.
+
+Everything outside a request (management commands, the shell, threads)
+reads from the primary unless the ``DATABASE_PIN`` setting is "replica",
+e.g. ``DATABASE_PIN=replica manage.py <report>``; "primary" keeps requests
+off the replicas. Code can pin a block with ``use_primary()``, for reads
+that must not be stale such as idempotency checks, or ``use_replica()``.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from _config.profiling import INSTRUMENTATION_FILES
+
+# ReplicaMiddleware wraps every view, so its frame is under each query.
+INSTRUMENTATION_FILES.add(__file__)
+
+PRIMARY = "default"
+STICKY_COOKIE = "use_primary"
+
+
+class _RoutingState:
+    def __init__(self, default="primary", pin=None):
+        self.default = default  # where reads go without a pin or a write
+        self.pin = pin  # "primary", "replica" or None
+        self.wrote = False
+        self.replica = None  # chosen once, so a request reads one snapshot
+
+    def target(self):
+        if self.pin:
+            return self.pin
+        if self.wrote:
+            return "primary"
+        return settings.DATABASE_PIN or self.default
+
+
+_state = ContextVar("database_routing", default=None)
+
+
+def _current():
+    state = _state.get()
+    if state is None:
+        state = _RoutingState()
+        _state.set(state)
+    return state
+
+
+@contextmanager
+def _pinned(pin):
+    state = _current()
+    previous = state.pin
+    state.pin = pin
+    try:
+        yield
+    finally:
+        state.pin = previous
+
+
+def use_primary():
+    """Send reads in this block to the primary."""
+    return _pinned("primary")
+
+
+def use_replica():
+    """Send reads in this block to a replica, even after a write."""
+    return _pinned("replica")
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS:
+            return PRIMARY
+        state = _current()
+        if state.target() == "primary":
+            return PRIMARY
+        # Related objects come from the database their instance came from.
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if state.replica not in settings.DATABASE_REPLICAS:
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        _current().wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Give each request its own routing state and make writes sticky per client."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky = "primary" if STICKY_COOKIE in request.COOKIES else None
+        state = _RoutingState(default="replica", pin=sticky)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -57,20 +57,28 @@ THIRD_PARTY_APPS = ["django_extensions"]
 INSTALLED_APPS = DJANGO_APPS + PROJECT_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
+    "_config.metrics.MetricsMiddleware",
+    "_config.tracing.TracingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "_config.profiling.SQLProfilingMiddleware",
+    "_config.nplusone.NPlusOneMiddleware",
+    "_config.replicas.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "user_accounts.timezones.TimezoneMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "_config.transactions.RequestTransactionMiddleware",
 ]
 
 ROOT_URLCONF = "_config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's backend, with template render spans (_config.tracing).
+        "BACKEND": "_config.tracing.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -95,7 +103,42 @@ DATABASES = {
     if getenv("DATABASE_URL")
     else {"ENGINE": "django.db.backends.postgresql", "NAME": "northwind"}
 }
-DATABASES["default"].update({"ATOMIC_REQUESTS": True, "CONN_MAX_AGE": 600})
+# Request transactions come from _config.transactions, not ATOMIC_REQUESTS.
+DATABASES["default"].update({"CONN_MAX_AGE": 600})
+
+# Read replicas: comma-separated DATABASE_URL-style URLs, used as aliases
+# replica1, replica2, ... by _config.replicas.ReplicaRouter. Tests read
+# them from the test database.
+for index, url in enumerate(filter(None, getenv("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    DATABASES[f"replica{index}"] = {
+        **dj_database_url.parse(url.strip()),
+        "CONN_MAX_AGE": 600,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# Connection pooling (psycopg 3): DATABASE_POOL=1 gives each process a pool
+# per database instead of one persistent connection per thread. Connections
+# are health-checked on checkout; a request waits at most
+# DATABASE_POOL_TIMEOUT seconds for one. See _config.pooling for metrics.
+if getenv("DATABASE_POOL"):
+    for database in DATABASES.values():
+        database.update({"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True})
+        database.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": int(getenv("DATABASE_POOL_MIN_SIZE", 2)),
+            "max_size": int(getenv("DATABASE_POOL_MAX_SIZE", 10)),
+            "timeout": float(getenv("DATABASE_POOL_TIMEOUT", 10)),
+            "max_idle": float(getenv("DATABASE_POOL_MAX_IDLE", 300)),
+            "max_lifetime": float(getenv("DATABASE_POOL_MAX_LIFETIME", 3600)),
+        }
+DATABASE_ROUTERS = ["_config.replicas.ReplicaRouter"]
+
+# "primary" or "replica": where reads go in this process by default
+# (requests use replicas, commands the primary).
+DATABASE_PIN = getenv("DATABASE_PIN") or None
+
+# Seconds a client keeps reading from the primary after it wrote.
+REPLICA_STICKY_SECONDS = int(getenv("REPLICA_STICKY_SECONDS", 5))
 
 
 # Password validation
@@ -138,6 +181,78 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Parquet cold storage written by the archive_orders command.
+ORDER_ARCHIVE_DIR = Path(getenv("ORDER_ARCHIVE_DIR", BASE_DIR / "archive"))
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# Backend and default lifetime (seconds) of _config.query_cache results.
+QUERY_CACHE_ALIAS = "default"
+QUERY_CACHE_TIMEOUT = 600
+
+# Models whose rows in-process caches hold: the lookup tables of
+# _config.reference_cache. Only changes to these are sent to other processes
+# (_config.invalidation), unless the QUERY_CACHE_ALIAS backend is per-process
+# (LocMemCache), which sends every change.
+CACHED_MODELS = {
+    "northwind.category",
+    "northwind.shipper",
+    "northwind.supplier",
+    "user_accounts.region",
+    "user_accounts.territory",
+}
+
+# Rows kept per model by _config.reference_cache (None: no limit).
+REFERENCE_CACHE_MAX_SIZE = int(getenv("REFERENCE_CACHE_MAX_SIZE", 0)) or None
+
+# SQL profiling (_config.profiling): share of requests profiled, duration
+# above which a profiled request is logged, and slow statements it lists.
+SQL_PROFILE_SAMPLE_RATE = float(getenv("SQL_PROFILE_SAMPLE_RATE", 0.01))
+SQL_PROFILE_SLOW_MS = float(getenv("SQL_PROFILE_SLOW_MS", 500))
+SQL_PROFILE_TOP_N = 5
+
+# N+1 query detection (_config.nplusone): "log", "raise" or "" (off), and
+# how often one line must run the same query shape to be reported.
+NPLUSONE_DETECTION = getenv("NPLUSONE_DETECTION", "log" if DEBUG else "")
+NPLUSONE_MIN_REPEATS = int(getenv("NPLUSONE_MIN_REPEATS", 5))
+
+# Performance regression tests (_config.budgets): recorded query counts and
+# timings, and how far a run may exceed the timings (a ratio, plus ms).
+PERF_BASELINE_FILE = BASE_DIR / "perf_baseline.json"
+PERF_TOLERANCE = float(getenv("PERF_TOLERANCE", 0.5))
+PERF_TOLERANCE_MS = float(getenv("PERF_TOLERANCE_MS", 5))
+PERF_UPDATE_BASELINE = bool(getenv("PERF_UPDATE_BASELINE"))
+
+# Clients allowed to scrape /metrics (_config.metrics); empty allows any.
+METRICS_ALLOWED_IPS = [
+    ip.strip()
+    for ip in getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if ip.strip()
+]
+
+# Tracing (_config.tracing): share of requests and import runs traced,
+# whether an incoming traceparent's sampled flag overrides it (only behind a
+# proxy that sets the header), and the OTLP/JSON lines file traces go to.
+TRACE_SAMPLE_RATE = float(getenv("TRACE_SAMPLE_RATE", 0))
+TRACE_TRUST_PARENT = getenv("TRACE_TRUST_PARENT", "") == "1"
+TRACE_FILE = Path(getenv("TRACE_FILE", BASE_DIR / "traces.jsonl"))
+TRACE_SERVICE_NAME = getenv("TRACE_SERVICE_NAME", "northwind")
+TRACE_MAX_SPANS = int(getenv("TRACE_MAX_SPANS", 2000))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "_config": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
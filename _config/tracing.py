@@ -0,0 +1,303 @@
+# _config/tracing.py
+"""
+Sampled tracing of requests and import commands, in OpenTelemetry's shape.
+
+``TracingMiddleware`` makes a random ``TRACE_SAMPLE_RATE`` share of
+requests into traces, continuing the trace id of an incoming W3C
+``traceparent`` header. Its sampled flag is followed only with
+``TRACE_TRUST_PARENT``: anyone can send one, and each sampled request
+costs a span per query and a write to ``TRACE_FILE``. The populate_*
+commands trace their runs the same way through
+``_config.metrics.import_job()``, and any other code can start one with
+``trace()``. Inside a sampled trace, spans are nested under the request
+or command for every SQL statement, query and reference cache lookup,
+template render (the ``DjangoTemplates`` backend below) and import batch,
+and ``span()`` adds more:
+
+    with span("aggregate revenue", attributes={"orders": len(orders)}):
+        ...
+
+A finished trace is appended to ``TRACE_FILE`` as one line of OTLP/JSON
+(``{"resourceSpans": [...]}``, as the OpenTelemetry collector's file
+exporter writes it), so the collector's otlpjsonfile receiver or any
+OTLP/JSON reader can load it. Traces keep at most ``TRACE_MAX_SPANS``
+spans; the root's ``tracing.dropped_spans`` counts the rest.
+
+Outside a sampled trace ``span()`` costs one context variable lookup and
+installs nothing, so unsampled requests run untouched.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+
+from _config.profiling import INSTRUMENTATION_FILES, SQL_PREVIEW_CHARS
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTATION_FILES.add(__file__)
+
+# OTLP enum values.
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current = ContextVar("span", default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span):
+        if span is self.root or len(self.spans) < settings.TRACE_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+class Span:
+    """One timed operation of a trace; a context manager that makes it current."""
+
+    def __init__(self, trace, name, kind=INTERNAL, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def update_name(self, name):
+        self.name = name
+
+    def set_error(self, message):
+        self.error = message
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.attributes["exception.type"] = exc_type.__name__
+            self.error = str(exc)
+        self.trace.add(self)
+        return False
+
+    def to_otlp(self):
+        otlp = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            otlp["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return otlp
+
+
+class _NoSpan:
+    """Stands in for a span outside sampled traces."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def update_name(self, name):
+        pass
+
+    def set_error(self, message):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def current_span():
+    """The innermost span of this context, or None outside sampled traces."""
+    return _current.get()
+
+
+def span(name, kind=INTERNAL, attributes=None):
+    """A child of the current span, or ``NO_SPAN`` outside sampled traces."""
+    parent = _current.get()
+    if parent is None:
+        return NO_SPAN
+    return Span(parent.trace, name, kind, parent.span_id, attributes)
+
+
+def parse_traceparent(header):
+    """``(trace id, parent span id, sampled)`` of a W3C traceparent, or None."""
+    match = TRACEPARENT.match(header or "")
+    if not match or match[1] == "0" * 32 or match[2] == "0" * 16:
+        return None
+    return match[1], match[2], bool(int(match[3], 16) & 1)
+
+
+def _trace_query(execute, sql, params, many, context):
+    connection = context["connection"]
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "SQL"
+    attributes = {
+        "db.system": connection.vendor,
+        "db.name": connection.alias,
+        "db.statement": sql[:SQL_PREVIEW_CHARS],
+    }
+    with span(keyword, CLIENT, attributes):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def trace(name, kind=INTERNAL, attributes=None, parent=None):
+    """
+    Start a trace rooted at ``name`` if this one is sampled, tracing the
+    SQL of every database connection of this thread until it ends, then
+    export it. ``parent`` is a parsed traceparent to continue; its sampled
+    flag decides only with TRACE_TRUST_PARENT. Inside a trace already, this
+    is just ``span()``.
+    """
+    if _current.get() is not None:
+        with span(name, kind, attributes) as child:
+            yield child
+        return
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id = f"{random.getrandbits(128):032x}"
+        parent_id = None
+    if parent is None or not settings.TRACE_TRUST_PARENT:
+        sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    if not sampled:
+        yield NO_SPAN
+        return
+
+    root_trace = Trace(trace_id)
+    root = root_trace.root = Span(root_trace, name, kind, parent_id, attributes)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_trace_query))
+            with root:
+                yield root
+    finally:
+        export(root_trace)
+
+
+def export(finished):
+    """Append ``finished`` to TRACE_FILE as one OTLP/JSON line."""
+    if finished.dropped:
+        finished.root.set_attribute("tracing.dropped_spans", finished.dropped)
+    resource = {
+        "service.name": settings.TRACE_SERVICE_NAME,
+        "process.pid": os.getpid(),
+    }
+    line = json.dumps(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [_attribute(k, v) for k, v in resource.items()]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in finished.spans],
+                        }
+                    ],
+                }
+            ]
+        },
+        separators=(",", ":"),
+    )
+    try:
+        with _export_lock, open(settings.TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning(
+            "Cannot write trace %s to %s: %s", finished.trace_id, settings.TRACE_FILE, e
+        )
+
+
+class TracingMiddleware:
+    """Keep near the top of MIDDLEWARE, so the request span covers the stack."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        attributes = {"http.request.method": request.method, "url.path": request.path}
+        parent = parse_traceparent(request.headers.get("traceparent"))
+        with trace(request.method, SERVER, attributes, parent) as root:
+            response = self.get_response(request)
+            match = request.resolver_match
+            if match:
+                root.update_name(f"{request.method} {match.route}")
+                root.set_attribute("http.route", match.route)
+                root.set_attribute("django.view", match.view_name or "")
+            root.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.set_error(f"HTTP {response.status_code}")
+        return response
+
+
+class TracedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        name = self.template.origin.template_name or "<string>"
+        with span(f"render {name}", attributes={"template.name": name}):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, with a span for each template rendered."""
+
+    def from_string(self, template_code):
+        return TracedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TracedTemplate(template.template, self)
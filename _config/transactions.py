@@ -0,0 +1,78 @@
+# _config/transactions.py
+"""
+Per-method request transactions, replacing ATOMIC_REQUESTS.
+
+``RequestTransactionMiddleware`` runs views of unsafe methods (POST, PUT,
+PATCH, DELETE) in one transaction on the primary, as ATOMIC_REQUESTS did,
+and rolls it back if the view raises. Their reads go to the primary too,
+so a view that reads and then writes works on current rows. Safe methods
+(GET, HEAD, OPTIONS) run in autocommit, so a read costs no BEGIN/COMMIT round trips or
+transaction-long locks, and their queries may go to a replica.
+
+A read view that needs one consistent snapshot across its queries, or
+must not write by accident, is decorated with ``read_only_transaction``:
+its safe requests run in a ``READ ONLY`` transaction on the database
+their reads are routed to. ``transaction.non_atomic_requests`` still opts
+a view out entirely.
+"""
+
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from _config.profiling import INSTRUMENTATION_FILES
+from _config.replicas import use_primary
+
+# RequestTransactionMiddleware wraps views and runs their BEGIN and COMMIT.
+INSTRUMENTATION_FILES.add(__file__)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS", "TRACE"}
+
+
+@contextmanager
+def read_only(using=None):
+    """A READ ONLY transaction on ``using``, by default where reads are routed."""
+    using = using or router.db_for_read(None)
+    with transaction.atomic(using=using):
+        if connections[using].vendor == "postgresql":
+            with connections[using].cursor() as cursor:
+                cursor.execute("SET TRANSACTION READ ONLY")
+        yield
+
+
+@contextmanager
+def primary_transaction():
+    """A transaction on the primary, which also serves the reads inside it."""
+    with use_primary(), transaction.atomic(using=DEFAULT_DB_ALIAS):
+        yield
+
+
+def read_only_transaction(view):
+    """Run ``view``'s safe-method requests in a READ ONLY transaction."""
+    view.read_only_transaction = True
+    return view
+
+
+class RequestTransactionMiddleware:
+    """Keep last in MIDDLEWARE: it calls the view itself."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            return None
+        if DEFAULT_DB_ALIAS in getattr(view_func, "_non_atomic_requests", set()):
+            return None
+        if request.method in SAFE_METHODS:
+            if not getattr(view_func, "read_only_transaction", False):
+                return None
+            context = read_only()
+        else:
+            context = primary_transaction()
+        with context:
+            return view_func(request, *view_args, **view_kwargs)
@@ -2,9 +2,13 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic.base import TemplateView
 
+from _config.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("user_accounts/", include("django.contrib.auth.urls")),
+    path("api/", include("northwind.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("", TemplateView.as_view(template_name="home.html"), name="home"),  # new
 ]
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "_config.settings")
 
 application = get_wsgi_application()
+
+# Evict this worker's cached reference data when another process changes it.
+from _config.invalidation import start_listener  # noqa: E402
+
+start_listener()
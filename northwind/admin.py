@@ -1,11 +1,136 @@
 # northwind/admin.py
 
 # -*- coding: utf-8 -*-
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
 
 from .models import Category, Order, OrderDetail, Product, Shipper, Supplier
 
 
+class PreloadedModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField that validates against a preloaded ``{pk: obj}`` map
+    instead of issuing one query per form.
+    """
+
+    preloaded = None
+
+    def to_python(self, value):
+        if self.preloaded is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            key = self.queryset.model._meta.pk.to_python(value)
+            return self.preloaded[key]
+        except (KeyError, ValidationError):
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+
+
+class OrderDetailInlineForm(forms.ModelForm):
+    class Meta:
+        model = OrderDetail
+        fields = ("product", "unit_price", "quantity", "discount")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Left blank, unit_price defaults to the product's current price.
+        self.fields["unit_price"].required = False
+
+    def _get_validation_exclusions(self):
+        # The product was already resolved from the formset's preloaded map,
+        # so skip the per-line existence query in ForeignKey.validate().
+        exclude = super()._get_validation_exclusions()
+        exclude.add("product")
+        return exclude
+
+    def validate_unique(self):
+        # (order, product) uniqueness is checked across all lines at once by
+        # the formset; the unique constraint still guards concurrent edits.
+        pass
+
+
+class OrderDetailInlineFormSet(BaseInlineFormSet):
+    """
+    Order lines formset that loads products once for every form, then
+    writes new and changed lines with bulk_create/bulk_update.
+    """
+
+    @cached_property
+    def products(self):
+        return Product.objects.in_bulk()
+
+    @cached_property
+    def product_choices(self):
+        return [("", "---------")] + [(pk, str(p)) for pk, p in self.products.items()]
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        field = form.fields["product"]
+        field.preloaded = self.products
+        field.choices = self.product_choices
+
+    def validate_unique(self):
+        # Forms exclude "product" from model validation, so the generic
+        # (order, product) check is done here over the submitted lines.
+        super().validate_unique()
+        seen = set()
+        for form in self.forms:
+            if not form.is_valid() or self._should_delete_form(form):
+                continue
+            product = form.cleaned_data.get("product")
+            if product is None:
+                continue
+            if product.pk in seen:
+                form._errors[NON_FIELD_ERRORS] = self.error_class([self.get_form_error()])
+                raise ValidationError(self.get_unique_error_message(["product"]))
+            seen.add(product.pk)
+
+    def save(self, commit=True):
+        instances = super().save(commit=False)
+        if not commit:
+            return instances
+
+        deleted = [obj.pk for obj in self.deleted_objects if obj.pk]
+        if deleted:
+            OrderDetail.objects.filter(pk__in=deleted).delete()
+
+        # Same defaulting rules as OrderDetail.save(); the preloaded products
+        # and the parent order are cached on the lines, so no queries.
+        OrderDetail.objects.resolve_prices(instances)
+        if self.new_objects:
+            OrderDetail.objects.bulk_create_lines(self.new_objects)
+        if self.changed_objects:
+            now = timezone.now()
+            fields = {"updated_at"}
+            for obj, changed in self.changed_objects:
+                obj.updated_at = now
+                fields.update(changed)
+            OrderDetail.objects.bulk_update(
+                [obj for obj, _ in self.changed_objects], sorted(fields)
+            )
+        return instances
+
+
+class OrderDetailInline(admin.TabularInline):
+    model = OrderDetail
+    form = OrderDetailInlineForm
+    formset = OrderDetailInlineFormSet
+    extra = 1
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "product":
+            kwargs["form_class"] = PreloadedModelChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = (
@@ -75,6 +200,7 @@ class ProductAdmin(admin.ModelAdmin):
         "category",
         "discontinued",
     )
+    list_select_related = ("supplier", "category")
     date_hierarchy = "created_at"
 
 
@@ -108,7 +234,23 @@ class OrderAdmin(admin.ModelAdmin):
         "shipped_date",
         "ship_via",
     )
+    list_select_related = ("customer", "employee__user", "ship_via")
     date_hierarchy = "orderdate"
+    inlines = [OrderDetailInline]
+    readonly_fields = ("order_total",)
+
+    @admin.display(description=_("Order total"))
+    def order_total(self, obj):
+        return obj.compute_total() if obj.pk else None
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Lines were written in bulk; total them once for the whole submit.
+        self.message_user(
+            request,
+            _("Order total: %(total)s") % {"total": form.instance.compute_total()},
+            messages.INFO,
+        )
 
 
 @admin.register(OrderDetail)
@@ -122,3 +264,4 @@ class OrderDetailAdmin(admin.ModelAdmin):
         "discount",
     )
     list_filter = ("order", "product")
+    list_select_related = ("order__customer", "product")
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
 
+from _config.invalidation import connect_signals
+
 
 class NorthwindConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'northwind'
+
+    def ready(self):
+        connect_signals(self)
+        # Registers the query cache's version bumps in every process that writes.
+        import _config.query_cache  # noqa: F401
@@ -0,0 +1,265 @@
+# northwind/archive.py
+"""
+Cold storage of historical orders in Parquet.
+
+Archived orders and their lines are written under ``ORDER_ARCHIVE_DIR`` as
+Hive-style partitioned datasets::
+
+    orders/year=2019/month=04/part-<run>-<batch>.parquet
+    order_details/year=2019/month=04/part-<run>-<batch>.parquet
+    manifest.json
+
+Lines are filed under their order's month. ``manifest.json`` lists every
+file with its row count and date range, so readers only open the files
+that can match. A file is added to the manifest before its rows are deleted
+from the hot tables; if a run dies in between, the rows exist in both
+places and the read-through functions below prefer the hot copy. The next
+run deletes them without archiving them again. The deletes emit no outbox
+events (see northwind.outbox).
+"""
+
+import datetime
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.conf import settings
+
+from northwind.models import Order, OrderDetail
+from northwind.outbox import suppress_outbox
+
+MANIFEST_NAME = "manifest.json"
+
+# dataset name -> (model, date column used for pruning)
+DATASETS = {
+    "orders": (Order, "orderdate"),
+    "order_details": (OrderDetail, "order_date"),
+}
+
+
+def archive_dir(path=None):
+    return Path(path or settings.ORDER_ARCHIVE_DIR)
+
+
+def _arrow_type(field):
+    internal_type = field.get_internal_type()
+    if field.is_relation:
+        return _arrow_type(field.target_field)
+    if internal_type == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal_type == "DateTimeField":
+        return pa.timestamp("us", tz="UTC")
+    if internal_type == "DateField":
+        return pa.date32()
+    if internal_type == "BooleanField":
+        return pa.bool_()
+    if internal_type == "FloatField":
+        return pa.float64()
+    if internal_type.endswith(("AutoField", "IntegerField")):
+        return pa.int64()
+    return pa.string()
+
+
+def arrow_schema(model):
+    """Arrow schema of ``model``'s concrete columns, keyed by attname (``customer_id``)."""
+    return pa.schema(
+        [
+            pa.field(f.attname, _arrow_type(f), nullable=f.null)
+            for f in model._meta.concrete_fields
+        ]
+    )
+
+
+def load_manifest(path=None):
+    manifest = archive_dir(path) / MANIFEST_NAME
+    if not manifest.exists():
+        return {"version": 1, "files": []}
+    return json.loads(manifest.read_text())
+
+
+def save_manifest(manifest, path=None):
+    """Replace the manifest atomically so readers never see a partial file."""
+    target = archive_dir(path) / MANIFEST_NAME
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps(manifest, indent=2))
+    os.replace(temporary, target)
+
+
+def _month_key(value):
+    value = value.astimezone(datetime.UTC)
+    return value.year, value.month
+
+
+def write_batch(orders, lines, run, batch, path=None):
+    """
+    Write one batch of order and line rows (dicts keyed by attname) as
+    Parquet files grouped by order month. Returns the manifest entries.
+    """
+    root = archive_dir(path)
+    months = {order["order_id"]: _month_key(order["orderdate"]) for order in orders}
+    grouped = {"orders": defaultdict(list), "order_details": defaultdict(list)}
+    for order in orders:
+        grouped["orders"][months[order["order_id"]]].append(order)
+    for line in lines:
+        grouped["order_details"][months[line["order_id"]]].append(line)
+
+    entries = []
+    for dataset, by_month in grouped.items():
+        model, date_column = DATASETS[dataset]
+        schema = arrow_schema(model)
+        for (year, month), rows in sorted(by_month.items()):
+            name = f"part-{run}-{batch:05d}.parquet"
+            relative = Path(dataset, f"year={year}", f"month={month:02d}", name)
+            target = root / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pylist(rows, schema=schema), target, compression="zstd"
+            )
+            dates = [row[date_column] for row in rows if row[date_column] is not None]
+            order_ids = [row["order_id"] for row in rows]
+            entries.append(
+                {
+                    "dataset": dataset,
+                    "path": relative.as_posix(),
+                    "rows": len(rows),
+                    "min_date": min(dates).isoformat() if dates else None,
+                    "max_date": max(dates).isoformat() if dates else None,
+                    "min_order_id": min(order_ids),
+                    "max_order_id": max(order_ids),
+                }
+            )
+    return entries
+
+
+def archived_order_ids(ids, path=None):
+    """Which of the order ``ids`` are already in the archive's order files."""
+    root = archive_dir(path)
+    low, high = min(ids), max(ids)
+    files = [
+        str(root / entry["path"])
+        for entry in load_manifest(path)["files"]
+        if entry["dataset"] == "orders"
+        and entry["min_order_id"] <= high
+        and entry["max_order_id"] >= low
+    ]
+    if not files:
+        return set()
+    table = ds.dataset(files, schema=arrow_schema(Order), format="parquet").to_table(
+        columns=["order_id"], filter=ds.field("order_id").isin(ids)
+    )
+    return set(table.column("order_id").to_pylist())
+
+
+def archive_orders(before, batch_size=5000, path=None, dry_run=False):
+    """
+    Move orders placed before ``before`` (an aware datetime) and their lines
+    to Parquet, ``batch_size`` orders at a time, deleting each batch from the
+    hot tables in its own transaction. Yields ``(orders, lines)`` per batch.
+    """
+    run = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%S")
+    order_columns = [f.attname for f in Order._meta.concrete_fields]
+    line_columns = [f.attname for f in OrderDetail._meta.concrete_fields]
+    last_id, batch = 0, 0
+    while True:
+        orders = list(
+            Order.objects.filter(orderdate__lt=before, order_id__gt=last_id)
+            .order_by("order_id")
+            .values(*order_columns)[:batch_size]
+        )
+        if not orders:
+            return
+        ids = [order["order_id"] for order in orders]
+        last_id = ids[-1]
+        lines = list(
+            OrderDetail.objects.filter(order_id__in=ids).order_by().values(*line_columns)
+        )
+        batch += 1
+        if dry_run:
+            yield len(orders), len(lines)
+            continue
+
+        # Orders of a run that died before deleting them are archived already.
+        done = archived_order_ids(ids, path)
+        new_orders = [order for order in orders if order["order_id"] not in done]
+        if new_orders:
+            new_lines = [line for line in lines if line["order_id"] not in done]
+            entries = write_batch(new_orders, new_lines, run, batch, path)
+            manifest = load_manifest(path)
+            manifest["files"].extend(entries)
+            save_manifest(manifest, path)
+        # Archived rows still exist downstream, so no delete events.
+        with suppress_outbox():
+            OrderDetail.objects.filter(order_id__in=ids).delete()
+            Order.objects.filter(order_id__in=ids).delete()
+        yield len(orders), len(lines)
+
+
+def _files(dataset, start, end, path):
+    """Manifest files of ``dataset`` whose date range overlaps [start, end)."""
+    root = archive_dir(path)
+    files = []
+    for entry in load_manifest(path)["files"]:
+        if entry["dataset"] != dataset:
+            continue
+        first, last = (
+            datetime.datetime.fromisoformat(entry[key]) if entry[key] else None
+            for key in ("min_date", "max_date")
+        )
+        if (start and last and last < start) or (end and first and first >= end):
+            continue
+        files.append(str(root / entry["path"]))
+    return files
+
+
+def read_archive(dataset, start=None, end=None, columns=None, path=None):
+    """
+    Return archived rows of ``dataset`` ("orders" or "order_details") dated
+    in [start, end) as a ``pyarrow.Table``; ``.to_pylist()`` or
+    ``.to_pandas()`` it for reporting.
+    """
+    model, date_column = DATASETS[dataset]
+    schema = arrow_schema(model)
+    files = _files(dataset, start, end, path)
+    if not files:
+        return schema.empty_table().select(columns or schema.names)
+    expression = None
+    if start:
+        expression = ds.field(date_column) >= start
+    if end:
+        upper = ds.field(date_column) < end
+        expression = upper if expression is None else expression & upper
+    return ds.dataset(files, schema=schema, format="parquet").to_table(
+        columns=columns, filter=expression
+    )
+
+
+def _read_through(dataset, queryset, start, end, path):
+    model, date_column = DATASETS[dataset]
+    columns = [f.attname for f in model._meta.concrete_fields]
+    hot = list(
+        queryset.filter(**{f"{date_column}__gte": start, f"{date_column}__lt": end})
+        .order_by()
+        .values(*columns)
+    )
+    hot_orders = {row["order_id"] for row in hot}
+    archived = [
+        row
+        for row in read_archive(dataset, start, end, path=path).to_pylist()
+        if row["order_id"] not in hot_orders
+    ]
+    return archived + hot
+
+
+def orders_between(start, end, path=None):
+    """Orders placed in [start, end) from the archive and the hot table, as dicts."""
+    return _read_through("orders", Order.objects.all(), start, end, path)
+
+
+def order_details_between(start, end, path=None):
+    """Lines of orders placed in [start, end) from the archive and the hot table."""
+    return _read_through("order_details", OrderDetail.objects.all(), start, end, path)
@@ -0,0 +1,230 @@
+# northwind/index_advisor.py
+"""
+Index usage analysis built on PostgreSQL's statistics views.
+
+Reads pg_stat_user_indexes, pg_stat_user_tables and, when the extension is
+installed, pg_stat_statements. Statistics of partitions are rolled up into
+their partitioned parent so partitioned tables report like plain ones.
+Only tables of the given apps' models are considered.
+"""
+
+import re
+
+from django.apps import apps
+
+INDEXES_SQL = """
+    WITH RECURSIVE leaf(leaf_oid, root_oid) AS (
+        SELECT i.indexrelid, i.indexrelid FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE NOT t.relispartition
+        UNION ALL
+        SELECT inh.inhrelid, leaf.root_oid FROM pg_inherits inh
+        JOIN leaf ON inh.inhparent = leaf.leaf_oid
+    )
+    SELECT t.relname, ic.relname, am.amname, i.indisunique, i.indisprimary,
+        array(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY k(attnum, ord)
+              JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+              ORDER BY k.ord),
+        array(SELECT o.opcname FROM unnest(i.indclass) WITH ORDINALITY k(opc, ord)
+              JOIN pg_opclass o ON o.oid = k.opc ORDER BY k.ord),
+        pg_get_expr(i.indpred, i.indrelid),
+        i.indexprs IS NOT NULL,
+        COALESCE(SUM(s.idx_scan), 0), COALESCE(SUM(pg_relation_size(leaf.leaf_oid)), 0)
+    FROM pg_index i
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_am am ON am.oid = ic.relam
+    JOIN leaf ON leaf.root_oid = i.indexrelid
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = leaf.leaf_oid
+    WHERE NOT t.relispartition AND t.relnamespace = current_schema()::regnamespace
+    GROUP BY t.relname, ic.relname, am.amname, i.indisunique, i.indisprimary,
+        i.indkey, i.indrelid, i.indclass, i.indpred, i.indexprs
+"""
+
+TABLES_SQL = """
+    WITH RECURSIVE leaf(leaf_oid, root_oid) AS (
+        SELECT c.oid, c.oid FROM pg_class c
+        WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+            AND c.relnamespace = current_schema()::regnamespace
+        UNION ALL
+        SELECT inh.inhrelid, leaf.root_oid FROM pg_inherits inh
+        JOIN leaf ON inh.inhparent = leaf.leaf_oid
+    )
+    SELECT root.relname, COALESCE(SUM(s.seq_scan), 0), COALESCE(SUM(s.seq_tup_read), 0),
+        COALESCE(SUM(s.idx_scan), 0), COALESCE(SUM(s.n_live_tup), 0)
+    FROM leaf
+    JOIN pg_class root ON root.oid = leaf.root_oid
+    LEFT JOIN pg_stat_user_tables s ON s.relid = leaf.leaf_oid
+    GROUP BY root.relname
+"""
+
+STATEMENTS_SQL = """
+    SELECT query, calls, mean_exec_time, total_exec_time
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+        AND query ILIKE 'SELECT%%'
+    ORDER BY mean_exec_time DESC
+    LIMIT %s
+"""
+
+# Django quotes every identifier, so filters look like "table"."column" = $1.
+PREDICATE_RE = re.compile(
+    r'"(?P<table>\w+)"\."(?P<column>\w+)"\s*'
+    r"(?P<op>=|<>|<=|>=|<|>|IN\b|IS NULL\b|BETWEEN\b|LIKE\b)",
+    re.IGNORECASE,
+)
+
+
+def model_tables(app_labels):
+    """Map db_table -> model for the concrete models of ``app_labels``."""
+    return {
+        model._meta.db_table: model
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.app_label in app_labels and not model._meta.proxy
+    }
+
+
+def fetch_indexes(cursor, tables):
+    cursor.execute(INDEXES_SQL)
+    return [
+        {
+            "table": table,
+            "name": name,
+            "method": method,
+            "unique": unique or primary,
+            "columns": list(columns),
+            "opclasses": list(opclasses),
+            "predicate": predicate,
+            "expression": expression,
+            "scans": int(scans),
+            "size": int(size),
+        }
+        for (
+            table,
+            name,
+            method,
+            unique,
+            primary,
+            columns,
+            opclasses,
+            predicate,
+            expression,
+            scans,
+            size,
+        ) in cursor.fetchall()
+        if table in tables
+    ]
+
+
+def unused_indexes(indexes):
+    """Non-unique indexes that have never been scanned since stats were reset."""
+    return [index for index in indexes if not index["unique"] and index["scans"] == 0]
+
+
+def _shape(index):
+    return (index["method"], index["predicate"], index["expression"])
+
+
+def duplicate_indexes(indexes):
+    """
+    Return ``[(redundant, covering)]`` pairs: exact duplicates, and B-tree
+    indexes whose columns are a leading prefix of another index on the same
+    table. Unique indexes are never reported as redundant.
+    """
+    pairs = []
+    for index in indexes:
+        if index["unique"] or index["expression"]:
+            continue
+        for other in indexes:
+            if other is index or other["table"] != index["table"]:
+                continue
+            if _shape(other) != _shape(index):
+                continue
+            size = len(index["columns"])
+            if other["columns"][:size] != index["columns"]:
+                continue
+            if other["opclasses"][:size] != index["opclasses"]:
+                # e.g. varchar_pattern_ops indexes serve LIKE, plain ones do not.
+                continue
+            same = len(other["columns"]) == size
+            if same and not other["unique"] and other["name"] > index["name"]:
+                # Report each exact duplicate pair once.
+                continue
+            if index["method"] != "btree" and not same:
+                continue
+            pairs.append((index, other))
+            break
+    return pairs
+
+
+def seq_scan_tables(cursor, tables, min_rows):
+    """Tables with at least ``min_rows`` rows scanned sequentially more often than by index."""
+    cursor.execute(TABLES_SQL)
+    return [
+        {
+            "table": table,
+            "seq_scan": int(seq_scan),
+            "seq_tup_read": int(seq_tup_read),
+            "idx_scan": int(idx_scan),
+            "rows": int(rows),
+        }
+        for table, seq_scan, seq_tup_read, idx_scan, rows in cursor.fetchall()
+        if table in tables and rows >= min_rows and seq_scan > idx_scan
+    ]
+
+
+def has_pg_stat_statements(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    return cursor.fetchone() is not None
+
+
+def filtered_columns(sql):
+    """
+    Return ``{table: [column, ...]}`` for the columns a statement filters on,
+    equality predicates first (they make the best leading index columns).
+    """
+    where = re.split(r"\bWHERE\b", sql, maxsplit=1, flags=re.IGNORECASE)
+    if len(where) < 2:
+        return {}
+    body = re.split(r"\b(ORDER BY|GROUP BY|LIMIT)\b", where[1], flags=re.IGNORECASE)[0]
+    equality, other = {}, {}
+    for match in PREDICATE_RE.finditer(body):
+        target = equality if match["op"].upper() in ("=", "IN") else other
+        columns = target.setdefault(match["table"], [])
+        if match["column"] not in columns:
+            columns.append(match["column"])
+    result = {}
+    for table in {*equality, *other}:
+        columns = list(equality.get(table, []))
+        result[table] = columns + [c for c in other.get(table, []) if c not in columns]
+    return result
+
+
+def candidate_indexes(cursor, tables, indexes, limit):
+    """
+    Suggest indexes for the slowest statements in pg_stat_statements whose
+    filtered columns do not lead any existing index on their table.
+    """
+    leading = {(index["table"], index["columns"][0]) for index in indexes if index["columns"]}
+    cursor.execute(STATEMENTS_SQL, [limit])
+    candidates = {}
+    for query, calls, mean_time, total_time in cursor.fetchall():
+        for table, columns in filtered_columns(query).items():
+            if table not in tables or (table, columns[0]) in leading:
+                continue
+            key = (table, tuple(columns[:3]))
+            candidate = candidates.setdefault(
+                key,
+                {
+                    "table": table,
+                    "columns": list(key[1]),
+                    "calls": 0,
+                    "mean_ms": 0.0,
+                    "total_ms": 0.0,
+                    "query": query,
+                },
+            )
+            candidate["calls"] += calls
+            candidate["mean_ms"] = max(candidate["mean_ms"], mean_time)
+            candidate["total_ms"] += total_time
+    return sorted(candidates.values(), key=lambda c: c["total_ms"], reverse=True)
@@ -0,0 +1,94 @@
+from datetime import UTC, date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from northwind.partitioning import (
+    PARTITION_KEYS,
+    drop_empty_partitions,
+    is_partitioned,
+    table_size,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders placed before a date, with their lines, into Parquet files "
+        "under ORDER_ARCHIVE_DIR and delete them from the hot tables in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            type=date.fromisoformat,
+            required=True,
+            help="Archive orders placed before this date (YYYY-MM-DD, UTC)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Orders per Parquet file and delete transaction (default: 5000)",
+        )
+        parser.add_argument(
+            "--archive-dir", help="Archive location (default: settings.ORDER_ARCHIVE_DIR)"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count what would be archived without writing or deleting",
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="VACUUM (ANALYZE) the order tables after archiving",
+        )
+
+    def handle(self, *args, **options):
+        # Imports pyarrow: only when the command runs, not for --help.
+        from northwind.archive import archive_dir, archive_orders
+
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        before = datetime.combine(options["before"], datetime.min.time(), tzinfo=UTC)
+        path = archive_dir(options["archive_dir"])
+        tables = list(PARTITION_KEYS)
+        sizes = {table: table_size(connection, table) for table in tables}
+
+        total_orders = total_lines = 0
+        for orders, lines in archive_orders(
+            before, options["batch_size"], path, options["dry_run"]
+        ):
+            total_orders += orders
+            total_lines += lines
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {total_orders} orders, {total_lines} lines")
+
+        if options["dry_run"]:
+            self.stdout.write(
+                f"Would archive {total_orders} orders and {total_lines} lines to {path}."
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {total_orders} orders and {total_lines} lines to {path}."
+            )
+        )
+
+        # Months that are now empty are dropped outright, which returns their
+        # space immediately instead of leaving dead tuples for VACUUM.
+        with transaction.atomic():
+            for table in tables:
+                if not is_partitioned(connection, table):
+                    continue
+                for name in drop_empty_partitions(connection, table, options["before"]):
+                    self.stdout.write(self.style.WARNING(f"Dropped empty partition {name}"))
+
+        if options["vacuum"]:
+            with connection.cursor() as cursor:
+                for table in tables:
+                    cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(table)}")
+
+        for table in tables:
+            size = table_size(connection, table)
+            self.stdout.write(f"{table}: {sizes[table] // 1024**2} MB -> {size // 1024**2} MB")
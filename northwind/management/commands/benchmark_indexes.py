@@ -0,0 +1,102 @@
+import json
+import re
+from datetime import timedelta
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from northwind.models import Order, OrderDetail, Product
+from user_accounts.models import NorthWindUser
+
+
+def _latest(model, field):
+    return model.objects.aggregate(value=Max(field))["value"]
+
+
+def benchmark_queries():
+    """
+    Representative queries for the timestamp and hot-predicate indexes.
+    Time windows are anchored on the newest row so imported data works too.
+    """
+    queries = {}
+    latest_created = _latest(Order, "created_at")
+    latest_updated = _latest(Order, "updated_at")
+    if latest_created:
+        queries["orders_created_last_day"] = Order.objects.filter(
+            created_at__gte=latest_created - timedelta(days=1)
+        )
+    if latest_updated:
+        queries["orders_updated_last_hour"] = Order.objects.filter(
+            updated_at__gte=latest_updated - timedelta(hours=1)
+        )
+    latest_line = _latest(OrderDetail, "created_at")
+    if latest_line:
+        queries["lines_created_last_day"] = OrderDetail.objects.filter(
+            created_at__gte=latest_line - timedelta(days=1)
+        )
+    first_required = Order.objects.unshipped().aggregate(value=Min("required_date"))["value"]
+    if first_required:
+        queries["unshipped_due_next_week"] = (
+            Order.objects.unshipped()
+            .filter(required_date__lt=first_required + timedelta(days=7))
+            .order_by("required_date")
+        )
+    queries["low_stock_products"] = Product.objects.low_stock()
+    latest_user = _latest(NorthWindUser, "created_at")
+    if latest_user:
+        queries["users_joined_last_week"] = NorthWindUser.objects.filter(
+            created_at__gte=latest_user - timedelta(days=7)
+        )
+    return queries
+
+
+def _plan_nodes(plan):
+    node = plan["Node Type"]
+    if "Index Name" in plan:
+        # Collapse per-partition index names (..._p202401_...) into one entry.
+        node += " on " + re.sub(r"_p\d{6}", "_p*", plan["Index Name"])
+    nodes = [node]
+    for child in plan.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN ANALYZE on representative timestamp and hot-predicate "
+        "queries; compare the output before and after index migrations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per query (default: 5)"
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Write results as JSON to stdout"
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        results = {}
+        for name, queryset in benchmark_queries().items():
+            timings = []
+            for _ in range(options["repeat"]):
+                plan = json.loads(queryset.explain(format="json", analyze=True))[0]
+                timings.append(plan["Execution Time"])
+            results[name] = {
+                "median_ms": round(median(timings), 3),
+                "rows": plan["Plan"]["Actual Rows"],
+                "plan": sorted(set(_plan_nodes(plan["Plan"]))),
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} {result['median_ms']:>10.3f} ms  "
+                f"rows={result['rows']:<7} {', '.join(result['plan'])}"
+            )
@@ -0,0 +1,173 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations, models
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from northwind.index_advisor import (
+    candidate_indexes,
+    duplicate_indexes,
+    fetch_indexes,
+    has_pg_stat_statements,
+    model_tables,
+    seq_scan_tables,
+    unused_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Report unused and duplicate indexes, sequentially scanned tables and "
+        "candidate indexes for slow queries, from PostgreSQL statistics views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "app_labels",
+            nargs="*",
+            default=["northwind", "user_accounts"],
+            help="Apps whose tables to analyze (default: northwind user_accounts)",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Ignore tables smaller than this in the seq scan report (default: 10000)",
+        )
+        parser.add_argument(
+            "--statements",
+            type=int,
+            default=50,
+            help="Number of slowest pg_stat_statements entries to analyze (default: 50)",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Write the report as JSON to stdout"
+        )
+        parser.add_argument(
+            "--emit-migration",
+            metavar="DIR",
+            help="Write a draft migration per app into DIR for review",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("db_index_report requires PostgreSQL")
+
+        tables = model_tables(options["app_labels"])
+        if not tables:
+            raise CommandError(f"No models found for {', '.join(options['app_labels'])}")
+
+        with connection.cursor() as cursor:
+            indexes = fetch_indexes(cursor, tables)
+            report = {
+                "unused": unused_indexes(indexes),
+                "duplicates": [
+                    {**redundant, "covered_by": covering["name"]}
+                    for redundant, covering in duplicate_indexes(indexes)
+                ],
+                "seq_scans": seq_scan_tables(cursor, tables, options["min_rows"]),
+                "candidates": [],
+                "pg_stat_statements": has_pg_stat_statements(cursor),
+            }
+            if report["pg_stat_statements"]:
+                report["candidates"] = candidate_indexes(
+                    cursor, tables, indexes, options["statements"]
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+        else:
+            self.write_report(report)
+
+        if options["emit_migration"]:
+            self.emit_migrations(report, tables, Path(options["emit_migration"]))
+
+    def write_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING("Unused indexes (idx_scan = 0):"))
+        for index in report["unused"]:
+            self.stdout.write(
+                f"  {index['table']}.{index['name']} "
+                f"({', '.join(index['columns'])}) {index['size'] // 1024} kB"
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING("Duplicate / redundant indexes:"))
+        for index in report["duplicates"]:
+            self.stdout.write(
+                f"  {index['table']}.{index['name']} ({', '.join(index['columns'])}) "
+                f"covered by {index['covered_by']}"
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING("Tables read mostly by seq scan:"))
+        for table in report["seq_scans"]:
+            self.stdout.write(
+                f"  {table['table']}: {table['seq_scan']} seq scans "
+                f"({table['seq_tup_read']} rows read) vs {table['idx_scan']} index scans, "
+                f"{table['rows']} rows"
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING("Candidate indexes for slow queries:"))
+        if not report["pg_stat_statements"]:
+            self.stdout.write(
+                self.style.WARNING("  pg_stat_statements is not installed; skipped.")
+            )
+        for candidate in report["candidates"]:
+            self.stdout.write(
+                f"  {candidate['table']} ({', '.join(candidate['columns'])}): "
+                f"{candidate['calls']} calls, {candidate['mean_ms']:.2f} ms mean"
+            )
+
+    def emit_migrations(self, report, tables, directory):
+        """
+        Write one draft migration per app: RemoveIndex for unused/duplicate
+        indexes declared in Meta.indexes, AddIndex for candidates. Indexes
+        Django creates implicitly (db_index, ForeignKey) are listed as comments
+        because they are removed by changing the field instead.
+        """
+        operations, manual = {}, {}
+        removable = {index["name"]: index for index in report["unused"]}
+        removable.update({index["name"]: index for index in report["duplicates"]})
+        for name, index in removable.items():
+            model = tables[index["table"]]
+            app_label = model._meta.app_label
+            if any(declared.name == name for declared in model._meta.indexes):
+                operations.setdefault(app_label, []).append(
+                    migrations.RemoveIndex(model_name=model._meta.model_name, name=name)
+                )
+            else:
+                manual.setdefault(app_label, []).append(
+                    f"{model.__name__}: drop {name} ({', '.join(index['columns'])})"
+                )
+        for candidate in report["candidates"]:
+            model = tables[candidate["table"]]
+            fields = {f.column: f.name for f in model._meta.concrete_fields}
+            if not all(column in fields for column in candidate["columns"]):
+                continue
+            index = models.Index(fields=[fields[c] for c in candidate["columns"]])
+            index.set_name_with_model(model)
+            operations.setdefault(model._meta.app_label, []).append(
+                migrations.AddIndex(model_name=model._meta.model_name, index=index)
+            )
+
+        if not operations and not manual:
+            self.stdout.write("No index changes to draft.")
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        graph = MigrationLoader(None, ignore_no_migrations=True).graph
+        for app_label in sorted({*operations, *manual}):
+            leaves = graph.leaf_nodes(app_label)
+            number = max(
+                (MigrationAutodetector.parse_number(name) or 0 for _, name in leaves),
+                default=0,
+            )
+            migration = migrations.Migration(f"{number + 1:04d}_index_report_draft", app_label)
+            migration.dependencies = leaves
+            migration.operations = operations.get(app_label, [])
+            header = "".join(f"# TODO: {note}\n" for note in manual.get(app_label, []))
+            path = directory / f"{app_label}_{migration.name}.py"
+            path.write_text(
+                "# Draft generated by db_index_report. Review it, then mirror the\n"
+                "# changes in the models' Meta.indexes before moving it into place.\n"
+                + header
+                + MigrationWriter(migration).as_string()
+            )
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
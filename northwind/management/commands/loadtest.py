@@ -0,0 +1,99 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from _config.loadtest import SCENARIOS, SetupFailed, load_scenario, run
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the app in this process (WSGI or ASGI) or a running server, "
+        "and print throughput, p50/p95/p99 latency and error rate as JSON. "
+        f"Built-in scenarios: {', '.join(SCENARIOS)}; or pass a JSON scenario file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenario", help="Built-in scenario name or path to a JSON scenario file"
+        )
+        parser.add_argument(
+            "--interface",
+            choices=["wsgi", "asgi"],
+            default="wsgi",
+            help="In-process application to drive (default: wsgi)",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server to load instead, e.g. http://127.0.0.1:8000",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=10, help="Virtual users (default: 10)"
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10.0,
+            help="Seconds to run for (default: 10)",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            help="Stop each virtual user after this many passes over the steps",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header of in-process requests (default: localhost)",
+        )
+        parser.add_argument(
+            "--email",
+            default=os.environ.get("LOADTEST_EMAIL", ""),
+            help="Login for {email} in scenarios (default: $LOADTEST_EMAIL)",
+        )
+        parser.add_argument(
+            "--var",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="Extra scenario variable; repeatable. {password} comes from "
+            "$LOADTEST_PASSWORD",
+        )
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        try:
+            scenario = load_scenario(options["scenario"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot load scenario {options['scenario']!r}: {e}")
+        variables = {
+            "email": options["email"],
+            "password": os.environ.get("LOADTEST_PASSWORD", ""),
+        }
+        for assignment in options["var"]:
+            name, sep, value = assignment.partition("=")
+            if not sep:
+                raise CommandError(f"--var expects NAME=VALUE, got {assignment!r}")
+            variables[name] = value
+
+        try:
+            report = run(
+                scenario,
+                interface="http" if options["url"] else options["interface"],
+                url=options["url"],
+                concurrency=options["concurrency"],
+                duration=options["duration"],
+                iterations=options["iterations"],
+                host=options["host"],
+                variables=variables,
+            )
+        except SetupFailed as e:
+            raise CommandError(str(e))
+        report["scenario"] = options["scenario"]
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
@@ -0,0 +1,69 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from northwind.partitioning import (
+    PARTITION_KEYS,
+    create_partition,
+    detach_partition,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    next_month,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create monthly partitions of the order tables ahead of time and "
+        "detach (archive) partitions older than a cutoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future months to create partitions for (default: 3)",
+        )
+        parser.add_argument(
+            "--detach-before",
+            type=date.fromisoformat,
+            help="Detach partitions for months entirely before this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of keeping them as plain tables",
+        )
+
+    def handle(self, *args, **options):
+        for table in PARTITION_KEYS:
+            if not is_partitioned(connection, table):
+                raise CommandError(f"Table {table} is not partitioned")
+
+        with transaction.atomic():
+            # Partitions are UTC months.
+            month = month_start(timezone.now().date())
+            for _ in range(options["months_ahead"] + 1):
+                for table in PARTITION_KEYS:
+                    if create_partition(connection, table, month):
+                        self.stdout.write(
+                            self.style.SUCCESS(f"Created {table} partition for {month:%Y-%m}")
+                        )
+                month = next_month(month)
+
+            cutoff = options["detach_before"]
+            if cutoff:
+                # Lines and their orders share a month, so detach both together.
+                for table in PARTITION_KEYS:
+                    for name, month in list_partitions(connection, table):
+                        if next_month(month) > cutoff:
+                            continue
+                        detach_partition(connection, table, month, drop=options["drop"])
+                        action = "Dropped" if options["drop"] else "Detached"
+                        self.stdout.write(self.style.WARNING(f"{action} {name}"))
+
+        self.stdout.write(self.style.SUCCESS("Partition maintenance completed."))
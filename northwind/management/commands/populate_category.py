@@ -2,6 +2,7 @@ import csv
 
 from django.core.management.base import BaseCommand, CommandError
 
+from _config.metrics import import_job
 from northwind.models import Category
 
 
@@ -16,10 +17,13 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         csv_filepath = kwargs["csv_filepath"]
         try:
-            with open(csv_filepath, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_filepath, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_category") as job,
+            ):
                 reader = csv.DictReader(csvfile, delimiter="|")
-                count = 0
-                for row in reader:
+                categories = []
+                for row in job.rows_from(reader):
                     category_id = row.get("category_id")
                     category_name = row.get("category_name")
                     description = row.get("description", "")
@@ -30,19 +34,26 @@ class Command(BaseCommand):
                                 f"Skipping row with missing category_name: {row}"
                             )
                         )
+                        job.error("missing category_name")
                         continue
 
-                    # Create or update the category
-                    category, created = Category.objects.update_or_create(
-                        category_id=category_id,
-                        defaults={
-                            "category_name": category_name,
-                            "description": description,
-                        },
+                    categories.append(
+                        Category(
+                            category_id=category_id,
+                            category_name=category_name,
+                            description=description,
+                        )
+                    )
+                # Create or update the categories
+                with job.batch(len(categories)):
+                    created, updated = Category.objects.bulk_upsert(
+                        categories, unique_fields=["category_id"]
                     )
-                    count += 1
                 self.stdout.write(
-                    self.style.SUCCESS(f"Successfully imported {count} categories.")
+                    self.style.SUCCESS(
+                        f"Successfully imported {len(categories)} categories "
+                        f"({created} created, {updated} updated)."
+                    )
                 )
         except FileNotFoundError:
             raise CommandError(f"File not found: {csv_filepath}")
@@ -5,6 +5,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from _config.metrics import import_job
 from northwind.models import Order, OrderDetail, Product
 
 
@@ -24,18 +25,23 @@ class Command(BaseCommand):
         self.stdout.write(self.style.NOTICE(f"📄 Reading file: {csv_file}"))
 
         try:
-            with open(csv_file, newline="", encoding="utf-8") as f:
+            with (
+                open(csv_file, newline="", encoding="utf-8") as f,
+                import_job("populate_order_details") as job,
+            ):
                 reader = csv.DictReader(f, delimiter="|")
 
                 created_count = 0
                 skipped_count = 0
                 error_types = Counter()
+                pending = []
 
                 with transaction.atomic():
-                    for i, row in enumerate(reader, start=2):
+                    self.job = job
+                    for i, row in enumerate(job.rows_from(reader), start=2):
                         try:
-                            order = self.get_order(row.get("order_id"))
-                            product = self.get_product(row.get("product_id"))
+                            order_id = self.parse_id(row.get("order_id"), "order_id")
+                            product_id = self.parse_id(row.get("product_id"), "product_id")
 
                             unit_price = self.safe_decimal(row.get("unit_price"))
                             quantity = self.safe_int(row.get("quantity"))
@@ -53,24 +59,32 @@ class Command(BaseCommand):
                             if not (0 <= discount <= 1):
                                 raise ValueError(f"Invalid discount: {discount}")
 
-                            OrderDetail.objects.create(
-                                order=order,
-                                product=product,
-                                unit_price=unit_price,
-                                quantity=quantity,
-                                discount=discount,
+                            pending.append(
+                                (
+                                    i,
+                                    row,
+                                    OrderDetail(
+                                        order_id=order_id,
+                                        product_id=product_id,
+                                        unit_price=unit_price,
+                                        quantity=quantity,
+                                        discount=discount,
+                                    ),
+                                )
                             )
-                            created_count += 1
 
                         except Exception as e:
+                            self.report_error(i, row, e, error_types)
                             skipped_count += 1
-                            error_types[type(e).__name__] += 1
-                            self.stderr.write(
-                                self.style.WARNING(
-                                    f"⚠️ Line {i}: Failed to import order detail "
-                                    f"(order_id={row.get('order_id', '?')}, product_id={row.get('product_id', '?')}) — {e}"
-                                )
-                            )
+
+                        if len(pending) >= self.batch_size:
+                            created, skipped = self.flush(pending, error_types)
+                            created_count += created
+                            skipped_count += skipped
+                            pending = []
+                    created, skipped = self.flush(pending, error_types)
+                    created_count += created
+                    skipped_count += skipped
 
                 # Summary
                 self.stdout.write(self.style.SUCCESS("✅ Import completed"))
@@ -88,21 +102,54 @@ class Command(BaseCommand):
 
     # --- Helper methods ---
 
-    def get_order(self, order_id):
-        if not order_id or str(order_id).strip().upper() in {"NULL", "NONE", ""}:
-            raise ValueError("Missing order_id")
-        try:
-            return Order.objects.get(pk=int(order_id))
-        except (Order.DoesNotExist, ValueError):
-            raise ValueError(f"Order not found (id={order_id})")
+    batch_size = 5000
+
+    def flush(self, pending, error_types):
+        """
+        Check a batch of parsed lines against existing orders and products
+        with one query each, then create the valid ones with default prices
+        resolved in bulk. Returns ``(created, skipped)``.
+        """
+        with self.job.batch(len(pending)):
+            order_ids = {line.order_id for _, _, line in pending}
+            product_ids = {line.product_id for _, _, line in pending}
+            orders = Order.objects.only("order_id", "orderdate").in_bulk(order_ids)
+            products = Product.objects.only("product_id", "unit_price").in_bulk(product_ids)
+
+            lines = []
+            for i, row, line in pending:
+                if line.order_id not in orders:
+                    error = ValueError(f"Order not found (id={line.order_id})")
+                elif line.product_id not in products:
+                    error = ValueError(f"Product not found (id={line.product_id})")
+                else:
+                    line.order = orders[line.order_id]
+                    line.product = products[line.product_id]
+                    lines.append(line)
+                    continue
+                self.report_error(i, row, error, error_types)
+
+            OrderDetail.objects.bulk_create_lines(lines)
+            return len(lines), len(pending) - len(lines)
+
+    def report_error(self, i, row, error, error_types):
+        error_types[type(error).__name__] += 1
+        self.job.error(error)
+        self.stderr.write(
+            self.style.WARNING(
+                f"⚠️ Line {i}: Failed to import order detail "
+                f"(order_id={row.get('order_id', '?')}, "
+                f"product_id={row.get('product_id', '?')}) — {error}"
+            )
+        )
 
-    def get_product(self, product_id):
-        if not product_id or str(product_id).strip().upper() in {"NULL", "NONE", ""}:
-            raise ValueError("Missing product_id")
+    def parse_id(self, value, name):
+        if not value or str(value).strip().upper() in {"NULL", "NONE", ""}:
+            raise ValueError(f"Missing {name}")
         try:
-            return Product.objects.get(pk=int(product_id))
-        except (Product.DoesNotExist, ValueError):
-            raise ValueError(f"Product not found (id={product_id})")
+            return int(value)
+        except ValueError:
+            raise ValueError(f"Invalid {name}: '{value}'")
 
     def safe_int(self, value):
         if not value or str(value).strip().upper() in {"NULL", "NONE", ""}:
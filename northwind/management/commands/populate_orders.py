@@ -4,9 +4,13 @@ from datetime import datetime
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
 
+from _config.metrics import import_job
+from _config.reference_cache import reference_cache
 from northwind.models import Order, Shipper
+from northwind.partitioning import is_partitioned
 from user_accounts.models import CustomerContact, Employee
 
 
@@ -26,17 +30,21 @@ class Command(BaseCommand):
         self.stdout.write(self.style.NOTICE(f"📄 Reading file: {csv_file}"))
 
         try:
-            with open(csv_file, newline="", encoding="utf-8") as f:
+            with (
+                open(csv_file, newline="", encoding="utf-8") as f,
+                import_job("populate_orders") as job,
+            ):
                 reader = csv.DictReader(f, delimiter=",")
+                # line number (header = 1)
+                rows = list(enumerate(job.rows_from(reader), start=2))
+                self.load_references(rows)
 
-                created_count = 0
+                orders = []
                 skipped_count = 0
                 error_types = Counter()
 
                 with transaction.atomic():
-                    for i, row in enumerate(
-                        reader, start=2
-                    ):  # line number (header = 1)
+                    for i, row in rows:
                         try:
                             order_id = self.safe_int(row.get("order_id"))
                             if not order_id:
@@ -52,42 +60,50 @@ class Command(BaseCommand):
 
                             freight = self.safe_decimal(row.get("freight"))
 
-                            Order.objects.update_or_create(
-                                order_id=order_id,
-                                defaults={
-                                    "customer": customer,
-                                    "employee": employee,
-                                    "orderdate": order_date,
-                                    "required_date": required_date,
-                                    "shipped_date": shipped_date,
-                                    "ship_via": shipper,
-                                    "freight": freight,
-                                    "ship_name": row.get("ship_name", ""),
-                                    "ship_address": row.get("ship_address", ""),
-                                    "ship_city": row.get("ship_city", ""),
-                                    "ship_region": row.get("ship_region", ""),
-                                    "ship_postal_code": row.get("ship_postal_code", ""),
-                                    "ship_country": row.get("ship_country", ""),
-                                },
+                            orders.append(
+                                Order(
+                                    order_id=order_id,
+                                    customer=customer,
+                                    employee=employee,
+                                    orderdate=order_date,
+                                    required_date=required_date,
+                                    shipped_date=shipped_date,
+                                    ship_via=shipper,
+                                    freight=freight,
+                                    ship_name=row.get("ship_name", ""),
+                                    ship_address=row.get("ship_address", ""),
+                                    ship_city=row.get("ship_city", ""),
+                                    ship_region=row.get("ship_region", ""),
+                                    ship_postal_code=row.get("ship_postal_code", ""),
+                                    ship_country=row.get("ship_country", ""),
+                                )
                             )
 
-                            created_count += 1
-
                         except Exception as e:
                             skipped_count += 1
                             error_type = type(e).__name__
                             error_types[error_type] += 1
+                            job.error(error_type)
                             self.stderr.write(
                                 self.style.WARNING(
                                     f"⚠️ Line {i}: Failed to import order (order_id={row.get('order_id', '?')}) — {e}"
                                 )
                             )
 
+                    # On the partitioned table the order key includes orderdate.
+                    unique_fields = ["order_id"]
+                    with job.batch(len(orders)):
+                        if is_partitioned(connection, Order._meta.db_table):
+                            unique_fields.append("orderdate")
+                            Order.objects.sync_orderdates(orders)
+                        created_count, updated_count = Order.objects.bulk_upsert(
+                            orders, unique_fields=unique_fields
+                        )
+
                 # --- Summary ---
                 self.stdout.write(self.style.SUCCESS("✅ Import completed"))
-                self.stdout.write(
-                    self.style.SUCCESS(f"Created/updated: {created_count}")
-                )
+                self.stdout.write(self.style.SUCCESS(f"Created: {created_count}"))
+                self.stdout.write(self.style.SUCCESS(f"Updated: {updated_count}"))
                 self.stdout.write(self.style.WARNING(f"Skipped: {skipped_count}"))
                 if skipped_count > 0:
                     self.stdout.write("Error breakdown:")
@@ -107,7 +123,7 @@ class Command(BaseCommand):
             return None
         for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S"):
             try:
-                return datetime.strptime(date_str.strip(), fmt)
+                return timezone.make_aware(datetime.strptime(date_str.strip(), fmt))
             except ValueError:
                 continue
         raise ValueError(f"Invalid date format: '{date_str}'")
@@ -130,26 +146,38 @@ class Command(BaseCommand):
         except Exception:
             raise ValueError(f"Invalid decimal value: '{value}'")
 
+    def load_references(self, rows):
+        """Fetch the customers and employees ``rows`` refer to, one query each."""
+        customer_ids = {row.get("customer_id") for _, row in rows}
+        employee_ids = {row.get("employee_id") or "" for _, row in rows}
+        self.customers = CustomerContact.objects.in_bulk(
+            [pk for pk in customer_ids if pk and pk.strip().upper() not in {"NULL", "NONE"}]
+        )
+        self.employees = Employee.objects.in_bulk(
+            [int(pk) for pk in employee_ids if pk.strip().isdigit()]
+        )
+
     def get_customer(self, customer_id):
         if not customer_id or str(customer_id).strip().upper() in {"NULL", "NONE", ""}:
             return None
         try:
-            return CustomerContact.objects.get(pk=customer_id)
-        except CustomerContact.DoesNotExist:
+            return self.customers[customer_id]
+        except KeyError:
             raise ValueError(f"CustomerContact not found (id={customer_id})")
 
     def get_employee(self, employee_id):
-        if not employee_id or str(employee_id).strip().upper() in {"NULL", "NONE", ""}:
+        employee_id = self.safe_int(employee_id)
+        if employee_id is None:
             return None
         try:
-            return Employee.objects.get(pk=employee_id)
-        except Employee.DoesNotExist:
+            return self.employees[employee_id]
+        except KeyError:
             raise ValueError(f"Employee not found (id={employee_id})")
 
     def get_shipper(self, shipper_id):
         if not shipper_id or str(shipper_id).strip().upper() in {"NULL", "NONE", ""}:
             return None
         try:
-            return Shipper.objects.get(pk=shipper_id)
+            return reference_cache(Shipper).get_by_id(shipper_id)
         except Shipper.DoesNotExist:
             raise ValueError(f"Shipper not found (id={shipper_id})")
@@ -3,6 +3,8 @@ import csv
 from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Q
 
+from _config.metrics import import_job
+from _config.reference_cache import reference_cache
 from northwind.models import Category, Product, Supplier
 
 
@@ -17,10 +19,15 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         csv_filepath = kwargs["csv_filepath"]
         try:
-            with open(csv_filepath, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_filepath, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_products") as job,
+            ):
                 reader = csv.DictReader(csvfile, delimiter="|")
-                count = 0
-                for row in reader:
+                suppliers = {s.pk: s for s in reference_cache(Supplier).all()}
+                categories = {c.pk: c for c in reference_cache(Category).all()}
+                products = []
+                for row in job.rows_from(reader):
                     product_id = row.get("product_id")
                     product_name = row.get("product_name")
                     supplier_id = row.get("supplier_id")
@@ -39,6 +46,7 @@ class Command(BaseCommand):
                                 f"Skipping row with missing product_name: {row}"
                             )
                         )
+                        job.error("missing product_name")
                         continue
 
                     # Parse decimal
@@ -67,36 +75,33 @@ class Command(BaseCommand):
                     discontinued = discontinued_str.lower() in ["true", "1", "yes"]
 
                     # Get related Supplier and Category
-                    supplier = None
-                    if supplier_id:
-                        supplier = Supplier.objects.filter(
-                            supplier_id=supplier_id
-                        ).first()
+                    supplier = suppliers.get(int(supplier_id)) if supplier_id else None
+                    category = categories.get(int(category_id)) if category_id else None
 
-                    category = None
-                    if category_id:
-                        category = Category.objects.filter(
-                            category_id=category_id
-                        ).first()
-
-                    # Update or create product
-                    product, created = Product.objects.update_or_create(
-                        product_id=product_id,
-                        defaults={
-                            "product_name": product_name,
-                            "supplier": supplier,
-                            "category": category,
-                            "quantity_per_unit": quantity_per_unit,
-                            "unit_price": unit_price_value,
-                            "units_in_stock": units_in_stock_val,
-                            "units_on_order": units_on_order_val,
-                            "reorder_level": reorder_level_val,
-                            "discontinued": discontinued,
-                        },
+                    products.append(
+                        Product(
+                            product_id=product_id,
+                            product_name=product_name,
+                            supplier=supplier,
+                            category=category,
+                            quantity_per_unit=quantity_per_unit,
+                            unit_price=unit_price_value,
+                            units_in_stock=units_in_stock_val,
+                            units_on_order=units_on_order_val,
+                            reorder_level=reorder_level_val,
+                            discontinued=discontinued,
+                        )
+                    )
+                # Update or create products
+                with job.batch(len(products)):
+                    created, updated = Product.objects.bulk_upsert(
+                        products, unique_fields=["product_id"]
                     )
-                    count += 1
                 self.stdout.write(
-                    self.style.SUCCESS(f"Successfully imported {count} products.")
+                    self.style.SUCCESS(
+                        f"Successfully imported {len(products)} products "
+                        f"({created} created, {updated} updated)."
+                    )
                 )
         except FileNotFoundError:
             raise CommandError(f"File not found: {csv_filepath}")
@@ -2,6 +2,7 @@ import csv
 
 from django.core.management.base import BaseCommand, CommandError
 
+from _config.metrics import import_job
 from northwind.models import Shipper
 
 
@@ -16,10 +17,13 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         csv_filepath = kwargs["csv_filepath"]
         try:
-            with open(csv_filepath, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_filepath, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_shippers") as job,
+            ):
                 reader = csv.DictReader(csvfile, delimiter="|")
-                count = 0
-                for row in reader:
+                shippers = []
+                for row in job.rows_from(reader):
                     shipper_id = row.get("shipper_id")
                     company_name = row.get("company_name")
                     phone = row.get("phone", "")
@@ -30,19 +34,22 @@ class Command(BaseCommand):
                                 f"Skipping row with missing company_name: {row}"
                             )
                         )
+                        job.error("missing company_name")
                         continue
 
-                    # Create or update the Shipper
-                    shipper, created = Shipper.objects.update_or_create(
-                        shipper_id=shipper_id,
-                        defaults={
-                            "company_name": company_name,
-                            "phone": phone,
-                        },
+                    shippers.append(
+                        Shipper(shipper_id=shipper_id, company_name=company_name, phone=phone)
+                    )
+                # Create or update the Shippers
+                with job.batch(len(shippers)):
+                    created, updated = Shipper.objects.bulk_upsert(
+                        shippers, unique_fields=["shipper_id"]
                     )
-                    count += 1
                 self.stdout.write(
-                    self.style.SUCCESS(f"Successfully imported {count} shippers.")
+                    self.style.SUCCESS(
+                        f"Successfully imported {len(shippers)} shippers "
+                        f"({created} created, {updated} updated)."
+                    )
                 )
         except FileNotFoundError:
             raise CommandError(f"File not found: {csv_filepath}")
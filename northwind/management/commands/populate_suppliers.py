@@ -2,6 +2,7 @@ import csv
 
 from django.core.management.base import BaseCommand, CommandError
 
+from _config.metrics import import_job
 from northwind.models import Supplier
 
 
@@ -16,10 +17,13 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         csv_filepath = kwargs["csv_filepath"]
         try:
-            with open(csv_filepath, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_filepath, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_suppliers") as job,
+            ):
                 reader = csv.DictReader(csvfile, delimiter="|")
-                count = 0
-                for row in reader:
+                suppliers = []
+                for row in job.rows_from(reader):
                     supplier_id = row.get("supplier_id")
                     company_name = row.get("company_name")
                     contact_name = row.get("contact_name", "")
@@ -37,26 +41,33 @@ class Command(BaseCommand):
                                 f"Skipping row with missing company_name: {row}"
                             )
                         )
+                        job.error("missing company_name")
                         continue
 
-                    # Create or update the supplier
-                    supplier, created = Supplier.objects.update_or_create(
-                        supplier_id=supplier_id,
-                        defaults={
-                            "company_name": company_name,
-                            "contact_name": contact_name,
-                            "contact_title": contact_title,
-                            "address": address,
-                            "city": city,
-                            "region": region,
-                            "postal_code": postal_code,
-                            "country": country,
-                            "phone": phone,
-                        },
+                    suppliers.append(
+                        Supplier(
+                            supplier_id=supplier_id,
+                            company_name=company_name,
+                            contact_name=contact_name,
+                            contact_title=contact_title,
+                            address=address,
+                            city=city,
+                            region=region,
+                            postal_code=postal_code,
+                            country=country,
+                            phone=phone,
+                        )
+                    )
+                # Create or update the suppliers
+                with job.batch(len(suppliers)):
+                    created, updated = Supplier.objects.bulk_upsert(
+                        suppliers, unique_fields=["supplier_id"]
                     )
-                    count += 1
                 self.stdout.write(
-                    self.style.SUCCESS(f"Successfully imported {count} suppliers.")
+                    self.style.SUCCESS(
+                        f"Successfully imported {len(suppliers)} suppliers "
+                        f"({created} created, {updated} updated)."
+                    )
                 )
         except FileNotFoundError:
             raise CommandError(f"File not found: {csv_filepath}")
@@ -0,0 +1,53 @@
+import argparse
+import json
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from _config.nplusone import detect_n_plus_one, handle_findings
+from _config.profiling import log_if_slow, profile_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Run another management command and report its SQL: query count, total "
+        "database time, the slowest statements with the lines that ran them and "
+        "any N+1 query patterns (as NPLUSONE_DETECTION says). "
+        "Usage: manage.py profile_command [--top N] [--json] <command> [args ...]"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=settings.SQL_PROFILE_TOP_N,
+            help=f"Slowest statements to list (default: {settings.SQL_PROFILE_TOP_N})",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as one JSON object"
+        )
+        parser.add_argument("command_name", help="Command to profile")
+        parser.add_argument(
+            "command_args", nargs=argparse.REMAINDER, help="Its arguments and options"
+        )
+
+    def handle(self, *args, **options):
+        name, command_args = options["command_name"], options["command_args"]
+        label = " ".join([name, *command_args])
+        with profile_queries("command", label) as profile, detect_n_plus_one(label) as n1:
+            call_command(name, *command_args)
+        log_if_slow(profile)
+        handle_findings(n1)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(profile.summary()))
+            return
+        self.stdout.write(
+            f"{profile.label}: {len(profile.queries)} queries, "
+            f"{profile.db_time * 1000:.1f} ms in the database, "
+            f"{profile.duration * 1000:.1f} ms total"
+        )
+        for duration, alias, sql, site in profile.slowest(options["top"]):
+            self.stdout.write(f"  {duration * 1000:8.1f} ms  [{alias}] {site}")
+            self.stdout.write(f"             {sql[:200]}")
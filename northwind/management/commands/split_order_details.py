@@ -1,5 +1,4 @@
 import djclick as click
-import pandas as pd
 
 
 @click.command()
@@ -10,6 +9,8 @@ import pandas as pd
 )
 @click.option("--rows_per_file", default=100000, help="chunksize/rows_per_file")
 def command(file, rows_per_file, output_prefix="output_chunk"):
+    import pandas as pd  # slow to import: only when the command runs, not for --help
+
     df_iterator = pd.read_csv(file, chunksize=rows_per_file)
 
     for i, chunk in enumerate(df_iterator):
@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from northwind.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the outbox table in batches and write each event as a JSON line. "
+        "Several drainers can run at once; each claims different rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Events claimed per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Append events to this file instead of writing them to stdout",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep polling for new events instead of exiting once drained",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds between polls of an empty outbox with --follow (default: 1)",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        output = open(options["output"], "a") if options["output"] else self.stdout
+        total = 0
+        try:
+            while True:
+                drained = self.drain_batch(output, options["batch_size"])
+                total += drained
+                if drained:
+                    continue
+                if not options["follow"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if options["output"]:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f"Streamed {total} events."))
+
+    def drain_batch(self, output, batch_size):
+        """
+        Claim up to ``batch_size`` events no other drainer holds, write them
+        and delete them in one transaction. Events are flushed to disk
+        before the delete commits, so a crash can repeat a batch but never
+        lose one (at-least-once delivery; consumers dedupe on ``id``).
+        """
+        with transaction.atomic():
+            claimable = OutboxEvent.objects.select_for_update(skip_locked=True)
+            events = list(claimable.order_by("id")[:batch_size])
+            if not events:
+                return 0
+            for event in events:
+                output.write(
+                    json.dumps(
+                        {
+                            "id": event.pk,
+                            "created_at": event.created_at.isoformat(),
+                            "table": event.table_name,
+                            "operation": event.operation,
+                            "object_id": event.object_id,
+                            "payload": event.payload,
+                        }
+                    )
+                    + "\n"
+                )
+            output.flush()
+            if output is not self.stdout:
+                os.fsync(output.fileno())
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+        return len(events)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from northwind.partitioning import partition_table
+
+
+def partition_order_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    partition_table(schema_editor, "northwind_order")
+    partition_table(schema_editor, "order_detail")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('northwind', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdetail',
+            name='order_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Order Date'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE order_detail d SET order_date = o.orderdate
+                FROM northwind_order o WHERE o.order_id = d.order_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='orderdetail',
+            name='order',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='order_details', to='northwind.order', verbose_name='Order'),
+        ),
+        migrations.RunPython(partition_order_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:14
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('northwind', '0002_partition_orders_by_date'),
+        ('user_accounts', '0002_remove_northwinduser_custom_id'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderdetail',
+            name='order_detai_order_i_88295a_idx',
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='orderdate',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Order Date'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='shipped_date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Shipped Date'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('shipped_date__isnull', True)), fields=['required_date'], name='order_unshipped_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='order_created_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['updated_at'], name='order_updated_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetail',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='order_detail_created_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdetail',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['updated_at'], name='order_detail_updated_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('discontinued', False), ('units_in_stock__lte', models.F('reorder_level'))), fields=['units_in_stock'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('northwind', '0003_timestamp_brin_and_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Idempotency Key')),
+                ('payload_hash', models.CharField(max_length=64, verbose_name='Payload Hash')),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='idempotency_keys', to='northwind.order', verbose_name='Order')),
+            ],
+            options={
+                'verbose_name': 'Order Idempotency Key',
+                'verbose_name_plural': 'Order Idempotency Keys',
+                'db_table': 'order_idempotency_key',
+            },
+        ),
+    ]
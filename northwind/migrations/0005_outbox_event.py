@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:35
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+from northwind.outbox import install_outbox_triggers, remove_outbox_triggers
+
+
+def install_triggers(apps, schema_editor):
+    install_outbox_triggers(schema_editor)
+
+
+def remove_triggers(apps, schema_editor):
+    remove_outbox_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('northwind', '0004_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Created At')),
+                ('table_name', models.CharField(max_length=63, verbose_name='Table')),
+                ('operation', models.CharField(max_length=6, verbose_name='Operation')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object ID')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+                'db_table': 'outbox_event',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(install_triggers, remove_triggers),
+    ]
+
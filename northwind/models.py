@@ -1,12 +1,28 @@
 # northwind.models.py
+from decimal import Decimal
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Now
 from django.utils.translation import gettext_lazy as _
 
-from _config.helpers import TimeStampedModel
+from _config.helpers import TimeStampedModel, TimeStampedQuerySet, timestamp_brin_indexes
+from _config.invalidation import invalidate, invalidate_rows
 from user_accounts.models import CustomerContact, Employee
 
 
+def line_total_expression(prefix=""):
+    """
+    Database expression for an order line total after discount.
+    Pass ``prefix`` (e.g. "order_details__") to use it across a relation.
+    """
+    return ExpressionWrapper(
+        F(f"{prefix}unit_price") * F(f"{prefix}quantity") * (1 - F(f"{prefix}discount")),
+        output_field=DecimalField(max_digits=14, decimal_places=4),
+    )
+
+
 class Category(TimeStampedModel):
     category_id = models.AutoField(primary_key=True)
     category_name = models.CharField(_("Category Name"), max_length=255, db_index=True)
@@ -56,6 +72,12 @@ class Supplier(TimeStampedModel):
         return self.company_name
 
 
+class ProductQuerySet(TimeStampedQuerySet):
+    def low_stock(self):
+        """Active products at or below their reorder level (matches product_low_stock_idx)."""
+        return self.filter(discontinued=False, units_in_stock__lte=F("reorder_level"))
+
+
 class Product(TimeStampedModel):
     product_id = models.AutoField(primary_key=True)
     product_name = models.CharField(_("Product Name"), max_length=255, db_index=True)
@@ -75,9 +97,7 @@ class Product(TimeStampedModel):
         related_name="products",
         verbose_name=_("Category"),
     )
-    quantity_per_unit = models.CharField(
-        _("Quantity Per Unit"), max_length=100, blank=True
-    )
+    quantity_per_unit = models.CharField(_("Quantity Per Unit"), max_length=100, blank=True)
     unit_price = models.DecimalField(
         _("Unit Price"),
         max_digits=10,
@@ -97,6 +117,8 @@ class Product(TimeStampedModel):
     )
     discontinued = models.BooleanField(_("Discontinued"), default=False)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Product")
         verbose_name_plural = _("Products")
@@ -104,6 +126,12 @@ class Product(TimeStampedModel):
         indexes = [
             models.Index(fields=["product_name"]),
             models.Index(fields=["category", "discontinued"]),
+            models.Index(
+                fields=["units_in_stock"],
+                name="product_low_stock_idx",
+                condition=models.Q(discontinued=False)
+                & models.Q(units_in_stock__lte=F("reorder_level")),
+            ),
         ]
 
     def __str__(self):
@@ -120,6 +148,43 @@ class Product(TimeStampedModel):
         return not self.discontinued and self.units_in_stock > 0
 
 
+class OrderQuerySet(TimeStampedQuerySet):
+    def unshipped(self):
+        """Orders not shipped yet (matches order_unshipped_idx)."""
+        return self.filter(shipped_date__isnull=True)
+
+    def sync_orderdates(self, orders):
+        """
+        Write the orderdate of each of ``orders`` that already exists with a
+        different date, together with its lines' order_date, in one statement.
+        On the partitioned table the key is (order_id, orderdate), so a
+        bulk_upsert of such orders would otherwise insert a second row.
+        Returns the number of orders moved.
+        """
+        dates = {order.order_id: order.orderdate for order in orders if order.order_id}
+        if not dates:
+            return 0
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        order_table, line_table = qn(Order._meta.db_table), qn(OrderDetail._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH moved AS (UPDATE {order_table} o SET orderdate = v.orderdate "
+                f"FROM unnest(%s::integer[], %s::timestamptz[]) AS v(order_id, orderdate) "
+                f"WHERE o.order_id = v.order_id AND o.orderdate IS DISTINCT FROM v.orderdate "
+                f"RETURNING o.order_id, o.orderdate), "
+                f"lines AS (UPDATE {line_table} d SET order_date = moved.orderdate "
+                f"FROM moved WHERE d.order_id = moved.order_id) "
+                f"SELECT order_id FROM moved",
+                [list(dates), list(dates.values())],
+            )
+            moved = [row[0] for row in cursor.fetchall()]
+        if moved:
+            invalidate_rows(Order, moved, using=self.db)
+            invalidate(OrderDetail, using=self.db)
+        return len(moved)
+
+
 class Order(TimeStampedModel):
     order_id = models.AutoField(primary_key=True)
     customer = models.ForeignKey(
@@ -138,13 +203,11 @@ class Order(TimeStampedModel):
         related_name="orders",
         verbose_name=_("Employee"),
     )
-    orderdate = models.DateTimeField(
-        _("Order Date"), blank=True, null=True, db_index=True
-    )
+    # Both columns are covered by the Meta indexes below (a B-tree on
+    # -orderdate also serves ascending scans).
+    orderdate = models.DateTimeField(_("Order Date"), blank=True, null=True)
     required_date = models.DateTimeField(_("Required Date"), blank=True, null=True)
-    shipped_date = models.DateTimeField(
-        _("Shipped Date"), blank=True, null=True, db_index=True
-    )
+    shipped_date = models.DateTimeField(_("Shipped Date"), blank=True, null=True)
     ship_via = models.ForeignKey(
         Shipper,
         on_delete=models.PROTECT,
@@ -165,11 +228,11 @@ class Order(TimeStampedModel):
     ship_address = models.CharField(_("Ship Address"), max_length=255, blank=True)
     ship_city = models.CharField(_("Ship City"), max_length=100, blank=True)
     ship_region = models.CharField(_("Ship Region"), max_length=100, blank=True)
-    ship_postal_code = models.CharField(
-        _("Ship Postal Code"), max_length=20, blank=True
-    )
+    ship_postal_code = models.CharField(_("Ship Postal Code"), max_length=20, blank=True)
     ship_country = models.CharField(_("Ship Country"), max_length=100, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Order")
         verbose_name_plural = _("Orders")
@@ -178,11 +241,33 @@ class Order(TimeStampedModel):
             models.Index(fields=["-orderdate"]),
             models.Index(fields=["customer", "-orderdate"]),
             models.Index(fields=["shipped_date"]),
+            models.Index(
+                fields=["required_date"],
+                name="order_unshipped_idx",
+                condition=models.Q(shipped_date__isnull=True),
+            ),
+            *timestamp_brin_indexes("order"),
         ]
 
     def __str__(self):
         return f"Order #{self.order_id} - {self.customer}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_orderdate = instance.__dict__.get("orderdate")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Keep the lines' order_date (their partition key) in step with orderdate.
+        QuerySet.update(orderdate=...) bypasses this and must do the same.
+        """
+        super().save(*args, **kwargs)
+        if getattr(self, "_loaded_orderdate", self.orderdate) != self.orderdate:
+            self.order_details.update(order_date=self.orderdate)
+        self._loaded_orderdate = self.orderdate
+
     @property
     def is_shipped(self):
         """Check if order has been shipped."""
@@ -197,14 +282,70 @@ class Order(TimeStampedModel):
             return self.required_date < timezone.now()
         return False
 
+    def compute_total(self):
+        """Order total after discounts, aggregated in a single query."""
+        total = self.order_details.aggregate(total=Sum(line_total_expression()))["total"]
+        return total or Decimal("0")
+
+
+class OrderDetailQuerySet(TimeStampedQuerySet):
+    def placed_between(self, start, end):
+        """
+        Lines of orders placed in [start, end). Filters on the denormalized
+        order_date so PostgreSQL prunes order_detail partitions.
+        """
+        return self.filter(order_date__gte=start, order_date__lt=end)
+
+    def resolve_prices(self, lines):
+        """
+        Default the unit_price of ``lines`` that have none to their product's
+        current price. Products already cached on a line are used as is; the
+        rest are priced with a single query.
+        """
+        unpriced = [line for line in lines if not line.unit_price]
+        cached = OrderDetail.product.is_cached
+        missing = {line.product_id for line in unpriced if not cached(line)}
+        prices = {}
+        if missing:
+            products = Product.objects.filter(pk__in=missing)
+            prices = dict(products.values_list("pk", "unit_price"))
+        for line in unpriced:
+            if cached(line):
+                line.unit_price = line.product.unit_price or 0
+            else:
+                line.unit_price = prices.get(line.product_id) or 0
+        return lines
+
+    def bulk_create_lines(self, lines, batch_size=None):
+        """
+        bulk_create() order lines with the defaults OrderDetail.save() applies:
+        unit_price from the product (see resolve_prices) and order_date from
+        the order, reading uncached orders' dates in one query.
+        """
+        self.resolve_prices(lines)
+        cached = OrderDetail.order.is_cached
+        missing = {line.order_id for line in lines if not cached(line)}
+        dates = {}
+        if missing:
+            dates = dict(Order.objects.filter(pk__in=missing).values_list("pk", "orderdate"))
+        for line in lines:
+            if cached(line):
+                line.order_date = line.order.orderdate
+            else:
+                line.order_date = dates.get(line.order_id)
+        return self.bulk_create(lines, batch_size=batch_size)
+
 
 class OrderDetail(TimeStampedModel):
     order = models.ForeignKey(
         Order,
         on_delete=models.CASCADE,
+        # northwind_order is partitioned, so the FK cannot be enforced in the DB.
+        db_constraint=False,
         related_name="order_details",
         verbose_name=_("Order"),
     )
+    order_date = models.DateTimeField(_("Order Date"), blank=True, null=True, editable=False)
     product = models.ForeignKey(
         Product,
         on_delete=models.PROTECT,
@@ -226,14 +367,14 @@ class OrderDetail(TimeStampedModel):
         validators=[MinValueValidator(0), MaxValueValidator(1)],
     )
 
+    objects = OrderDetailQuerySet.as_manager()
+
     class Meta:
         db_table = "order_detail"
         verbose_name = _("Order Detail")
         verbose_name_plural = _("Order Details")
         unique_together = ("order", "product")
-        indexes = [
-            models.Index(fields=["order", "product"]),
-        ]
+        indexes = timestamp_brin_indexes("order_detail")
 
     def __str__(self):
         return f"{self.order} - {self.product} (x{self.quantity})"
@@ -249,7 +390,58 @@ class OrderDetail(TimeStampedModel):
         return self.subtotal * (1 - self.discount)
 
     def save(self, *args, **kwargs):
-        """Auto-set unit_price from product if not provided."""
-        if not self.unit_price and self.product:
-            self.unit_price = self.product.unit_price or 0
+        """
+        Auto-set unit_price from product if not provided, and a new line's
+        order_date from its order unless given, reading the order only when
+        it is not loaded yet.
+        """
+        if not self.unit_price and self.product_id:
+            OrderDetail.objects.resolve_prices([self])
+        if self._state.adding and self.order_date is None:
+            self.order_date = self.order.orderdate
         super().save(*args, **kwargs)
+
+
+class OrderIdempotencyKey(TimeStampedModel):
+    """Client-supplied key of an ingested order, so a retried batch creates it once."""
+
+    key = models.CharField(_("Idempotency Key"), max_length=255, unique=True)
+    payload_hash = models.CharField(_("Payload Hash"), max_length=64)
+    order = models.ForeignKey(
+        Order,
+        # Partitioned table (no DB constraint); keys outlive archived orders.
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="idempotency_keys",
+        verbose_name=_("Order"),
+    )
+
+    class Meta:
+        db_table = "order_idempotency_key"
+        verbose_name = _("Order Idempotency Key")
+        verbose_name_plural = _("Order Idempotency Keys")
+
+    def __str__(self):
+        return self.key
+
+
+class OutboxEvent(models.Model):
+    """
+    A committed change to an order, order line or product, written by the
+    triggers in northwind.outbox and drained by the stream_outbox command.
+    """
+
+    created_at = models.DateTimeField(_("Created At"), db_default=Now())
+    table_name = models.CharField(_("Table"), max_length=63)
+    operation = models.CharField(_("Operation"), max_length=6)
+    object_id = models.CharField(_("Object ID"), max_length=64)
+    payload = models.JSONField(_("Payload"))
+
+    class Meta:
+        db_table = "outbox_event"
+        verbose_name = _("Outbox Event")
+        verbose_name_plural = _("Outbox Events")
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.operation} {self.table_name} {self.object_id}"
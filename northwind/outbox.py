@@ -0,0 +1,101 @@
+# northwind/outbox.py
+"""
+Transactional outbox for order and product changes.
+
+Statement-level AFTER triggers on the tables in OUTBOX_TABLES copy every
+inserted, updated and deleted row into ``outbox_event`` in the same
+transaction as the change, so ORM saves, bulk_create/bulk_update,
+QuerySet.update()/delete() and raw SQL are all captured, and an event
+exists if and only if its change committed. The triggers read the rows
+from transition tables, so a bulk statement costs one extra INSERT ...
+SELECT rather than one per row.
+
+The ``stream_outbox`` command drains the table.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+# table -> primary key column reported as the event's object_id
+OUTBOX_TABLES = {
+    "northwind_order": "order_id",
+    "order_detail": "id",
+    "northwind_product": "product_id",
+}
+
+# SET LOCAL northwind.outbox = 'off' skips capture for the transaction.
+SUPPRESS_SETTING = "northwind.outbox"
+
+CAPTURE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION outbox_capture() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('{SUPPRESS_SETTING}', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO outbox_event (table_name, operation, object_id, payload)
+        SELECT TG_TABLE_NAME, 'delete', to_jsonb(r) ->> TG_ARGV[0], to_jsonb(r)
+        FROM old_rows r;
+    ELSE
+        INSERT INTO outbox_event (table_name, operation, object_id, payload)
+        SELECT TG_TABLE_NAME, lower(TG_OP), to_jsonb(r) ->> TG_ARGV[0], to_jsonb(r)
+        FROM new_rows r;
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+# A trigger with a transition table can only fire on one event.
+TRIGGER_EVENTS = {
+    "insert": ("INSERT", "NEW TABLE AS new_rows"),
+    "update": ("UPDATE", "NEW TABLE AS new_rows"),
+    "delete": ("DELETE", "OLD TABLE AS old_rows"),
+}
+
+
+def _trigger_name(table, event):
+    return f"{table}_outbox_{event}"
+
+
+def install_outbox_triggers(schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute(CAPTURE_FUNCTION)
+    for table, pk in OUTBOX_TABLES.items():
+        for event, (operation, transition) in TRIGGER_EVENTS.items():
+            schema_editor.execute(
+                f"CREATE TRIGGER {qn(_trigger_name(table, event))} AFTER {operation} "
+                f"ON {qn(table)} REFERENCING {transition} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION outbox_capture('{pk}')"
+            )
+
+
+def remove_outbox_triggers(schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    qn = schema_editor.quote_name
+    for table in OUTBOX_TABLES:
+        for event in TRIGGER_EVENTS:
+            schema_editor.execute(
+                f"DROP TRIGGER IF EXISTS {qn(_trigger_name(table, event))} ON {qn(table)}"
+            )
+    schema_editor.execute("DROP FUNCTION IF EXISTS outbox_capture()")
+
+
+@contextmanager
+def suppress_outbox(using="default"):
+    """
+    Open a transaction whose changes emit no outbox events, for bulk
+    maintenance such as archiving that downstream systems must not see as
+    deletes. The setting lasts until the outermost transaction ends.
+    """
+    with transaction.atomic(using=using):
+        connection = connections[using]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config(%s, 'off', true)", [SUPPRESS_SETTING])
+        yield
@@ -0,0 +1,266 @@
+# northwind/partitioning.py
+"""
+Monthly range partitioning for the order tables.
+
+``northwind_order`` is partitioned by ``orderdate`` and ``order_detail`` by
+its denormalized ``order_date`` (always equal to the order's date), so
+date-bounded queries only touch the months they ask for. Each table has one
+partition per calendar month (UTC), named ``<table>_pYYYYMM``, plus a
+DEFAULT partition that holds NULL dates and months without a partition.
+
+PostgreSQL requires unique indexes on a partitioned table to include the
+partition key, so primary keys and unique constraints are rebuilt as unique
+indexes with the date column appended (NULLS NOT DISTINCT), and foreign keys
+pointing *at* a partitioned table cannot exist at the database level.
+
+The price is that the database no longer enforces a unique ``order_id`` (or
+order line ``id``) on its own: the same id may exist once per date. Ids
+taken from the table's sequence never collide; code that writes explicit
+ids must first move existing rows to their new date, as
+``OrderQuerySet.sync_orderdates()`` does for populate_orders, so an upsert
+on (id, date) updates them instead of adding a second row.
+"""
+
+import datetime
+import re
+
+from django.utils import timezone
+
+PARTITION_KEYS = {
+    "northwind_order": "orderdate",
+    "order_detail": "order_date",
+}
+
+PARTITION_NAME_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def month_start(value):
+    """First day of the month containing ``value`` (a date or datetime)."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def _bound(month):
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+
+def is_partitioned(connection, table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection, table):
+    """Return ``[(name, month)]`` for the monthly partitions of ``table``, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            partitions.append((name, datetime.date(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partition(connection, table, month):
+    """
+    Create the partition of ``table`` for ``month`` if it does not exist.
+
+    Rows of that month already sitting in the DEFAULT partition are moved
+    into the new partition before it is attached. Returns True if created.
+    """
+    month = month_start(month)
+    name = partition_name(table, month)
+    if any(existing == name for existing, _ in list_partitions(connection, table)):
+        return False
+
+    qn = connection.ops.quote_name
+    column = PARTITION_KEYS[table]
+    lower, upper = _bound(month), _bound(next_month(month))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(default_partition_name(table))} "
+            f"WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    return True
+
+
+def detach_partition(connection, table, month, drop=False):
+    """
+    Detach (and optionally drop) the partition of ``table`` for ``month``.
+
+    A kept partition becomes a standalone archive table; its foreign keys
+    are dropped so it never blocks deletes in the live tables.
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+        if drop:
+            cursor.execute(f"DROP TABLE {qn(name)}")
+            return name
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass "
+            "AND contype = 'f'",
+            [name],
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {qn(name)} DROP CONSTRAINT {qn(constraint)}")
+    return name
+
+
+def partition_table(schema_editor, table, months_ahead=3):
+    """
+    Convert the plain ``table`` into a monthly range-partitioned table.
+
+    Creates partitions for every month that holds data and for the current
+    month plus ``months_ahead``, copies the rows, and recreates indexes and
+    outgoing foreign keys under their original names.
+    """
+    connection = schema_editor.connection
+    qn = schema_editor.quote_name
+    column = PARTITION_KEYS[table]
+    staging = f"{table}_partitioned"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        inbound = cursor.fetchall()
+        if inbound:
+            raise RuntimeError(
+                f"Cannot partition {table}: referenced by foreign keys {inbound}"
+            )
+
+        cursor.execute(
+            "SELECT ic.relname, i.indisunique, pg_get_indexdef(i.indexrelid), "
+            "array(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY k(attnum, ord) "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum "
+            "ORDER BY k.ord) "
+            "FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid "
+            "WHERE i.indrelid = %s::regclass",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass "
+            "AND attidentity <> ''",
+            [table],
+        )
+        identity = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {qn(column)} AT TIME ZONE 'UTC') "
+            f"FROM {qn(table)} WHERE {qn(column)} IS NOT NULL"
+        )
+        months = {month_start(row[0]) for row in cursor.fetchall()}
+
+        month = month_start(timezone.now().date())
+        for _ in range(months_ahead + 1):
+            months.add(month)
+            month = next_month(month)
+
+        cursor.execute(
+            f"CREATE TABLE {qn(staging)} (LIKE {qn(table)} INCLUDING DEFAULTS "
+            f"INCLUDING IDENTITY INCLUDING CONSTRAINTS) PARTITION BY RANGE ({qn(column)})"
+        )
+        cursor.execute(
+            f"CREATE TABLE {qn(default_partition_name(table))} "
+            f"PARTITION OF {qn(staging)} DEFAULT"
+        )
+        for month in sorted(months):
+            cursor.execute(
+                f"CREATE TABLE {qn(partition_name(table, month))} PARTITION OF "
+                f"{qn(staging)} FOR VALUES FROM (%s) TO (%s)",
+                [_bound(month), _bound(next_month(month))],
+            )
+        cursor.execute(f"INSERT INTO {qn(staging)} SELECT * FROM {qn(table)}")
+        cursor.execute(f"DROP TABLE {qn(table)}")
+        cursor.execute(f"ALTER TABLE {qn(staging)} RENAME TO {qn(table)}")
+
+        for name, unique, definition, columns in indexes:
+            if unique and column not in columns:
+                columns = ", ".join(qn(c) for c in [*columns, column])
+                definition = (
+                    f"CREATE UNIQUE INDEX {qn(name)} ON {qn(table)} ({columns}) "
+                    f"NULLS NOT DISTINCT"
+                )
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for name in identity:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                f"COALESCE(MAX({qn(name)}), 0) + 1, false) FROM {qn(table)}",
+                [table, name],
+            )
+
+
+def table_size(connection, table):
+    """Total on-disk size (heap, indexes, TOAST) of ``table`` and all its partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) "
+            "FROM pg_partition_tree(%s::regclass)",
+            [table],
+        )
+        return int(cursor.fetchone()[0])
+
+
+def drop_empty_partitions(connection, table, before):
+    """
+    Drop the monthly partitions of ``table`` that end on or before ``before``
+    and hold no rows, e.g. once their orders have been archived. Returns the
+    dropped partition names.
+    """
+    qn = connection.ops.quote_name
+    dropped = []
+    for name, month in list_partitions(connection, table):
+        if next_month(month) > before:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {qn(name)})")
+            if cursor.fetchone()[0]:
+                continue
+        dropped.append(detach_partition(connection, table, month, drop=True))
+    return dropped
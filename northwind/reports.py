@@ -0,0 +1,161 @@
+# northwind/reports.py
+"""
+Order and sales totals per hour, day, week or month of local time.
+
+Timestamps are stored in UTC. The buckets are computed by PostgreSQL with
+``date_trunc(<period>, <column> AT TIME ZONE <zone>)``, so only one row per
+bucket comes back:
+
+    order_totals("day", "America/Halifax", date(2024, 1, 1), date(2024, 2, 1))
+    sales_totals("week", CUSTOMER_TIMEZONE, date(2024, 1, 1), date(2024, 4, 1))
+
+``start`` and ``end`` are local dates or naive datetimes; a report covers
+[start, end). For one timezone they become UTC bounds on the date column,
+which the ``orderdate`` and ``shipped_date`` indexes and the monthly
+partitions serve, and each bucket is an aware datetime in that zone.
+
+``CUSTOMER_TIMEZONE`` buckets every order by its own customer's
+``NorthWindUser.timezone`` (UTC for orders without a customer, and for
+stored names the tz database does not know, which PostgreSQL would
+reject). The date column is then bounded by the widest UTC offsets around
+[start, end) before the exact local bounds apply, and buckets are naive
+local datetimes.
+"""
+
+import datetime
+import functools
+from zoneinfo import ZoneInfo
+
+from django.db import models
+from django.db.models import Case, Count, Func, Sum, Value, When
+from django.db.models.functions import Trunc
+
+from northwind.models import Order, OrderDetail, line_total_expression
+from user_accounts.timezones import DEFAULT, timezone_names
+
+PERIODS = ("hour", "day", "week", "month")
+CUSTOMER_TIMEZONE = "customer"
+
+# Local times lie within UTC-12:00 .. UTC+14:00.
+MAX_BEHIND_UTC = datetime.timedelta(hours=12)
+MAX_AHEAD_OF_UTC = datetime.timedelta(hours=14)
+
+
+class NaiveDateTimeField(models.DateTimeField):
+    """``timestamp without time zone`` values, compared and returned naive."""
+
+    def get_prep_value(self, value):
+        return models.Field.get_prep_value(self, value)
+
+
+class AtTimeZone(Func):
+    """``<timestamptz> AT TIME ZONE <zone expression>``: local wall-clock time."""
+
+    arg_joiner = " AT TIME ZONE "
+    template = "(%(expressions)s)"
+    output_field = NaiveDateTimeField()
+
+
+class AnyOf(Func):
+    """``<expression> = ANY(<array>)``."""
+
+    arg_joiner = " = ANY("
+    template = "(%(expressions)s))"
+    output_field = models.BooleanField()
+
+
+@functools.cache
+def _timezone_list():
+    # No tz database name contains a space.
+    return " ".join(sorted(timezone_names()))
+
+
+def _known_timezone(tz_field):
+    """
+    ``tz_field``, or UTC where it is NULL or not a tz database name. The
+    names are one string parameter, split once by PostgreSQL, rather than
+    an array Django and psycopg adapt item by item wherever it appears.
+    """
+    names = Func(Value(_timezone_list()), Value(" "), function="string_to_array")
+    return Case(When(AnyOf(tz_field, names), then=tz_field), default=Value(DEFAULT))
+
+
+class DateTrunc(Func):
+    function = "DATE_TRUNC"
+    output_field = NaiveDateTimeField()
+
+    def __init__(self, period, expression):
+        super().__init__(Value(period), expression)
+
+
+def _local(value):
+    """``value`` (a date or naive datetime) as a naive datetime."""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            raise ValueError("Report bounds are local times and must be naive.")
+        return value
+    return datetime.datetime.combine(value, datetime.time())
+
+
+def _bucketed(queryset, date_field, tz_field, period, tz, start, end):
+    """``queryset`` bounded to [start, end) and grouped by ``bucket``."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}; expected one of {PERIODS}.")
+    start, end = _local(start), _local(end)
+    if tz == CUSTOMER_TIMEZONE:
+        # Any local time in [start, end) is within these UTC bounds.
+        first = start.replace(tzinfo=datetime.UTC) - MAX_AHEAD_OF_UTC
+        last = end.replace(tzinfo=datetime.UTC) + MAX_BEHIND_UTC
+        local = AtTimeZone(date_field, _known_timezone(tz_field))
+        queryset = (
+            queryset.filter(**{f"{date_field}__gte": first, f"{date_field}__lt": last})
+            .alias(local=local)
+            .filter(local__gte=start, local__lt=end)
+            .annotate(bucket=DateTrunc(period, local))
+        )
+    else:
+        zone = tz if isinstance(tz, datetime.tzinfo) else ZoneInfo(tz)
+        first, last = start.replace(tzinfo=zone), end.replace(tzinfo=zone)
+        queryset = queryset.filter(
+            **{f"{date_field}__gte": first, f"{date_field}__lt": last}
+        ).annotate(bucket=Trunc(date_field, period, tzinfo=zone))
+    return queryset.values("bucket").order_by("bucket")
+
+
+def order_totals(period, tz, start, end, date_field="orderdate"):
+    """
+    Orders and freight per ``period`` of ``date_field`` (``orderdate`` or
+    ``shipped_date``) in ``tz``: ``[{"bucket", "orders", "freight"}, ...]``.
+    """
+    if date_field not in ("orderdate", "shipped_date"):
+        raise ValueError(f"Cannot report on {date_field!r}.")
+    rows = _bucketed(
+        Order.objects.order_by(),
+        date_field,
+        "customer__user__timezone",
+        period,
+        tz,
+        start,
+        end,
+    ).annotate(orders=Count("pk"), freight=Sum("freight"))
+    return list(rows)
+
+
+def sales_totals(period, tz, start, end):
+    """
+    Revenue after discounts and order lines per ``period`` of the order
+    date in ``tz``: ``[{"bucket", "revenue", "lines"}, ...]``. Reads order
+    lines only (by their denormalized order_date) unless ``tz`` is
+    CUSTOMER_TIMEZONE, which joins each line's order. Order counts come
+    from order_totals(), without a COUNT(DISTINCT) over the lines.
+    """
+    rows = _bucketed(
+        OrderDetail.objects.order_by(),
+        "order_date",
+        "order__customer__user__timezone",
+        period,
+        tz,
+        start,
+        end,
+    ).annotate(revenue=Sum(line_total_expression()), lines=Count("pk"))
+    return list(rows)
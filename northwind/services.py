@@ -0,0 +1,398 @@
+# northwind/services.py
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from _config.replicas import use_primary
+from northwind.models import Order, OrderDetail, OrderIdempotencyKey, Product, Shipper
+from user_accounts.models import CustomerContact, Employee
+
+INGEST_FIELDS = (
+    "freight",
+    "ship_name",
+    "ship_address",
+    "ship_city",
+    "ship_region",
+    "ship_postal_code",
+    "ship_country",
+)
+INGEST_DATES = ("orderdate", "required_date", "shipped_date")
+INGEST_REFERENCES = {
+    "customer_id": CustomerContact,
+    "employee_id": Employee,
+    "ship_via_id": Shipper,
+}
+
+
+class InsufficientStock(Exception):
+    """A product is discontinued or has fewer units in stock than ordered."""
+
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(f"Insufficient stock for product {product_id} (requested {quantity})")
+
+
+def normalize_lines(lines):
+    """
+    Validate ``lines`` (dicts with product_id, quantity and optional discount
+    and unit_price) and merge repeated products, since an order holds each
+    product once. Returns ``{product_id: line}`` sorted by product_id.
+    """
+    merged = {}
+    errors = []
+    for index, line in enumerate(lines):
+        try:
+            product_id = int(line["product_id"])
+            quantity = int(line["quantity"])
+            discount = Decimal(str(line.get("discount") or 0))
+            unit_price = line.get("unit_price")
+            unit_price = Decimal(str(unit_price)) if unit_price is not None else None
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            problem = _("product_id and quantity are required")
+        else:
+            if quantity < 1:
+                problem = _("quantity must be at least 1")
+            elif not 0 <= discount <= 1:
+                problem = _("discount must be between 0 and 1")
+            elif unit_price is not None and unit_price < 0:
+                problem = _("unit_price cannot be negative")
+            else:
+                problem = None
+        if problem:
+            errors.append(
+                ValidationError(
+                    _("Line %(index)s: %(problem)s"),
+                    params={"index": index, "problem": problem},
+                )
+            )
+        elif product_id in merged:
+            merged[product_id]["quantity"] += quantity
+        else:
+            merged[product_id] = {
+                "quantity": quantity,
+                "discount": discount,
+                "unit_price": unit_price,
+            }
+    if not merged and not errors:
+        errors.append(_("An order needs at least one line."))
+    if errors:
+        raise ValidationError(errors)
+    return dict(sorted(merged.items()))
+
+
+def field_errors(instance):
+    """
+    Messages for the values of ``instance`` that its columns cannot hold
+    (length, digits, integer range), as ``"field: message"``. Relations are
+    left to the bulk reference checks, so this runs no queries.
+    """
+    exclude = {f.name for f in instance._meta.concrete_fields if f.is_relation}
+    # Missing values get their defaults when the rows are written.
+    exclude.update(
+        f.name for f in instance._meta.concrete_fields if f.value_from_object(instance) is None
+    )
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        return [
+            f"{name}: {message}"
+            for name, messages in e.message_dict.items()
+            for message in messages
+        ]
+    return []
+
+
+def check_fields(fields, lines):
+    """
+    Raise ValidationError if an Order with ``fields`` or the normalized
+    ``lines`` would not fit their columns, which the database would
+    otherwise reject with a DataError.
+    """
+    errors = field_errors(Order(**fields))
+    for product_id, line in lines.items():
+        detail = OrderDetail(
+            quantity=line["quantity"], discount=line["discount"], unit_price=line["unit_price"]
+        )
+        errors.extend(f"Line for product_id {product_id}: {e}" for e in field_errors(detail))
+    if errors:
+        raise ValidationError(errors)
+
+
+def reserve_stock(lines):
+    """
+    Take ``quantity`` units of each product out of stock with one conditional
+    UPDATE per product: the row only changes if enough units are left, so
+    concurrent orders can never oversell and no stock value is read first.
+    Products are updated in ascending id order, so two orders always lock
+    shared products in the same order and cannot deadlock. Must run inside
+    the order's transaction; raises InsufficientStock, or ValidationError for
+    unknown products, to roll it back.
+    """
+    for product_id, line in lines.items():
+        reserved = Product.objects.filter(
+            pk=product_id, discontinued=False, units_in_stock__gte=line["quantity"]
+        ).update(
+            units_in_stock=F("units_in_stock") - line["quantity"],
+            updated_at=timezone.now(),
+        )
+        if not reserved:
+            # Only failed reservations pay for telling the two apart.
+            if not Product.objects.filter(pk=product_id).exists():
+                raise ValidationError(
+                    _("Unknown product_id: %(value)s"), params={"value": product_id}
+                )
+            raise InsufficientStock(product_id, line["quantity"])
+
+
+def check_references(fields):
+    """
+    Convert the customer_id, employee_id and ship_via_id of ``fields`` to
+    primary keys and check that their rows exist, on the primary. Foreign
+    keys are only checked at commit, too late to reject a request cleanly.
+    Raises ValidationError.
+    """
+    errors = []
+    for name, model in INGEST_REFERENCES.items():
+        if fields.get(name) is None:
+            continue
+        try:
+            fields[name] = model._meta.pk.to_python(fields[name])
+        except ValidationError:
+            errors.append(
+                ValidationError(_("%(name)s is not a valid id."), params={"name": name})
+            )
+            continue
+        with use_primary():
+            exists = model.objects.filter(pk=fields[name]).exists()
+        if not exists:
+            errors.append(
+                ValidationError(
+                    _("Unknown %(name)s: %(value)s"),
+                    params={"name": name, "value": fields[name]},
+                )
+            )
+    if errors:
+        raise ValidationError(errors)
+
+
+def place_order(lines, **order_fields):
+    """
+    Create an Order with ``order_fields`` (customer, employee, ship_via,
+    required_date, ship_* ...) and one OrderDetail per product in ``lines``,
+    reserving stock for every line, in a single transaction.
+
+    ``orderdate`` defaults to now and missing unit prices to the product's
+    current price. Raises ValidationError for malformed lines, values too
+    long or too large for their columns, or unknown
+    customer_id, employee_id, ship_via_id or product_id, and
+    InsufficientStock if any product cannot be reserved; nothing is written
+    in either case.
+    """
+    lines = normalize_lines(lines)
+    check_fields(order_fields, lines)
+    check_references(order_fields)
+    order_fields.setdefault("orderdate", timezone.now())
+    with transaction.atomic():
+        order = Order.objects.create(**order_fields)
+        # Product rows stay locked from here until commit, so only the line
+        # INSERT runs while other orders for the same products wait. Unknown
+        # products fail here too, before the lines hit their foreign key.
+        reserve_stock(lines)
+        OrderDetail.objects.bulk_create_lines(
+            [
+                OrderDetail(
+                    order=order,
+                    product_id=product_id,
+                    quantity=line["quantity"],
+                    discount=line["discount"],
+                    unit_price=line["unit_price"],
+                )
+                for product_id, line in lines.items()
+            ]
+        )
+    return order
+
+
+def parse_ingested_order(payload):
+    """
+    Validate one order of an ingestion batch, including that its values fit
+    their columns, so one bad order cannot fail the batch's inserts. Returns
+    ``(fields, lines)``: keyword arguments for Order and the normalized lines.
+    """
+    fields = {name: payload[name] for name in INGEST_FIELDS if payload.get(name) is not None}
+    errors = []
+    for name in INGEST_DATES:
+        if payload.get(name):
+            fields[name] = parse_datetime(str(payload[name]))
+            if fields[name] is None:
+                errors.append(f"{name} must be an ISO 8601 datetime.")
+    for name, model in INGEST_REFERENCES.items():
+        if payload.get(name) is not None:
+            try:
+                fields[name] = model._meta.pk.to_python(payload[name])
+            except ValidationError:
+                errors.append(f"{name} is not a valid id.")
+    if "freight" in fields:
+        try:
+            fields["freight"] = Decimal(str(fields["freight"]))
+        except InvalidOperation:
+            errors.append("freight must be a number.")
+    try:
+        lines = normalize_lines(payload.get("lines") or [])
+    except ValidationError as e:
+        errors.extend(e.messages)
+    if errors:
+        raise ValidationError(errors)
+    check_fields(fields, lines)
+    fields.setdefault("orderdate", timezone.now())
+    return fields, lines
+
+
+def payload_hash(payload):
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _lock_keys(keys):
+    """
+    Serialize concurrent batches that share idempotency keys until commit,
+    with one statement; keys are locked in sorted order so batches cannot
+    deadlock on each other.
+    """
+    if connection.vendor != "postgresql" or not keys:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtextextended(k, 0)) "
+            "FROM unnest(%s::text[]) AS k ORDER BY k",
+            [sorted(keys)],
+        )
+
+
+def ingest_orders(payloads):
+    """
+    Create many orders (dicts with ``idempotency_key``, order fields and
+    ``lines``) in one transaction with a fixed number of queries.
+
+    Orders whose key was already ingested are not created again. All
+    customer, employee, shipper and product references are checked with one
+    query per model, and orders, lines and keys are written with bulk
+    inserts. Stock is not reserved: ingested orders were accepted upstream.
+
+    Returns one result per payload, in order: ``{"idempotency_key", "status",
+    "order_id"?, "errors"?}`` where status is "created", "duplicate" (same key
+    and payload as an earlier order), "conflict" (key reused with a different
+    payload) or "error".
+    """
+    results = []
+    pending = {}  # key -> (result, hash, fields, lines)
+    first = {}  # key -> (result, hash) of its first occurrence in this batch
+    repeats = []  # (result, first result) for keys repeated in this batch
+    for payload in payloads:
+        key = payload.get("idempotency_key") if isinstance(payload, dict) else None
+        result = {"idempotency_key": key}
+        results.append(result)
+        if not isinstance(key, str) or not key or len(key) > 255:
+            result.update(
+                status="error", errors=["idempotency_key is required (max 255 characters)."]
+            )
+            continue
+        digest = payload_hash(payload)
+        if key in first:
+            if first[key][1] == digest:
+                repeats.append((result, first[key][0]))
+            else:
+                result["status"] = "conflict"
+            continue
+        first[key] = (result, digest)
+        try:
+            fields, lines = parse_ingested_order(payload)
+        except ValidationError as e:
+            result.update(status="error", errors=e.messages)
+            continue
+        pending[key] = (result, digest, fields, lines)
+
+    # Keys and references are checked on the primary: a lagging replica
+    # could miss an order ingested moments ago.
+    with transaction.atomic(), use_primary():
+        _lock_keys(pending)
+        for existing in OrderIdempotencyKey.objects.filter(key__in=pending):
+            result, digest, _fields, _lines = pending.pop(existing.key)
+            if existing.payload_hash == digest:
+                result.update(status="duplicate", order_id=existing.order_id)
+            else:
+                result["status"] = "conflict"
+
+        _check_references(pending)
+        orders, lines, keys = [], [], []
+        for key, (result, digest, fields, order_lines) in pending.items():
+            order = Order(**fields)
+            orders.append(order)
+            keys.append(OrderIdempotencyKey(key=key, payload_hash=digest, order=order))
+            for line in order_lines.values():
+                lines.append(
+                    OrderDetail(
+                        order=order,
+                        product=line["product"],
+                        quantity=line["quantity"],
+                        discount=line["discount"],
+                        unit_price=line["unit_price"],
+                    )
+                )
+        Order.objects.bulk_create(orders)
+        OrderDetail.objects.bulk_create_lines(lines)
+        OrderIdempotencyKey.objects.bulk_create(keys)
+        for key, order in zip(pending, orders):
+            pending[key][0].update(status="created", order_id=order.order_id)
+
+    for result, original in repeats:
+        if original["status"] in ("created", "duplicate"):
+            result.update(status="duplicate", order_id=original["order_id"])
+        else:
+            result.update({k: v for k, v in original.items() if k != "idempotency_key"})
+    return results
+
+
+def _check_references(pending):
+    """
+    Drop orders from ``pending`` that reference unknown customers, employees
+    or shippers, or unknown or discontinued products, marking their results
+    as errors. Products are attached to the lines so prices need no query.
+    """
+    for name, model in INGEST_REFERENCES.items():
+        wanted = {entry[2][name] for entry in pending.values() if name in entry[2]}
+        found = set(
+            model.objects.filter(pk__in=wanted).order_by().values_list("pk", flat=True)
+        )
+        for key, (result, _digest, fields, _lines) in list(pending.items()):
+            if name in fields and fields[name] not in found:
+                result.update(status="error", errors=[f"Unknown {name}: {fields[name]}"])
+                del pending[key]
+
+    wanted = {product_id for entry in pending.values() for product_id in entry[3]}
+    products = (
+        Product.objects.only("product_id", "unit_price", "discontinued")
+        .order_by()
+        .in_bulk(wanted)
+    )
+    for key, (result, _digest, _fields, lines) in list(pending.items()):
+        errors = [
+            f"Unknown or discontinued product_id: {product_id}"
+            for product_id in lines
+            if product_id not in products or products[product_id].discontinued
+        ]
+        if errors:
+            result.update(status="error", errors=errors)
+            del pending[key]
+            continue
+        for product_id, line in lines.items():
+            line["product"] = products[product_id]
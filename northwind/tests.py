@@ -1,3 +1,1818 @@
-from django.test import TestCase
+import contextvars
+import itertools
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, router, transaction
+from django.db.models import Count, Sum
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from _config import query_cache
+from _config.budgets import BudgetTestMixin
+from _config.invalidation import Listener, subscribe, unsubscribe
+from _config.metrics import REGISTRY
+from _config.nplusone import NPlusOneError, NPlusOneMiddleware, forbid_n_plus_one
+from _config.pooling import pool_stats
+from _config.profiling import SQLProfilingMiddleware, profile_queries
+from _config.reference_cache import ReferenceCache, reference_cache
+from _config.replicas import STICKY_COOKIE, ReplicaMiddleware, use_primary, use_replica
+from _config.tracing import NO_SPAN, span
+from _config.transactions import RequestTransactionMiddleware, read_only_transaction
+from northwind.archive import load_manifest, order_details_between, orders_between
+from northwind.management.commands.populate_order_details import (
+    Command as PopulateOrderDetails,
+)
+from northwind.models import (
+    Category,
+    Order,
+    OrderDetail,
+    OrderIdempotencyKey,
+    OutboxEvent,
+    Product,
+    Shipper,
+)
+from northwind.outbox import suppress_outbox
+from northwind.partitioning import (
+    PARTITION_KEYS,
+    create_partition,
+    default_partition_name,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+from northwind.reports import CUSTOMER_TIMEZONE, order_totals, sales_totals
+from northwind.services import InsufficientStock, ingest_orders, place_order
+from user_accounts.models import CustomerContact, Employee, NorthWindUser
+
+
+# A replica's test mirror cannot see rows this test has not committed.
+@override_settings(DATABASE_PIN="primary")
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.tea = Product.objects.create(
+            product_name="Tea", unit_price=Decimal("4.50"), units_in_stock=10
+        )
+        self.coffee = Product.objects.create(
+            product_name="Coffee", unit_price=Decimal("9.00"), units_in_stock=1
+        )
+
+    def test_creates_order_lines_and_reserves_stock(self):
+        order = place_order(
+            [
+                {"product_id": self.tea.pk, "quantity": 2},
+                {"product_id": self.coffee.pk, "quantity": 1, "discount": "0.5"},
+                {"product_id": self.tea.pk, "quantity": 1},
+            ]
+        )
+        lines = {line.product_id: line for line in order.order_details.all()}
+        self.assertEqual(lines[self.tea.pk].quantity, 3)
+        self.assertEqual(lines[self.tea.pk].unit_price, Decimal("4.50"))
+        self.assertEqual(lines[self.tea.pk].order_date, order.orderdate)
+        self.assertEqual(order.compute_total(), Decimal("18.00"))
+        self.tea.refresh_from_db()
+        self.coffee.refresh_from_db()
+        self.assertEqual((self.tea.units_in_stock, self.coffee.units_in_stock), (7, 0))
+
+    def test_insufficient_stock_writes_nothing(self):
+        with self.assertRaises(InsufficientStock):
+            place_order(
+                [
+                    {"product_id": self.tea.pk, "quantity": 1},
+                    {"product_id": self.coffee.pk, "quantity": 2},
+                ]
+            )
+        self.assertFalse(Order.objects.exists())
+        self.tea.refresh_from_db()
+        self.assertEqual(self.tea.units_in_stock, 10)
+
+    def test_endpoint(self):
+        user = NorthWindUser.objects.create_user("staff@example.com", "pw", is_staff=True)
+        self.client.force_login(user)
+        url = reverse("northwind:place_order")
+        response = self.client.post(
+            url,
+            json.dumps({"lines": [{"product_id": self.coffee.pk, "quantity": 1}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Order.objects.filter(pk=response.json()["order_id"]).exists())
+
+        response = self.client.post(
+            url,
+            json.dumps({"lines": [{"product_id": self.coffee.pk, "quantity": 1}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(
+            url, json.dumps({"lines": [{"quantity": 0}]}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_customers_pay_the_product_price(self):
+        user = NorthWindUser.objects.create_user("c@example.com", "pw")
+        CustomerContact.objects.create(customer_id="C001", user=user, company_name="C")
+        self.client.force_login(user)
+        url = reverse("northwind:place_order")
+        for line in ({"unit_price": "0.01"}, {"discount": "1"}):
+            with self.subTest(line=line):
+                body = {"lines": [{"product_id": self.tea.pk, "quantity": 1, **line}]}
+                response = self.client.post(url, json.dumps(body), "application/json")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json(), {"errors": ["Only staff can set unit_price or discount."]}
+                )
+        self.assertFalse(Order.objects.exists())
+
+        body = {"lines": [{"product_id": self.tea.pk, "quantity": 2}]}
+        response = self.client.post(url, json.dumps(body), "application/json")
+        order = Order.objects.get(pk=response.json()["order_id"])
+        self.assertEqual((order.customer_id, order.compute_total()), ("C001", Decimal("9.00")))
+
+    def test_endpoint_rejects_unknown_products(self):
+        user = NorthWindUser.objects.create_user("staff@example.com", "pw", is_staff=True)
+        self.client.force_login(user)
+        body = {
+            "lines": [
+                {"product_id": self.tea.pk, "quantity": 1},
+                {"product_id": 99999, "quantity": 1},
+            ]
+        }
+        response = self.client.post(
+            reverse("northwind:place_order"), json.dumps(body), "application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"errors": ["Unknown product_id: 99999"]})
+        self.assertFalse(Order.objects.exists())
+        self.tea.refresh_from_db()
+        self.assertEqual(self.tea.units_in_stock, 10)
+
+    def test_endpoint_rejects_unknown_references(self):
+        # Foreign keys are only checked at commit, after the view returned.
+        user = NorthWindUser.objects.create_user("staff@example.com", "pw", is_staff=True)
+        self.client.force_login(user)
+        lines = [{"product_id": self.tea.pk, "quantity": 1}]
+        for reference, error in (
+            ({"employee_id": 99999}, "Unknown employee_id: 99999"),
+            ({"employee_id": "abc"}, "employee_id is not a valid id."),
+            ({"customer_id": "NOPE"}, "Unknown customer_id: NOPE"),
+            ({"ship_via_id": 99999}, "Unknown ship_via_id: 99999"),
+        ):
+            with self.subTest(reference=reference):
+                response = self.client.post(
+                    reverse("northwind:place_order"),
+                    json.dumps({**reference, "lines": lines}),
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"errors": [error]})
+        self.assertFalse(Order.objects.exists())
+        self.tea.refresh_from_db()
+        self.assertEqual(self.tea.units_in_stock, 10)
+
+
+# A replica's test mirror cannot see rows this test has not committed.
+@override_settings(DATABASE_PIN="primary")
+class IngestOrdersTests(TestCase):
+    def setUp(self):
+        self.tea = Product.objects.create(product_name="Tea", unit_price=Decimal("4.50"))
+        self.old = Product.objects.create(product_name="Old", discontinued=True)
+
+    def order(self, key, **fields):
+        return {
+            "idempotency_key": key,
+            "lines": [{"product_id": self.tea.pk, "quantity": 2}],
+            **fields,
+        }
+
+    def test_results_and_idempotency(self):
+        batch = [
+            self.order("a", ship_name="A", orderdate="2026-01-15T10:00:00Z"),
+            self.order("b"),
+            self.order("a", ship_name="A", orderdate="2026-01-15T10:00:00Z"),
+            self.order("a", ship_name="changed"),
+            self.order("c", customer_id="NOPE"),
+            self.order("d", lines=[{"product_id": self.old.pk, "quantity": 1}]),
+            self.order("e", lines=[]),
+            {"lines": []},
+        ]
+        with self.assertNumQueries(9):
+            results = ingest_orders(batch)
+        statuses = [result["status"] for result in results]
+        self.assertEqual(
+            statuses,
+            [
+                "created",
+                "created",
+                "duplicate",
+                "conflict",
+                "error",
+                "error",
+                "error",
+                "error",
+            ],
+        )
+        self.assertEqual(results[2]["order_id"], results[0]["order_id"])
+        order = Order.objects.get(pk=results[0]["order_id"])
+        self.assertEqual(order.ship_name, "A")
+        self.assertEqual(order.compute_total(), Decimal("9.00"))
+        self.assertEqual(order.order_details.get().order_date, order.orderdate)
+
+        # A retried batch creates nothing new.
+        retried = ingest_orders(batch[:2])
+        self.assertEqual([r["status"] for r in retried], ["duplicate", "duplicate"])
+        self.assertEqual(
+            [r["order_id"] for r in retried], [r["order_id"] for r in results[:2]]
+        )
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(OrderIdempotencyKey.objects.count(), 2)
+
+    def test_values_that_do_not_fit_their_columns(self):
+        batch = [
+            self.order("long", ship_name="x" * 400),
+            self.order("freight", freight="1e20"),
+            self.order("quantity", lines=[{"product_id": self.tea.pk, "quantity": 10**12}]),
+            self.order("ok"),
+        ]
+        results = ingest_orders(batch)
+        self.assertEqual(
+            [result["status"] for result in results], ["error", "error", "error", "created"]
+        )
+        self.assertEqual(
+            [result["errors"] for result in results[:3]],
+            [
+                ["ship_name: Ensure this value has at most 255 characters (it has 400)."],
+                ["freight: Ensure that there are no more than 10 digits in total."],
+                [
+                    f"Line for product_id {self.tea.pk}: quantity: "
+                    "Ensure this value is less than or equal to 2147483647."
+                ],
+            ],
+        )
+        self.assertEqual(Order.objects.get().pk, results[3]["order_id"])
+
+    def test_endpoint_requires_staff(self):
+        url = reverse("northwind:ingest_orders")
+        body = json.dumps({"orders": [self.order("x")]})
+        user = NorthWindUser.objects.create_user("c@example.com", "pw")
+        self.client.force_login(user)
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+        user.is_staff = True
+        user.save()
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.json()["results"][0]["status"], "created")
+
+
+class OrderDetailBulkTests(TestCase):
+    def setUp(self):
+        self.tea = Product.objects.create(product_name="Tea", unit_price=Decimal("4.50"))
+        self.coffee = Product.objects.create(product_name="Coffee", unit_price=Decimal("9.00"))
+        self.milk = Product.objects.create(product_name="Milk", unit_price=Decimal("1.20"))
+        self.order = Order.objects.create(orderdate=datetime(2026, 1, 5, tzinfo=UTC))
+
+    def test_bulk_create_lines(self):
+        unpriced = OrderDetail(order_id=self.order.pk, product_id=self.tea.pk, quantity=1)
+        priced = OrderDetail(
+            order_id=self.order.pk, product_id=self.coffee.pk, unit_price=7, quantity=1
+        )
+        # A cached product is priced without a query, even if stale.
+        cached = OrderDetail(order=self.order, product=Product(pk=self.milk.pk), quantity=1)
+        cached.product.unit_price = Decimal("4.00")
+        # Products price lines, then orders date them, then one INSERT.
+        with self.assertNumQueries(3):
+            OrderDetail.objects.bulk_create_lines([unpriced, priced, cached])
+        self.assertEqual(
+            [line.unit_price for line in (unpriced, priced, cached)],
+            [Decimal("4.50"), 7, Decimal("4.00")],
+        )
+        self.assertEqual(
+            {line.order_date for line in OrderDetail.objects.all()}, {self.order.orderdate}
+        )
+
+        # Lines of products that do not exist get no price.
+        unknown = OrderDetail(product_id=99999, quantity=1)
+        OrderDetail.objects.resolve_prices([unknown])
+        self.assertEqual(unknown.unit_price, 0)
+
+    def test_save_reads_the_order_only_for_its_date(self):
+        line = OrderDetail(order_id=self.order.pk, product=self.tea, unit_price=1, quantity=1)
+        with self.assertNumQueries(2):
+            line.save()
+        self.assertEqual(line.order_date, self.order.orderdate)
+        # Given the date, or the loaded order, saving is the INSERT alone.
+        for line in (
+            OrderDetail(
+                order_id=self.order.pk,
+                order_date=self.order.orderdate,
+                product=self.coffee,
+                unit_price=1,
+                quantity=1,
+            ),
+            OrderDetail(order=self.order, product=self.milk, unit_price=1, quantity=1),
+        ):
+            with self.subTest(line=line), self.assertNumQueries(1):
+                line.save()
+        self.assertEqual(
+            set(OrderDetail.objects.values_list("order_date", flat=True)),
+            {self.order.orderdate},
+        )
+
+    def test_populate_order_details_flushes_in_batches(self):
+        other = Order.objects.create(orderdate=datetime(2026, 2, 1, tzinfo=UTC))
+        rows = [
+            (self.order.pk, self.tea.pk, ""),
+            (self.order.pk, self.coffee.pk, "7.00"),
+            (self.order.pk, 99999, "1.00"),
+            (99999, self.tea.pk, "1.00"),
+            (other.pk, self.coffee.pk, "1.00"),
+        ]
+        stderr = StringIO()
+        with (
+            tempfile.NamedTemporaryFile("w", suffix=".csv") as csv_file,
+            mock.patch.object(PopulateOrderDetails, "batch_size", 2),
+            mock.patch.object(
+                PopulateOrderDetails,
+                "flush",
+                autospec=True,
+                side_effect=PopulateOrderDetails.flush,
+            ) as flush,
+        ):
+            csv_file.write(
+                "order_id|product_id|unit_price|quantity|discount\n"
+                + "".join(f"{order}|{product}|{price}|1|0\n" for order, product, price in rows)
+            )
+            csv_file.flush()
+            call_command(
+                "populate_order_details", csv_file.name, stdout=StringIO(), stderr=stderr
+            )
+        self.assertEqual([len(call.args[1]) for call in flush.call_args_list], [2, 2, 1])
+        self.assertEqual(
+            sorted(OrderDetail.objects.values_list("order_id", "product_id", "unit_price")),
+            [
+                (self.order.pk, self.tea.pk, Decimal("4.50")),
+                (self.order.pk, self.coffee.pk, Decimal("7.00")),
+                (other.pk, self.coffee.pk, Decimal("1.00")),
+            ],
+        )
+        self.assertIn("Line 4: ", stderr.getvalue())
+        self.assertIn("Product not found (id=99999)", stderr.getvalue())
+        self.assertIn("Order not found (id=99999)", stderr.getvalue())
+
+
+class OutboxTests(TestCase):
+    def test_changes_are_captured_and_streamed(self):
+        tea = Product.objects.create(product_name="Tea", unit_price=1, units_in_stock=5)
+        order = place_order([{"product_id": tea.pk, "quantity": 2}])
+        Order.objects.filter(pk=order.pk).update(ship_name="Changed")
+        events = list(OutboxEvent.objects.values_list("table_name", "operation", "object_id"))
+        self.assertEqual(
+            events,
+            [
+                ("northwind_product", "insert", str(tea.pk)),
+                ("northwind_order", "insert", str(order.pk)),
+                ("northwind_product", "update", str(tea.pk)),
+                ("order_detail", "insert", str(order.order_details.get().pk)),
+                ("northwind_order", "update", str(order.pk)),
+            ],
+        )
+        self.assertEqual(OutboxEvent.objects.last().payload["ship_name"], "Changed")
+
+        with suppress_outbox():
+            order.order_details.all().delete()
+            order.delete()
+        self.assertEqual(OutboxEvent.objects.count(), 5)
+
+        out = StringIO()
+        call_command("stream_outbox", batch_size=2, stdout=out, stderr=StringIO())
+        streamed = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([event["operation"] for event in streamed][-1], "update")
+        self.assertEqual(len(streamed), 5)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class ConcurrentPlaceOrderTests(TransactionTestCase):
+    """Many threads ordering overlapping products must never oversell."""
+
+    threads = 8
+    orders_per_thread = 25
+
+    def test_no_overselling(self):
+        stock = {"A": 30, "B": 60, "C": 1000}
+        products = [
+            Product.objects.create(product_name=name, unit_price=1, units_in_stock=units)
+            for name, units in stock.items()
+        ]
+        placed, rejected, failures = [], [], []
+
+        def worker():
+            try:
+                for _ in range(self.orders_per_thread):
+                    # Lines in random order: place_order must lock in id order.
+                    chosen = random.sample(products, k=random.randint(1, len(products)))
+                    try:
+                        place_order(
+                            [
+                                {"product_id": p.pk, "quantity": random.randint(1, 3)}
+                                for p in chosen
+                            ]
+                        )
+                        placed.append(1)
+                    except InsufficientStock:
+                        rejected.append(1)
+            except Exception as e:  # deadlocks or other errors fail the test
+                failures.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(len(placed) + len(rejected), self.threads * self.orders_per_thread)
+        self.assertEqual(Order.objects.count(), len(placed))
+        # Demand for A and B far exceeds their stock, so both must sell out.
+        self.assertTrue(rejected)
+        for product in products:
+            product.refresh_from_db()
+            lines = OrderDetail.objects.filter(product=product)
+            sold = lines.aggregate(sold=Sum("quantity"))["sold"] or 0
+            self.assertGreaterEqual(product.units_in_stock, 0)
+            self.assertEqual(product.units_in_stock + sold, stock[product.product_name])
+
+
+class BulkUpsertTests(TestCase):
+    def test_counts_and_timestamps(self):
+        old = Shipper.objects.create(shipper_id=1, company_name="Speedy", phone="1")
+        same = Shipper.objects.create(shipper_id=2, company_name="United", phone="2")
+        shippers = [
+            Shipper(shipper_id=1, company_name="Speedy Express", phone="1"),
+            Shipper(shipper_id=2, company_name="United", phone="2"),
+            Shipper(shipper_id=3, company_name="Federal", phone="3"),
+        ]
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                Shipper.objects.bulk_upsert(shippers, unique_fields=["shipper_id"]), (1, 1)
+            )
+        changed, unchanged, new = shippers
+        self.assertEqual(changed.created_at, old.created_at)
+        self.assertGreater(changed.updated_at, old.updated_at)
+        self.assertIsNone(unchanged.created_at)
+        self.assertEqual(new.created_at, new.updated_at)
+        stored = Shipper.objects.in_bulk()
+        self.assertEqual(stored[1].company_name, "Speedy Express")
+        self.assertEqual(stored[1].created_at, old.created_at)
+        self.assertEqual(stored[2].updated_at, same.updated_at)
+        self.assertEqual(stored[3].created_at, new.created_at)
+
+        # Nothing changed: nothing is written.
+        self.assertEqual(
+            Shipper.objects.bulk_upsert(shippers, unique_fields=["shipper_id"]), (0, 0)
+        )
+
+    def test_duplicate_keys_keep_the_last_object(self):
+        shippers = [
+            Shipper(shipper_id="1", company_name="First"),
+            Shipper(shipper_id=2, company_name="Other"),
+            Shipper(shipper_id=1, company_name="Last"),
+        ]
+        self.assertEqual(
+            Shipper.objects.bulk_upsert(shippers, unique_fields=["shipper_id"]), (2, 0)
+        )
+        self.assertEqual(Shipper.objects.get(pk=1).company_name, "Last")
+        self.assertIsNone(shippers[0].created_at)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as csv_file:
+            csv_file.write("shipper_id|company_name|phone\n1|Speedy|1\n1|Speedy Express|2\n")
+            csv_file.flush()
+            call_command("populate_shippers", csv_file.name, stdout=StringIO())
+        shipper = Shipper.objects.get(pk=1)
+        self.assertEqual((shipper.company_name, shipper.phone), ("Speedy Express", "2"))
+
+    def test_populate_orders_fetches_customers_and_employees_once(self):
+        customer = CustomerContact.objects.create(
+            customer_id="C001",
+            user=NorthWindUser.objects.create_user("c@example.com", "pw"),
+            company_name="C",
+        )
+        employee = Employee.objects.create(
+            user=NorthWindUser.objects.create_user("e@example.com", "pw")
+        )
+        rows = [
+            (1, "C001", employee.pk),
+            (2, "C001", ""),
+            (3, "NULL", employee.pk),
+            (4, "C999", employee.pk),
+            (5, "C001", 99999),
+            (6, "C001", "x"),
+        ]
+        stderr = StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as csv_file:
+            csv_file.write(
+                "order_id,customer_id,employee_id,order_date\n"
+                + "".join(f"{n},{c},{e},2026-02-01\n" for n, c, e in rows)
+            )
+            csv_file.flush()
+            with CaptureQueriesContext(connection) as queries:
+                call_command(
+                    "populate_orders", csv_file.name, stdout=StringIO(), stderr=stderr
+                )
+        self.assertEqual(
+            sum(
+                '"user_accounts_customercontact"' in query["sql"]
+                or '"user_accounts_employee"' in query["sql"]
+                for query in queries.captured_queries
+            ),
+            2,
+        )
+        self.assertEqual(
+            sorted(Order.objects.values_list("order_id", "customer_id", "employee_id")),
+            [(1, customer.pk, employee.pk), (2, customer.pk, None), (3, None, employee.pk)],
+        )
+        self.assertIn("CustomerContact not found (id=C999)", stderr.getvalue())
+        self.assertIn("Employee not found (id=99999)", stderr.getvalue())
+        self.assertIn("Invalid integer: 'x'", stderr.getvalue())
+
+
+class PartitioningTests(TestCase):
+    MONTH = date(2031, 3, 1)
+
+    def setUp(self):
+        self.tea = Product.objects.create(product_name="Tea", unit_price=4)
+
+    def order(self, orderdate):
+        order = Order.objects.create(orderdate=orderdate)
+        OrderDetail.objects.create(order=order, product=self.tea, quantity=1)
+        # Run the deferred foreign key checks, which would block ALTER TABLE.
+        connection.check_constraints()
+        return order
+
+    def partition_rows(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(name)}")
+            return cursor.fetchone()[0]
+
+    def test_tables_are_partitioned_by_month(self):
+        for table, column in PARTITION_KEYS.items():
+            with self.subTest(table=table):
+                self.assertTrue(is_partitioned(connection, table))
+                months = [month for _name, month in list_partitions(connection, table)]
+                self.assertIn(month_start(timezone.now().date()), months)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+                        "AND indexdef LIKE %s",
+                        [table, "%UNIQUE%"],
+                    )
+                    definitions = [row[0] for row in cursor.fetchall()]
+                # The primary key became a unique index including the date.
+                pk = OrderDetail._meta.pk.column if table == "order_detail" else "order_id"
+                self.assertIn(f"({pk}, {column}) NULLS NOT DISTINCT", " ".join(definitions))
+
+    def test_new_partitions_take_their_rows_from_default(self):
+        march = self.order(datetime(2031, 3, 15, tzinfo=UTC))
+        for table in PARTITION_KEYS:
+            self.assertTrue(create_partition(connection, table, self.MONTH))
+            self.assertFalse(create_partition(connection, table, self.MONTH))
+            self.assertEqual(self.partition_rows(partition_name(table, self.MONTH)), 1)
+            self.assertEqual(self.partition_rows(default_partition_name(table)), 0)
+
+        # Queries bounded to the month only scan its partitions.
+        start, end = datetime(2031, 3, 1, tzinfo=UTC), datetime(2031, 4, 1, tzinfo=UTC)
+        orders = Order.objects.filter(orderdate__gte=start)
+        plan = orders.filter(orderdate__lt=end).explain()
+        self.assertIn("northwind_order_p203103", plan)
+        self.assertNotIn("northwind_order_default", plan)
+        self.assertNotIn("northwind_order_p2026", plan)
+        lines = OrderDetail.objects.filter(order_date__gte=start, order_date__lt=end)
+        self.assertNotIn("order_detail_default", lines.explain())
+        self.assertEqual(list(orders), [march])
+
+    def test_old_months_are_detached(self):
+        self.order(datetime(2031, 3, 15, tzinfo=UTC))
+        for table in PARTITION_KEYS:
+            create_partition(connection, table, self.MONTH)
+        call_command(
+            "manage_order_partitions",
+            "--months-ahead=0",
+            "--detach-before=2031-04-01",
+            stdout=StringIO(),
+        )
+        for table in PARTITION_KEYS:
+            self.assertEqual(list_partitions(connection, table), [])
+            # Kept as a plain table, out of the live one.
+            self.assertEqual(self.partition_rows(partition_name(table, self.MONTH)), 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderDetail.objects.exists())
+
+    def test_changing_orderdate_moves_the_lines(self):
+        order = self.order(datetime(2031, 3, 15, tzinfo=UTC))
+        order.orderdate = datetime(2031, 5, 2, tzinfo=UTC)
+        order.save()
+        self.assertEqual(
+            list(OrderDetail.objects.values_list("order_date", flat=True)), [order.orderdate]
+        )
+        order.ship_name = "Unchanged date"
+        with self.assertNumQueries(1):
+            order.save()
+
+    def test_order_ids_are_unique_per_date_only(self):
+        # Documented tradeoff: the database accepts an explicit id once per date.
+        march = self.order(datetime(2031, 3, 15, tzinfo=UTC))
+        may = datetime(2031, 5, 2, tzinfo=UTC)
+        Order.objects.bulk_create([Order(order_id=march.pk, orderdate=may)])
+        self.assertEqual(Order.objects.filter(pk=march.pk).count(), 2)
+
+    def test_sync_orderdates(self):
+        moved = self.order(datetime(2031, 3, 15, tzinfo=UTC))
+        kept = self.order(datetime(2031, 3, 16, tzinfo=UTC))
+        moved.orderdate = datetime(2031, 5, 2, tzinfo=UTC)
+        with self.assertNumQueries(1):
+            self.assertEqual(Order.objects.sync_orderdates([moved, kept, Order()]), 1)
+        self.assertEqual(
+            sorted(Order.objects.values_list("order_id", "orderdate")),
+            [(moved.pk, moved.orderdate), (kept.pk, kept.orderdate)],
+        )
+        self.assertEqual(
+            sorted(OrderDetail.objects.values_list("order_id", "order_date")),
+            [(moved.pk, moved.orderdate), (kept.pk, kept.orderdate)],
+        )
+        # An upsert on (order_id, orderdate) now updates the moved order.
+        moved.ship_name = "Moved"
+        Order.objects.bulk_upsert([moved], unique_fields=["order_id", "orderdate"])
+        self.assertEqual(Order.objects.get(pk=moved.pk).ship_name, "Moved")
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        tea = Product.objects.create(product_name="Tea", unit_price=4)
+        coffee = Product.objects.create(product_name="Coffee", unit_price=9)
+        self.orders = []
+        for orderdate in (
+            datetime(2019, 4, 2, tzinfo=UTC),
+            datetime(2019, 5, 30, tzinfo=UTC),
+            datetime(2020, 2, 1, tzinfo=UTC),
+        ):
+            order = Order.objects.create(orderdate=orderdate)
+            for product in (tea, coffee):
+                OrderDetail.objects.create(order=order, product=product, quantity=1)
+            self.orders.append(order)
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_archive_and_read_through(self):
+        out = StringIO()
+        call_command(
+            "archive_orders",
+            "--before=2020-01-01",
+            "--batch-size=1",
+            f"--archive-dir={self.directory}",
+            stdout=out,
+        )
+        self.assertIn("Archived 2 orders and 4 lines", out.getvalue())
+        archived, hot = self.orders[:2], self.orders[2]
+
+        files = load_manifest(self.directory)["files"]
+        self.assertEqual(
+            sorted((entry["dataset"], entry["path"].split("/part-")[0]) for entry in files),
+            [
+                ("order_details", "order_details/year=2019/month=04"),
+                ("order_details", "order_details/year=2019/month=05"),
+                ("orders", "orders/year=2019/month=04"),
+                ("orders", "orders/year=2019/month=05"),
+            ],
+        )
+        for entry in files:
+            self.assertTrue((self.directory / entry["path"]).exists())
+            self.assertEqual(entry["rows"], 1 if entry["dataset"] == "orders" else 2)
+        self.assertEqual(list(Order.objects.all()), [hot])
+        self.assertEqual(set(OrderDetail.objects.values_list("order_id", flat=True)), {hot.pk})
+
+        start, end = datetime(2019, 1, 1, tzinfo=UTC), datetime(2021, 1, 1, tzinfo=UTC)
+        orders = orders_between(start, end, self.directory)
+        ids = [order.pk for order in self.orders]
+        self.assertEqual(sorted(row["order_id"] for row in orders), ids)
+        self.assertEqual(
+            [row["orderdate"] for row in orders if row["order_id"] == archived[0].pk],
+            [archived[0].orderdate],
+        )
+        lines = order_details_between(start, end, self.directory)
+        self.assertEqual(sorted(row["order_id"] for row in lines), sorted(ids * 2))
+        # Only the files of the months asked for are read.
+        may = orders_between(datetime(2019, 5, 1, tzinfo=UTC), end, self.directory)
+        self.assertEqual(sorted(row["order_id"] for row in may), [archived[1].pk, hot.pk])
+
+    def test_rerun_after_a_failed_delete(self):
+        def archive():
+            call_command(
+                "archive_orders",
+                "--before=2020-01-01",
+                f"--archive-dir={self.directory}",
+                stdout=StringIO(),
+            )
+
+        with (
+            mock.patch("northwind.archive.suppress_outbox", side_effect=RuntimeError),
+            self.assertRaises(RuntimeError),
+        ):
+            archive()
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(len(load_manifest(self.directory)["files"]), 4)
+
+        archive()
+        self.assertEqual(list(Order.objects.all()), self.orders[2:])
+        self.assertEqual(len(load_manifest(self.directory)["files"]), 4)
+        start, end = datetime(2019, 1, 1, tzinfo=UTC), datetime(2021, 1, 1, tzinfo=UTC)
+        self.assertEqual(
+            sorted(row["order_id"] for row in orders_between(start, end, self.directory)),
+            [order.pk for order in self.orders],
+        )
+        lines = order_details_between(start, end, self.directory)
+        self.assertEqual(len(lines), 6)
+
+
+# A replica's test mirror cannot see rows this test has not committed.
+@override_settings(DATABASE_PIN="primary")
+class OrderAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(NorthWindUser.objects.create_superuser("a@example.com", "pw"))
+        self.tea, self.coffee, self.milk = (
+            Product.objects.create(product_name=name, unit_price=price)
+            for name, price in (("Tea", "4.50"), ("Coffee", "9.00"), ("Milk", "1.20"))
+        )
+        self.order = Order.objects.create(orderdate=datetime(2026, 1, 5, tzinfo=UTC))
+        self.kept, self.deleted = (
+            OrderDetail.objects.create(order=self.order, product=product, quantity=1)
+            for product in (self.tea, self.coffee)
+        )
+        self.url = reverse("admin:northwind_order_change", args=[self.order.pk])
+
+    def post(self, *lines):
+        data = {
+            "orderdate_0": "2026-01-05",
+            "orderdate_1": "00:00:00",
+            "freight": "0",
+            "order_details-TOTAL_FORMS": len(lines),
+            "order_details-INITIAL_FORMS": 2,
+            "order_details-MIN_NUM_FORMS": 0,
+            "order_details-MAX_NUM_FORMS": 1000,
+        }
+        for n, line in enumerate(lines):
+            data.update(
+                {f"order_details-{n}-{k}": v for k, v in {"discount": 0, **line}.items()},
+                **{f"order_details-{n}-order": self.order.pk},
+            )
+        return self.client.post(self.url, data)
+
+    def lines(self, *new):
+        return (
+            {"id": self.kept.pk, "product": self.tea.pk, "quantity": 5, "unit_price": "4.00"},
+            {"id": self.deleted.pk, "product": self.coffee.pk, "quantity": 1, "DELETE": "on"},
+            *({"product": product.pk, "quantity": 2} for product in new),
+        )
+
+    def test_saves_lines_in_bulk(self):
+        # The test client resets connection.queries at every request.
+        sql = []
+
+        def record(execute, query, *args):
+            sql.append(query)
+            return execute(query, *args)
+
+        with connection.execute_wrapper(record):
+            response = self.post(*self.lines(self.milk))
+        self.assertRedirects(response, reverse("admin:northwind_order_changelist"))
+        lines = {line.product_id: line for line in self.order.order_details.all()}
+        self.assertEqual(set(lines), {self.tea.pk, self.milk.pk})
+        self.assertEqual(
+            (lines[self.tea.pk].quantity, lines[self.tea.pk].unit_price), (5, Decimal("4.00"))
+        )
+        milk = lines[self.milk.pk]
+        self.assertEqual(
+            (milk.unit_price, milk.order_date), (Decimal("1.20"), self.order.orderdate)
+        )
+
+        # Products are read once for all lines, and lines are written with
+        # one statement per kind, however many there are.
+        for prefix in (
+            'SELECT "northwind_product"',
+            'INSERT INTO "order_detail"',
+            'UPDATE "order_detail"',
+            'DELETE FROM "order_detail"',
+        ):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(sum(query.startswith(prefix) for query in sql), 1)
+        self.assertEqual(len(sql), 17)
+
+    def test_rejects_duplicated_products(self):
+        response = self.post(*self.lines(self.milk, self.milk))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Please correct the duplicate data for product.",
+            response.context["inline_admin_formsets"][0].formset.non_form_errors(),
+        )
+        self.assertEqual(
+            sorted(self.order.order_details.values_list("product_id", "quantity")),
+            [(self.tea.pk, 1), (self.coffee.pk, 1)],
+        )
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        self.tea = Category.objects.create(category_name="Tea")
+        self.coffee = Category.objects.create(category_name="Coffee")
+        self.cache = ReferenceCache(Category)
+        self.addCleanup(unsubscribe, Category, self.cache.evict)
+
+    def test_reads_through_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.get_by_id(self.tea.pk), self.tea)
+            self.assertEqual(self.cache.get_by_id(str(self.tea.pk)), self.tea)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.all(), [self.coffee, self.tea])
+            self.assertEqual(self.cache.all(), [self.coffee, self.tea])
+            self.assertEqual(self.cache.get_by_id(self.coffee.pk).category_name, "Coffee")
+            with self.assertRaises(Category.DoesNotExist):
+                self.cache.get_by_id(0)
+
+    def test_saves_and_deletes_evict(self):
+        self.cache.all()
+        self.tea.category_name = "Green Tea"
+        self.tea.save()
+        self.assertEqual(self.cache.get_by_id(self.tea.pk).category_name, "Green Tea")
+        self.coffee.delete()
+        self.assertEqual(self.cache.all(), [self.tea])
+        with self.assertRaises(Category.DoesNotExist):
+            self.cache.get_by_id(self.coffee.pk)
+
+    def test_size_cap(self):
+        cache = ReferenceCache(Category, max_size=1)
+        self.addCleanup(unsubscribe, Category, cache.evict)
+        cache.get_by_id(self.tea.pk)
+        cache.get_by_id(self.coffee.pk)
+        with self.assertNumQueries(1):
+            cache.get_by_id(self.tea.pk)
+        # Too many rows to keep them all: all() queries every time.
+        with self.assertNumQueries(2):
+            cache.all()
+            cache.all()
+
+    def test_only_cached_models(self):
+        # Other processes would not send changes to products.
+        with self.assertRaises(ImproperlyConfigured):
+            reference_cache(Product)
+
+
+class QueryCacheTests(TestCase):
+    def setUp(self):
+        self.tea = Product.objects.create(product_name="Tea", unit_price=4, units_in_stock=5)
+        query_cache.reset_stats()
+
+    def assert_cached(self, evaluate, expected):
+        with self.assertNumQueries(1):
+            self.assertEqual(evaluate(), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(evaluate(), expected)
+
+    def test_writes_to_dependencies_invalidate(self):
+        order = place_order([{"product_id": self.tea.pk, "quantity": 2}])
+        tea_orders = Order.objects.filter(order_details__product__product_name="Tea")
+        self.assert_cached(lambda: query_cache.cached(tea_orders), [order])
+        lines = OrderDetail.objects.filter(product=self.tea)
+        self.assert_cached(
+            lambda: query_cache.cached_aggregate(lines, n=Count("pk")), {"n": 1}
+        )
+        self.assert_cached(
+            lambda: query_cache.cached(lines.values_list("quantity", flat=True)), [2]
+        )
+
+        # A product rename must invalidate the join, even via QuerySet.update().
+        Product.objects.filter(pk=self.tea.pk).update(product_name="Green Tea")
+        self.assert_cached(lambda: query_cache.cached(tea_orders), [])
+        OrderDetail.objects.filter(order=order).delete()
+        self.assert_cached(
+            lambda: query_cache.cached_aggregate(lines, n=Count("pk")), {"n": 0}
+        )
+        self.assertEqual(query_cache.stats(), {"hits": 5, "misses": 5, "hit_rate": 0.5})
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": directory,
+            }
+            with override_settings(CACHES={"default": backend}):
+                products = Product.objects.order_by("pk")
+                self.assert_cached(lambda: query_cache.cached(products), [self.tea])
+                self.tea.save()
+                self.assertEqual(query_cache.cached(products), [self.tea])
+                self.assertEqual(query_cache.stats()["misses"], 2)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], DATABASE_PIN=None)
+class ReplicaRouterTests(SimpleTestCase):
+    def request(self, view, **cookies):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies)
+        return ReplicaMiddleware(view)(request)
+
+    def test_requests_read_from_replicas_until_they_write(self):
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Product))
+            with use_primary():
+                reads.append(router.db_for_read(Product))
+            reads.append(router.db_for_write(Product))
+            reads.append(router.db_for_read(Product))
+            with use_replica():
+                reads.append(router.db_for_read(Product))
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(reads, ["replica1", "default", "default", "default", "replica1"])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # The next request from the same client stays on the primary.
+        reads.clear()
+        self.request(
+            lambda request: reads.append(router.db_for_read(Product)) or HttpResponse()
+        )
+        self.assertEqual(reads, ["replica1"])
+        self.request(
+            lambda request: reads.append(router.db_for_read(Product)) or HttpResponse(),
+            **{STICKY_COOKIE: "1"},
+        )
+        self.assertEqual(reads, ["replica1", "default"])
+
+    def test_commands_use_the_primary_unless_pinned(self):
+        # A fresh context, as this thread has written in earlier tests.
+        read = contextvars.Context().run
+        self.assertEqual(read(router.db_for_read, Product), "default")
+        with self.settings(DATABASE_PIN="replica"):
+            self.assertEqual(read(router.db_for_read, Product), "replica1")
+        self.assertFalse(router.allow_migrate("replica1", "northwind"))
+
+
+class RequestTransactionTests(TestCase):
+    def call(self, method, view):
+        request = RequestFactory().generic(method, "/")
+        middleware = RequestTransactionMiddleware(lambda request: HttpResponse())
+        return middleware.process_view(request, view, (), {})
+
+    def test_only_unsafe_methods_are_atomic(self):
+        outer = len(connection.atomic_blocks)
+        depth = []
+
+        def view_factory():
+            # The decorators mark the view function itself.
+            def view(request):
+                depth.append(len(connection.atomic_blocks) - outer)
+                return HttpResponse()
+
+            return view
+
+        self.assertIsNone(self.call("GET", view_factory()))  # Django calls the view
+        self.call("POST", view_factory())
+        self.assertIsNone(self.call("POST", transaction.non_atomic_requests(view_factory())))
+        self.call("GET", read_only_transaction(view_factory()))
+        self.assertEqual(depth, [1, 1])
+
+    def test_failed_writes_roll_back(self):
+        def view(request):
+            Category.objects.create(category_name="Tea")
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.call("POST", view)
+        self.assertFalse(Category.objects.exists())
+
+    @override_settings(DATABASE_REPLICAS=["replica1"], DATABASE_PIN=None)
+    def test_unsafe_method_views_read_from_the_primary(self):
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Product))
+            return HttpResponse()
+
+        middleware = RequestTransactionMiddleware(None)
+        for method in ("GET", "POST"):
+            ReplicaMiddleware(
+                # Django calls the view when process_view() returns None.
+                lambda request: middleware.process_view(request, view, (), {}) or view(request)
+            )(RequestFactory().generic(method, "/"))
+        self.assertEqual(reads, ["replica1", "default"])
+
+    def test_read_only_views_cannot_write(self):
+        @read_only_transaction
+        def view(request):
+            Category.objects.create(category_name="Tea")
+
+        with self.assertRaises(DatabaseError):
+            self.call("GET", view)
+
+
+class PoolStatsTests(TestCase):
+    def test_stats(self):
+        Category.objects.exists()
+        stats = pool_stats()
+        if not connection.settings_dict["OPTIONS"].get("pool"):
+            self.assertIsNone(stats)
+            return
+        # This test holds its connection for the whole transaction.
+        self.assertGreaterEqual(stats["checked_out"], 1)
+        self.assertGreaterEqual(stats["requests"], 1)
+        self.assertEqual(stats["connection_errors"], 0)
+
+
+class ProfilingTests(TestCase):
+    def test_profile_records_queries_and_call_sites(self):
+        with profile_queries("block", "test") as profile:
+            list(Category.objects.all())
+            Category.objects.count()
+        self.assertEqual(len(profile.queries), 2)
+        summary = profile.summary()
+        self.assertEqual(summary["queries"], 2)
+        self.assertTrue(summary["slowest"][0]["call_site"].startswith("northwind/tests.py:"))
+
+    @override_settings(SQL_PROFILE_SAMPLE_RATE=1, SQL_PROFILE_SLOW_MS=0)
+    def test_slow_requests_are_logged_as_json(self):
+        def view(request):
+            Category.objects.exists()
+            return HttpResponse()
+
+        middleware = SQLProfilingMiddleware(view)
+        with self.assertLogs("_config.profiling", "WARNING") as logs:
+            middleware(RequestFactory().get("/categories/"))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["label"], "GET /categories/")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["queries"], 1)
+
+    @override_settings(SQL_PROFILE_SAMPLE_RATE=0, SQL_PROFILE_SLOW_MS=0)
+    def test_unsampled_requests_are_not_profiled(self):
+        middleware = SQLProfilingMiddleware(lambda request: HttpResponse())
+        with self.assertNoLogs("_config.profiling"):
+            middleware(RequestFactory().get("/"))
+
+
+def employee_names(request):
+    return HttpResponse(", ".join(map(str, Employee.objects.all())))
+
+
+def rename_employees(request):
+    Employee.objects.update(title=request.POST["title"])
+    return HttpResponse(", ".join(Employee.objects.values_list("title", flat=True)))
+
+
+# For tests that send requests through the whole MIDDLEWARE stack.
+urlpatterns = [
+    path("employees/", employee_names),
+    path("employees/rename/", rename_employees),
+]
+
+
+@override_settings(NPLUSONE_MIN_REPEATS=3)
+class NPlusOneTests(TestCase):
+    def setUp(self):
+        for n in range(3):
+            user = NorthWindUser.objects.create_user(f"employee{n}@example.com", "pw")
+            Employee.objects.create(user=user)
+            Order.objects.create()
+
+    def test_lazy_foreign_keys_are_reported(self):
+        with self.assertRaises(NPlusOneError) as caught:
+            with forbid_n_plus_one():
+                [str(employee) for employee in Employee.objects.all()]
+        report = str(caught.exception)
+        self.assertIn("3 similar queries on 'default' from user_accounts/models.py:", report)
+        self.assertIn("select_related('user') on the Employee queryset", report)
+
+        with forbid_n_plus_one():
+            [str(employee) for employee in Employee.objects.select_related("user")]
+
+    def test_reverse_relations_are_reported(self):
+        with self.assertRaisesMessage(NPlusOneError, "prefetch_related('order_details')"):
+            with forbid_n_plus_one():
+                [list(order.order_details.all()) for order in Order.objects.all()]
+
+        with forbid_n_plus_one():
+            orders = Order.objects.prefetch_related("order_details")
+            [list(order.order_details.all()) for order in orders]
+
+    @override_settings(NPLUSONE_DETECTION="raise")
+    def test_middleware_fails_requests_in_raise_mode(self):
+        def view(request):
+            return HttpResponse(", ".join(map(str, Employee.objects.all())))
+
+        with self.assertRaises(NPlusOneError):
+            NPlusOneMiddleware(view)(RequestFactory().get("/"))
+
+    # Primary only: a replica's test mirror cannot see uncommitted rows.
+    @override_settings(
+        ROOT_URLCONF=__name__,
+        DATABASE_PIN="primary",
+        NPLUSONE_DETECTION="log",
+        SQL_PROFILE_SAMPLE_RATE=1,
+        SQL_PROFILE_SLOW_MS=0,
+    )
+    def test_reports_through_the_middleware_stack_name_the_view(self):
+        # Every middleware's execute wrapper is between the view and the query.
+        with self.assertLogs("_config", "WARNING") as logs:
+            self.client.get("/employees/")
+        by_logger = {record.name: record.getMessage() for record in logs.records}
+        report = by_logger["_config.nplusone"]
+        self.assertIn("3 similar queries on 'default' from user_accounts/models.py:", report)
+        self.assertIn("at northwind/tests.py:", report)
+        self.assertNotIn("_config/metrics.py", report)
+        self.assertIn("select_related('user') on the Employee queryset", report)
+        profile = json.loads(by_logger["_config.profiling"])
+        for query in profile["slowest"]:
+            self.assertFalse(query["call_site"].startswith("_config/metrics.py"), query)
+
+    @override_settings(
+        ROOT_URLCONF=__name__,
+        DATABASE_PIN="primary",
+        SQL_PROFILE_SAMPLE_RATE=1,
+        SQL_PROFILE_SLOW_MS=0,
+    )
+    def test_profiles_of_unsafe_requests_name_the_view(self):
+        # The view runs inside the transaction and routing middlewares' frames.
+        with self.assertLogs("_config.profiling", "WARNING") as logs:
+            self.client.post("/employees/rename/", {"title": "Rep"})
+        profile = json.loads(logs.records[0].getMessage())
+        sites = {query["sql"].split()[0]: query["call_site"] for query in profile["slowest"]}
+        self.assertTrue(sites["SELECT"].endswith("in rename_employees"), sites)
+        # UPDATE goes through TimeStampedQuerySet.update, which is project code.
+        self.assertTrue(sites["UPDATE"].startswith("_config/helpers.py"), sites)
+        for site in sites.values():
+            self.assertFalse(
+                site and site.startswith(("_config/transactions.py", "_config/replicas.py")),
+                sites,
+            )
+
+
+# Libraries only the commands that use them may import when they run.
+HEAVY_IMPORTS = {"pandas", "pyarrow", "geopy", "timezonefinder"}
+
+LOAD_PROJECT_COMMANDS = """
+import json, sys, django
+django.setup()
+from django.core.management import get_commands, load_command_class
+for name, app in get_commands().items():
+    if app in ("northwind", "user_accounts"):
+        load_command_class(app, name)
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+# Primary only: a replica's test mirror cannot see uncommitted rows. No
+# sampling or N+1 checks, whose stack walks would add to the timings.
+@override_settings(DATABASE_PIN="primary", SQL_PROFILE_SAMPLE_RATE=0, NPLUSONE_DETECTION="")
+class PerformanceTests(BudgetTestMixin, TestCase):
+    """Query and latency budgets (perf_baseline.json) on fixed-size data."""
+
+    ORDERS = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        shippers = [Shipper.objects.create(company_name=f"Shipper {n}") for n in range(3)]
+        categories = [Category.objects.create(category_name=f"Cat {n}") for n in range(4)]
+        cls.products = [
+            Product.objects.create(
+                product_name=f"Product {n}",
+                category=categories[n % 4],
+                unit_price=Decimal("2.50") + n,
+                units_in_stock=1_000_000,
+            )
+            for n in range(20)
+        ]
+        customers = [
+            CustomerContact.objects.create(
+                customer_id=f"C{n:03}",
+                user=NorthWindUser.objects.create_user(f"customer{n}@example.com", "pw"),
+                company_name=f"Customer {n}",
+            )
+            for n in range(10)
+        ]
+        employees = [
+            Employee.objects.create(
+                user=NorthWindUser.objects.create_user(f"employee{n}@example.com", "pw")
+            )
+            for n in range(5)
+        ]
+        for n in range(cls.ORDERS):
+            order = Order.objects.create(
+                customer=customers[n % 10],
+                employee=employees[n % 5],
+                ship_via=shippers[n % 3],
+                orderdate=datetime(2026, 1, 1 + n % 28, tzinfo=UTC),
+                freight=Decimal("10.00"),
+            )
+            for product in cls.products[n % 10 :: 10]:
+                OrderDetail.objects.create(
+                    order=order,
+                    product=product,
+                    order_date=order.orderdate,
+                    unit_price=product.unit_price,
+                    quantity=1 + n % 3,
+                )
+        cls.admin = NorthWindUser.objects.create_superuser("admin@example.com", "pw")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_changelists(self):
+        for model in ("order", "orderdetail", "product", "category"):
+            with self.subTest(model=model):
+                url = reverse(f"admin:northwind_{model}_changelist")
+                self.assertWithinBudget(f"admin.{model}.changelist", self.get, url)
+
+    def test_reports(self):
+        query = {"start": "2026-01-01", "end": "2026-02-01"}
+        for name, tz in (("order", "America/Halifax"), ("sales", "customer")):
+            with self.subTest(report=name, tz=tz):
+                self.assertWithinBudget(
+                    f"api.{name}_report",
+                    self.client.get,
+                    reverse(f"northwind:{name}_report"),
+                    {**query, "tz": tz},
+                )
+
+    def test_admin_order_change_form(self):
+        url = reverse("admin:northwind_order_change", args=[Order.objects.first().pk])
+        self.assertWithinBudget("admin.order.change", self.get, url)
+
+    def test_place_order_api(self):
+        url = reverse("northwind:place_order")
+        body = json.dumps(
+            {"lines": [{"product_id": p.pk, "quantity": 1} for p in self.products[:5]]}
+        )
+
+        def post():
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+
+        self.assertWithinBudget("api.place_order", post)
+
+    def test_ingest_orders_api(self):
+        url = reverse("northwind:ingest_orders")
+        keys = itertools.count()
+
+        def post():
+            orders = [
+                {
+                    "idempotency_key": f"perf-{next(keys)}",
+                    "customer_id": "C001",
+                    "lines": [{"product_id": p.pk, "quantity": 2} for p in self.products[:3]],
+                }
+                for _ in range(self.ORDERS)
+            ]
+            body = json.dumps({"orders": orders})
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.json()["results"][0]["status"], "created")
+
+        self.assertWithinBudget("api.ingest_orders", post)
+
+    def test_import_commands(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        categories = directory / "categories.csv"
+        categories.write_text(
+            "category_id|category_name|description\n"
+            + "".join(f"{n}|Category {n}|Imported\n" for n in range(100, 100 + self.ORDERS))
+        )
+        employee_ids = list(Employee.objects.values_list("pk", flat=True))
+        shipper = Shipper.objects.first().pk
+        orders = directory / "orders.csv"
+        orders.write_text(
+            "order_id,customer_id,employee_id,ship_via,order_date,freight\n"
+            + "".join(
+                f"{n},C{n % 10:03},{employee_ids[n % 5]},{shipper},2026-02-01,5.00\n"
+                for n in range(90_000, 90_000 + self.ORDERS)
+            )
+        )
+        for command, csv_file in (
+            ("populate_category", categories),
+            ("populate_orders", orders),
+        ):
+            with self.subTest(command=command):
+                self.assertWithinBudget(
+                    f"command.{command}",
+                    call_command,
+                    command,
+                    str(csv_file),
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+        # Order lines are only inserted, so every run imports other products.
+        runs = itertools.count()
+
+        def import_order_details():
+            run = next(runs)
+            details = directory / f"details{run}.csv"
+            details.write_text(
+                "order_id|product_id|unit_price|quantity|discount\n"
+                + "".join(
+                    f"{n}|{self.products[(n + run) % 20].pk}|3.00|1|0\n"
+                    for n in range(90_000, 90_000 + self.ORDERS)
+                )
+            )
+            call_command("populate_order_details", str(details), stdout=StringIO())
+
+        self.assertWithinBudget("command.populate_order_details", import_order_details)
+
+    def test_manage_py_cold_start(self):
+        def python(*args):
+            return subprocess.run(
+                [sys.executable, *args],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+
+        self.assertWithinBudget("manage.help", python, "manage.py", "help")
+        # Loading a command, e.g. for --help, imports none of them.
+        modules = json.loads(python("-c", LOAD_PROJECT_COMMANDS).stdout)
+        self.assertEqual(HEAVY_IMPORTS.intersection(modules), set())
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def loadtest(self, *args):
+        out = StringIO()
+        call_command("loadtest", *args, "--host", "testserver", stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_scenarios_in_process(self):
+        NorthWindUser.objects.create_user("load@example.com", "load-pw")
+        self.enterContext(mock.patch.dict("os.environ", LOADTEST_PASSWORD="load-pw"))
+        for interface in ("wsgi", "asgi"):
+            with self.subTest(interface=interface):
+                report = self.loadtest(
+                    "login",
+                    "--interface",
+                    interface,
+                    "--email",
+                    "load@example.com",
+                    "--concurrency",
+                    "2",
+                    "--iterations",
+                    "2",
+                )
+                self.assertEqual(report["requests"], 12)
+                self.assertEqual(report["errors"], 0)
+                self.assertEqual(set(report["steps"]), {"login page", "login", "logout"})
+                self.assertLessEqual(report["latency_ms"]["p50"], report["latency_ms"]["p99"])
+
+    def test_failed_steps_count_as_errors(self):
+        scenario = self.enterContext(tempfile.NamedTemporaryFile("w", suffix=".json"))
+        json.dump({"steps": [{"name": "missing", "path": "/missing/"}]}, scenario)
+        scenario.flush()
+        report = self.loadtest(scenario.name, "--concurrency", "1", "--iterations", "3")
+        self.assertEqual((report["requests"], report["errors"]), (3, 3))
+        self.assertEqual(report["error_rate"], 1.0)
+
+    def test_failed_setup_aborts_the_run(self):
+        NorthWindUser.objects.create_superuser("load@example.com", "load-pw")
+        admin_orders = ["admin_orders", "--email", "load@example.com", "--iterations", "1"]
+        with mock.patch.dict("os.environ", LOADTEST_PASSWORD="load-pw"):
+            report = self.loadtest(*admin_orders, "--concurrency", "1")
+        self.assertEqual((report["requests"], report["errors"]), (2, 0))
+
+        # Otherwise every admin page would be a redirect to the login page.
+        self.enterContext(mock.patch.dict("os.environ", LOADTEST_PASSWORD="wrong"))
+        for interface in ("wsgi", "asgi"):
+            with (
+                self.subTest(interface=interface),
+                self.assertRaisesMessage(
+                    CommandError, "Setup step 'login' got status 200, expected 302"
+                ),
+            ):
+                self.loadtest(*admin_orders, "--interface", interface, "--concurrency", "2")
+
+
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_queries_and_caches(self):
+        view = "northwind:ingest_orders"
+        before = self.sample("http_requests_total", view=view, method="POST", status="403")
+        queries = self.sample("db_queries_total", database="default")
+        hits = self.sample("cache_requests_total", cache="query", outcome="hit")
+
+        user = NorthWindUser.objects.create_user("c@example.com", "pw")
+        self.client.force_login(user)
+        self.client.post(reverse(view), "{}", content_type="application/json")  # not staff
+        query_cache.cached(Category.objects.all())
+        query_cache.cached(Category.objects.all())
+
+        after = self.sample("http_requests_total", view=view, method="POST", status="403")
+        self.assertEqual(after - before, 1)
+        self.assertGreater(self.sample("db_queries_total", database="default"), queries)
+        self.assertEqual(
+            self.sample("cache_requests_total", cache="query", outcome="hit") - hits, 1
+        )
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            b'http_request_duration_seconds_bucket{le="0.005",view=', response.content
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_scrapes_are_limited_to_allowed_ips(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+    def test_import_progress(self):
+        path = self.enterContext(tempfile.NamedTemporaryFile("w", suffix=".csv"))
+        path.write("category_id|category_name|description\n1|Tea|\n2||\n3|Coffee|\n")
+        path.flush()
+        command = "populate_category"
+        rows = self.sample("import_rows_total", command=command)
+        errors = self.sample(
+            "import_errors_total", command=command, error="missing category_name"
+        )
+        call_command(command, path.name, stdout=StringIO())
+        self.assertEqual(self.sample("import_rows_total", command=command) - rows, 3)
+        self.assertEqual(
+            self.sample("import_errors_total", command=command, error="missing category_name")
+            - errors,
+            1,
+        )
+        self.assertEqual(
+            self.sample("import_runs_total", command=command, outcome="succeeded"), 1
+        )
+        self.assertGreater(self.sample("import_rows_per_second", command=command), 0)
+
+
+class TracingTests(TestCase):
+    def setUp(self):
+        self.trace_file = Path(self.enterContext(tempfile.TemporaryDirectory())) / "t.jsonl"
+
+    def traces(self):
+        """Spans of each exported trace, with attributes as a dict."""
+        if not self.trace_file.exists():
+            return []
+        traces = []
+        for line in self.trace_file.read_text().splitlines():
+            (resource,) = json.loads(line)["resourceSpans"]
+            spans = resource["scopeSpans"][0]["spans"]
+            for exported in spans:
+                exported["attributes"] = {
+                    a["key"]: next(iter(a["value"].values())) for a in exported["attributes"]
+                }
+            traces.append(spans)
+        return traces
+
+    def test_request_spans(self):
+        admin = NorthWindUser.objects.create_superuser("admin@example.com", "pw")
+        self.client.force_login(admin)
+        Order.objects.create()
+        with self.settings(TRACE_SAMPLE_RATE=1, TRACE_FILE=self.trace_file):
+            response = self.client.get(reverse("admin:northwind_order_changelist"))
+        self.assertEqual(response.status_code, 200)
+
+        (spans,) = self.traces()
+        root = spans[-1]
+        self.assertEqual(root["name"], "GET admin/northwind/order/")
+        self.assertEqual(root["attributes"]["http.response.status_code"], "200")
+        self.assertNotIn("parentSpanId", root)
+        self.assertEqual({s["traceId"] for s in spans}, {root["traceId"]})
+        (render,) = [s for s in spans if s["name"] == "render admin/change_list.html"]
+        self.assertEqual(render["parentSpanId"], root["spanId"])
+        # Querysets the changelist evaluates while rendering nest under the render.
+        queries = [s for s in spans if s["attributes"].get("db.system") == "postgresql"]
+        self.assertEqual(
+            {s["parentSpanId"] for s in queries}, {root["spanId"], render["spanId"]}
+        )
+
+    def test_traceparent_sampling(self):
+        trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+        def get(flags, **overrides):
+            with self.settings(TRACE_FILE=self.trace_file, **overrides):
+                self.client.get(
+                    reverse("home"),
+                    headers={"traceparent": f"00-{trace_id}-{parent_id}-{flags}"},
+                )
+
+        # Clients cannot make the server trace; sampled requests continue theirs.
+        get("01", TRACE_SAMPLE_RATE=0)
+        self.assertEqual(self.traces(), [])
+        get("00", TRACE_SAMPLE_RATE=1)
+        (spans,) = self.traces()
+        self.assertEqual(spans[-1]["traceId"], trace_id)
+        self.assertEqual(spans[-1]["parentSpanId"], parent_id)
+
+        # A trusted parent decides either way.
+        self.trace_file.unlink()
+        get("00", TRACE_SAMPLE_RATE=1, TRACE_TRUST_PARENT=True)
+        self.assertEqual(self.traces(), [])
+        get("01", TRACE_SAMPLE_RATE=0, TRACE_TRUST_PARENT=True)
+        (spans,) = self.traces()
+        self.assertEqual(spans[-1]["traceId"], trace_id)
+
+    def test_import_batches_and_span_limit(self):
+        path = self.enterContext(tempfile.NamedTemporaryFile("w", suffix=".csv"))
+        path.write("category_id|category_name|description\n1|Tea|\n2|Coffee|\n")
+        path.flush()
+        with self.settings(TRACE_SAMPLE_RATE=1, TRACE_FILE=self.trace_file):
+            call_command("populate_category", path.name, stdout=StringIO())
+            with self.settings(TRACE_MAX_SPANS=1):
+                call_command("populate_category", path.name, stdout=StringIO())
+        full, limited = self.traces()
+
+        root = full[-1]
+        self.assertEqual(root["name"], "import populate_category")
+        self.assertEqual(root["attributes"]["import.rows"], "2")
+        (batch,) = [s for s in full if s["name"] == "import batch"]
+        self.assertEqual(batch["parentSpanId"], root["spanId"])
+        self.assertEqual(batch["attributes"]["import.rows"], "2")
+        self.assertIn(batch["spanId"], {s.get("parentSpanId") for s in full})
+        self.assertEqual(len(limited), 2)
+        self.assertGreater(int(limited[-1]["attributes"]["tracing.dropped_spans"]), 0)
+
+    def test_spans_outside_traces_do_nothing(self):
+        with span("idle") as idle:
+            idle.set_attribute("key", "value")
+        self.assertIs(idle, NO_SPAN)
+
+
+class ReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tokyo, halifax = (
+            CustomerContact.objects.create(
+                customer_id=name[:3].upper(),
+                user=NorthWindUser.objects.create_user(
+                    f"{name}@example.com", "pw", timezone=tz
+                ),
+            )
+            for name, tz in (("tokyo", "Asia/Tokyo"), ("halifax", "America/Halifax"))
+        )
+        product = Product.objects.create(product_name="Tea", unit_price=Decimal("10.00"))
+        # Tokyo is UTC+9, Halifax UTC-4 in January.
+        for customer, utc in (
+            (tokyo, datetime(2024, 1, 1, 20, tzinfo=UTC)),  # Jan 2 Tokyo, Jan 1 Halifax
+            (halifax, datetime(2024, 1, 2, 2, tzinfo=UTC)),  # Jan 2 Tokyo, Jan 1 Halifax
+            (None, datetime(2024, 1, 2, 12, tzinfo=UTC)),  # Jan 2 everywhere
+        ):
+            order = Order.objects.create(customer=customer, orderdate=utc, freight=1)
+            OrderDetail.objects.create(
+                order=order, product=product, unit_price=Decimal("10.00"), quantity=2
+            )
+        cls.staff = NorthWindUser.objects.create_user(
+            "staff@example.com", "pw", is_staff=True, timezone="Asia/Tokyo"
+        )
+
+    def counts(self, rows):
+        return [(row["bucket"].date(), row["orders"]) for row in rows]
+
+    def test_orders_by_local_day(self):
+        days = date(2024, 1, 1), date(2024, 1, 3)
+        with CaptureQueriesContext(connection) as queries:
+            tokyo = order_totals("day", "Asia/Tokyo", *days)
+        (query,) = queries.captured_queries
+        self.assertIn("AT TIME ZONE", query["sql"])
+        self.assertEqual(self.counts(tokyo), [(date(2024, 1, 2), 3)])
+        self.assertEqual(tokyo[0]["bucket"].utcoffset(), timedelta(hours=9))
+        self.assertEqual(tokyo[0]["freight"], 3)
+        self.assertEqual(
+            self.counts(order_totals("day", "America/Halifax", *days)),
+            [(date(2024, 1, 1), 2), (date(2024, 1, 2), 1)],
+        )
+        # Bounds are local too: Jan 2 in Tokyo starts at 15:00 UTC on Jan 1.
+        self.assertEqual(
+            self.counts(order_totals("day", "UTC", date(2024, 1, 2), days[1])),
+            [(date(2024, 1, 2), 2)],
+        )
+        self.assertEqual(
+            self.counts(order_totals("month", "Asia/Tokyo", *days)), [(date(2024, 1, 1), 3)]
+        )
+
+    def test_customer_timezones(self):
+        rows = order_totals("day", CUSTOMER_TIMEZONE, date(2024, 1, 1), date(2024, 1, 3))
+        self.assertEqual(self.counts(rows), [(date(2024, 1, 1), 1), (date(2024, 1, 2), 2)])
+        self.assertIsNone(rows[0]["bucket"].tzinfo)
+        rows = order_totals("hour", CUSTOMER_TIMEZONE, date(2024, 1, 2), date(2024, 1, 3))
+        self.assertEqual(
+            [row["bucket"] for row in rows],
+            [datetime(2024, 1, 2, 5), datetime(2024, 1, 2, 12)],
+        )
+
+    def test_unknown_customer_timezones_count_as_utc(self):
+        # populate_users stores the CSV's timezone column unchecked.
+        NorthWindUser.objects.filter(timezone="Asia/Tokyo").update(
+            timezone="Mars/Olympus_Mons"
+        )
+        rows = order_totals("day", CUSTOMER_TIMEZONE, date(2024, 1, 1), date(2024, 1, 3))
+        self.assertEqual(self.counts(rows), [(date(2024, 1, 1), 2), (date(2024, 1, 2), 1)])
+        rows = sales_totals("day", CUSTOMER_TIMEZONE, date(2024, 1, 1), date(2024, 1, 3))
+        self.assertEqual([row["lines"] for row in rows], [2, 1])
+
+    def test_sales(self):
+        rows = sales_totals("week", "America/Halifax", date(2024, 1, 1), date(2024, 1, 8))
+        self.assertEqual(
+            [(row["bucket"].date(), row["revenue"], row["lines"]) for row in rows],
+            [(date(2024, 1, 1), Decimal("60"), 3)],
+        )
+        rows = sales_totals("day", CUSTOMER_TIMEZONE, date(2024, 1, 2), date(2024, 1, 3))
+        self.assertEqual([row["revenue"] for row in rows], [Decimal("40")])
+
+    def test_report_api(self):
+        url = reverse("northwind:order_report")
+        query = {"period": "day", "start": "2024-01-01", "end": "2024-01-03"}
+        self.assertEqual(self.client.get(url, query).status_code, 401)
+        # Defaults to the timezone stored in the session at login.
+        self.client.post(reverse("login"), {"username": "staff@example.com", "password": "pw"})
+        response = self.client.get(url, query)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["tz"], "Asia/Tokyo")
+        self.assertEqual(
+            body["buckets"],
+            [{"bucket": "2024-01-02T00:00:00+09:00", "orders": 3, "freight": "3.00"}],
+        )
+        response = self.client.get(url, {**query, "date": "shipped_date", "tz": "UTC"})
+        self.assertEqual(response.json()["buckets"], [])
+        response = self.client.get(reverse("northwind:sales_report"), {**query, "tz": "UTC"})
+        self.assertEqual(
+            [b["revenue"] for b in response.json()["buckets"]], ["20.0000", "40.0000"]
+        )
+        for bad in ({"period": "year"}, {"tz": "Mars/Olympus_Mons"}, {"end": "2023-12-31"}):
+            with self.subTest(bad=bad):
+                self.assertEqual(self.client.get(url, {**query, **bad}).status_code, 400)
+
+
+class IndexReportTests(TestCase):
+    def setUp(self):
+        # Never scanned, and a prefix of the second: both unused and redundant.
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE INDEX shipper_phone_test ON northwind_shipper (phone)")
+            cursor.execute(
+                "CREATE INDEX shipper_phone_name_test "
+                "ON northwind_shipper (phone, company_name)"
+            )
+
+    def report(self, *args):
+        out = StringIO()
+        call_command("db_index_report", "--min-rows=0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_text_report(self):
+        report = self.report()
+        headings = [
+            "Unused indexes (idx_scan = 0):",
+            "Duplicate / redundant indexes:",
+            "Tables read mostly by seq scan:",
+            "Candidate indexes for slow queries:",
+        ]
+        self.assertEqual(
+            [line for line in report.splitlines() if not line.startswith(" ")], headings
+        )
+        unused, duplicates = report.split(headings[1])
+        self.assertIn("  northwind_shipper.shipper_phone_test (phone) ", unused)
+        self.assertIn(
+            "  northwind_shipper.shipper_phone_test (phone) "
+            "covered by shipper_phone_name_test",
+            duplicates,
+        )
+        # Unique and primary key indexes are needed whether scanned or not.
+        self.assertNotIn("_pkey", report)
+
+    def test_json_report_and_draft_migration(self):
+        report = json.loads(self.report("--json"))
+        self.assertEqual(
+            set(report),
+            {"unused", "duplicates", "seq_scans", "candidates", "pg_stat_statements"},
+        )
+        self.assertIn("shipper_phone_test", {index["name"] for index in report["unused"]})
+        (duplicate,) = [i for i in report["duplicates"] if i["table"] == "northwind_shipper"]
+        self.assertEqual(
+            (duplicate["name"], duplicate["covered_by"]),
+            ("shipper_phone_test", "shipper_phone_name_test"),
+        )
+
+        # Indexes the models do not declare are left to the reviewer.
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.report("--emit-migration", str(directory))
+        (draft,) = directory.glob("northwind_*_index_report_draft.py")
+        self.assertIn("# TODO: Shipper: drop shipper_phone_test (phone)\n", draft.read_text())
+
+
+class InvalidationTests(TransactionTestCase):
+    def test_other_processes_are_notified_after_commit(self):
+        evicted = []
+        subscribe(Category, evicted.append)
+        self.addCleanup(unsubscribe, Category, evicted.append)
+        listener = Listener(timeout=0.05)
+        listener.start()
+        self.addCleanup(listener.join)
+        self.addCleanup(listener.stop)
+
+        # Wait for the listener's LISTEN, which clears every cache.
+        deadline = time.monotonic() + 5
+        while None not in evicted and time.monotonic() < deadline:
+            time.sleep(0.01)
+        evicted.clear()
+
+        category = Category.objects.create(category_name="Tea")
+        # Evicted in this process at once, then by the listener's notification.
+        deadline = time.monotonic() + 5
+        while evicted.count(category.pk) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(evicted, [category.pk] * 3)
+
+    def notifications(self, block):
+        with CaptureQueriesContext(connection) as queries:
+            block()
+        return [query["sql"] for query in queries if "pg_notify" in query["sql"]]
+
+    def test_one_notification_per_transaction_for_cached_models(self):
+        # A query cache that other processes share needs no notifications.
+        backend = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": self.enterContext(tempfile.TemporaryDirectory()),
+        }
+        self.enterContext(override_settings(CACHES={"default": backend}))
+        notifications = self.notifications
+        tea = Product.objects.create(product_name="Tea", unit_price=4, units_in_stock=5)
+        shipper = Shipper.objects.create(company_name="Speedy")
+        # Orders and stock are not cached in process.
+        self.assertEqual(
+            notifications(lambda: place_order([{"product_id": tea.pk, "quantity": 2}])), []
+        )
+
+        categories = []
+
+        @transaction.atomic
+        def write():
+            categories.append(Category.objects.create(category_name="Tea"))
+            categories.append(Category.objects.create(category_name="Coffee"))
+            Shipper.objects.filter(pk=shipper.pk).update(phone="555-0100")
+            Product.objects.filter(pk=tea.pk).update(units_in_stock=9)
+
+        [sql] = notifications(write)
+        message = {"northwind.category": [c.pk for c in categories], "northwind.shipper": None}
+        self.assertIn(json.dumps(message), sql)
+
+        created = []
+
+        def roll_back_then_write():
+            with self.assertRaises(ValueError), transaction.atomic():
+                Category.objects.create(category_name="Cocoa")
+                raise ValueError
+            created.extend(Shipper.objects.bulk_create([Shipper(company_name="Other")]))
+
+        [sql] = notifications(roll_back_then_write)
+        self.assertIn(json.dumps({"northwind.shipper": [created[0].pk]}), sql)
+
+    def test_per_process_query_cache_hears_every_model(self):
+        tea = Product.objects.create(product_name="Tea", unit_price=4, units_in_stock=5)
+        products = Product.objects.order_by("pk")
+        self.assertEqual(query_cache.cached(products), [tea])
+        orders = []
+        [sql] = self.notifications(
+            lambda: orders.append(place_order([{"product_id": tea.pk, "quantity": 2}]))
+        )
+        self.assertIn('"northwind.order": [%d]' % orders[0].pk, sql)
+        self.assertIn('"northwind.product": null', sql)
+
+        # Another process's write to products misses the cached rows here.
+        Product.objects.filter(pk=tea.pk).update(product_name="Green Tea")
+        self.assertEqual(query_cache.cached(products)[0].product_name, "Green Tea")
+        with self.assertNumQueries(0):
+            query_cache.cached(products)
+        Listener().dispatch(json.dumps({"northwind.product": [tea.pk]}))
+        with self.assertNumQueries(1):
+            query_cache.cached(products)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from northwind import views
+
+app_name = "northwind"
+
+urlpatterns = [
+    path("orders/", views.place_order_view, name="place_order"),
+    path("orders/bulk/", views.ingest_orders_view, name="ingest_orders"),
+    path("reports/orders/", views.order_report_view, name="order_report"),
+    path("reports/sales/", views.sales_report_view, name="sales_report"),
+]
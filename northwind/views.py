@@ -1,3 +1,184 @@
-from django.shortcuts import render
+import datetime
+import json
 
-# Create your views here.
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET, require_POST
+
+from northwind.reports import CUSTOMER_TIMEZONE, PERIODS, order_totals, sales_totals
+from northwind.services import InsufficientStock, ingest_orders, place_order
+from user_accounts.timezones import is_valid_timezone
+
+# Upper bound on orders per ingestion request, to bound transaction size.
+MAX_INGEST_BATCH = 1000
+
+# Longest range of an hourly report, to bound the rows returned.
+MAX_HOURLY_REPORT_DAYS = 92
+
+ORDER_FIELDS = (
+    "employee_id",
+    "ship_via_id",
+    "freight",
+    "ship_name",
+    "ship_address",
+    "ship_city",
+    "ship_region",
+    "ship_postal_code",
+    "ship_country",
+)
+
+
+def _json_object(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+# Line fields only staff may set; customers pay the product's current price.
+STAFF_LINE_FIELDS = ("unit_price", "discount")
+
+
+def _order_lines(payload, user):
+    lines = payload.get("lines") or []
+    if not user.is_staff and isinstance(lines, list):
+        for line in lines:
+            if isinstance(line, dict) and any(name in line for name in STAFF_LINE_FIELDS):
+                raise ValidationError("Only staff can set unit_price or discount.")
+    return lines
+
+
+def _order_fields(payload, user):
+    fields = {name: payload[name] for name in ORDER_FIELDS if name in payload}
+    if payload.get("required_date"):
+        fields["required_date"] = parse_datetime(payload["required_date"])
+        if fields["required_date"] is None:
+            raise ValidationError("required_date must be an ISO 8601 datetime.")
+    if user.is_staff:
+        fields["customer_id"] = payload.get("customer_id")
+    else:
+        # Customers always order for themselves.
+        try:
+            fields["customer_id"] = user.customercontact.pk
+        except ObjectDoesNotExist:
+            raise ValidationError("Only customers and staff can place orders.")
+    return fields
+
+
+@require_POST
+def place_order_view(request):
+    """
+    Place one order from a JSON body: order fields plus
+    ``lines: [{"product_id", "quantity", "discount"?, "unit_price"?}]``.
+    Only staff may set discount and unit_price.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    payload = _json_object(request)
+    if payload is None:
+        return JsonResponse({"error": "Expected a JSON object."}, status=400)
+    try:
+        lines = _order_lines(payload, request.user)
+        order = place_order(lines, **_order_fields(payload, request.user))
+    except ValidationError as e:
+        return JsonResponse({"errors": e.messages}, status=400)
+    except InsufficientStock as e:
+        return JsonResponse(
+            {"error": str(e), "product_id": e.product_id, "quantity": e.quantity},
+            status=409,
+        )
+    return JsonResponse(
+        {"order_id": order.order_id, "orderdate": order.orderdate.isoformat()}, status=201
+    )
+
+
+@require_POST
+def ingest_orders_view(request):
+    """
+    Ingest a batch of orders from a JSON body ``{"orders": [...]}``; each
+    order carries an ``idempotency_key`` so retried batches are safe.
+    Staff only. Responds with one result per order (see ingest_orders).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required."}, status=403)
+    payload = _json_object(request)
+    orders = payload.get("orders") if payload else None
+    if not isinstance(orders, list):
+        return JsonResponse({"error": 'Expected {"orders": [...]}.'}, status=400)
+    if len(orders) > MAX_INGEST_BATCH:
+        return JsonResponse(
+            {"error": f"At most {MAX_INGEST_BATCH} orders per request."}, status=400
+        )
+    return JsonResponse({"results": ingest_orders(orders)})
+
+
+def _report_options(request, date_fields=()):
+    """
+    Keyword arguments of northwind.reports functions from a report request's
+    query string; ``date_fields`` are the columns it may choose with ``date``
+    (the first is the default). Raises ValidationError.
+    """
+    params = request.GET
+    options = {"period": params.get("period", "day")}
+    if options["period"] not in PERIODS:
+        raise ValidationError(f"period must be one of {', '.join(PERIODS)}.")
+    try:
+        options["start"] = datetime.date.fromisoformat(params.get("start", ""))
+        options["end"] = datetime.date.fromisoformat(params.get("end", ""))
+    except ValueError:
+        raise ValidationError("start and end must be ISO 8601 dates.")
+    days = (options["end"] - options["start"]).days
+    if days < 1:
+        raise ValidationError("end must be after start.")
+    if options["period"] == "hour" and days > MAX_HOURLY_REPORT_DAYS:
+        raise ValidationError(f"Hourly reports cover at most {MAX_HOURLY_REPORT_DAYS} days.")
+    # By default the requesting user's timezone, activated by TimezoneMiddleware.
+    options["tz"] = params.get("tz") or timezone.get_current_timezone_name()
+    if options["tz"] != CUSTOMER_TIMEZONE and not is_valid_timezone(options["tz"]):
+        raise ValidationError(f"Unknown timezone: {options['tz']}.")
+    if date_fields:
+        options["date_field"] = params.get("date", date_fields[0])
+        if options["date_field"] not in date_fields:
+            raise ValidationError(f"date must be one of {', '.join(date_fields)}.")
+    return options
+
+
+@require_GET
+def order_report_view(request):
+    """
+    Orders and freight per hour, day, week or month of local time, e.g.
+    ``?period=day&start=2024-01-01&end=2024-02-01``. Optional ``tz`` (a
+    timezone name or "customer"; default the user's timezone) and ``date``
+    (orderdate or shipped_date). Staff only.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required."}, status=403)
+    try:
+        options = _report_options(request, date_fields=("orderdate", "shipped_date"))
+    except ValidationError as e:
+        return JsonResponse({"errors": e.messages}, status=400)
+    return JsonResponse({**options, "buckets": order_totals(**options)})
+
+
+@require_GET
+def sales_report_view(request):
+    """
+    Revenue and order lines per period of order date; the options of
+    order_report_view except ``date``. Staff only.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required."}, status=403)
+    try:
+        options = _report_options(request)
+    except ValidationError as e:
+        return JsonResponse({"errors": e.messages}, status=400)
+    return JsonResponse({**options, "buckets": sales_totals(**options)})
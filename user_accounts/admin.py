@@ -9,6 +9,7 @@ from .models import (
     Region,
     Territory,
 )
+from .timezones import remember_timezone
 
 
 @admin.register(NorthWindUser)
@@ -40,6 +41,12 @@ class NorthWindUserAdmin(admin.ModelAdmin):
     raw_id_fields = ("groups", "user_permissions")
     date_hierarchy = "created_at"
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.pk == request.user.pk:
+            # TimezoneMiddleware reads the session, otherwise set at login only.
+            remember_timezone(request, obj)
+
 
 @admin.register(Region)
 class RegionAdmin(admin.ModelAdmin):
@@ -63,6 +70,7 @@ class TerritoryAdmin(admin.ModelAdmin):
         "region",
     )
     list_filter = ("created_at", "updated_at", "region")
+    list_select_related = ("region",)
     date_hierarchy = "created_at"
 
 
@@ -115,6 +123,7 @@ class EmployeeAdmin(admin.ModelAdmin):
         "hire_date",
         "reports_to",
     )
+    list_select_related = ("user", "reports_to__user")
     raw_id_fields = ("territories",)
     date_hierarchy = "created_at"
 
@@ -129,4 +138,5 @@ class EmployeeTerritoryAdmin(admin.ModelAdmin):
         "updated_at",
     )
     list_filter = ("created_at", "employee", "territory", "updated_at")
+    list_select_related = ("employee__user", "territory__region")
     date_hierarchy = "created_at"
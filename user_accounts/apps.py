@@ -1,6 +1,11 @@
 from django.apps import AppConfig
 
+from _config.invalidation import connect_signals
+
 
 class UserAccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user_accounts"
+
+    def ready(self):
+        connect_signals(self)
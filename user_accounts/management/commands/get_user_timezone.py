@@ -2,10 +2,6 @@ from pathlib import Path
 
 import djclick as click
 from django.conf import settings
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-
-geolocator = Nominatim(user_agent="geo_test")
 
 
 @click.command()
@@ -14,6 +10,12 @@ geolocator = Nominatim(user_agent="geo_test")
 )
 def command(file):
     timezones = []
+    # Slow to import and set up: only when the command runs, not for --help.
+    from geopy.geocoders import Nominatim
+    from timezonefinder import TimezoneFinder
+
+    geolocator = Nominatim(user_agent="geo_test")
+    tf = TimezoneFinder()  # loads its data once, not per row
     file_path = Path(settings.BASE_DIR) / file
 
     with open(file_path, "r") as infile:
@@ -25,7 +27,6 @@ def command(file):
 
             location = geolocator.geocode(city_country, timeout=10)
             if location:
-                tf = TimezoneFinder()
                 customer_time_zone = tf.timezone_at(
                     lat=location.latitude, lng=location.longitude
                 )
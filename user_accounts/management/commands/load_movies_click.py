@@ -3,7 +3,6 @@ from pathlib import Path
 
 import djclick as click
 from django.conf import settings
-from movies.utils import clear_movie_data, load_movies_from_data
 
 
 @click.command()
@@ -12,6 +11,11 @@ from movies.utils import clear_movie_data, load_movies_from_data
 @click.argument("count", type=int, required=False)
 def command(file, clear, count):
     """Load movies data from JSON file into the database."""
+    # The movies app is not part of this project; fail when run, not when loaded.
+    try:
+        from movies.utils import clear_movie_data, load_movies_from_data
+    except ImportError as e:
+        raise click.ClickException(f"load_movies_click needs the movies app: {e}")
 
     if clear:
         click.secho("Clearing existing movie data...", fg="yellow")
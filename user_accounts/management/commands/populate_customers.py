@@ -3,6 +3,7 @@ import csv
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from _config.metrics import import_job
 from user_accounts.models import CustomerContact, NorthWindUser
 
 
@@ -19,9 +20,12 @@ class Command(BaseCommand):
     @transaction.atomic
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs["csv_file_path"]
-        with open(csv_file_path, mode="r", newline="", encoding="utf-8") as infile:
+        with (
+            open(csv_file_path, mode="r", newline="", encoding="utf-8") as infile,
+            import_job("populate_customers") as job,
+        ):
             reader = csv.DictReader(infile)
-            for row in reader:
+            for row in job.rows_from(reader):
                 customer_id = row["customer_id"]
                 user_id = row["user_id"]
                 # Retrieve the associated user
@@ -33,6 +37,7 @@ class Command(BaseCommand):
                             f"User with id {user_id} does not exist. Skipping customer_id {customer_id}."
                         )
                     )
+                    job.error("user not found")
                     continue
 
                 # Create or update CustomerContact
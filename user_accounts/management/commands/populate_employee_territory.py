@@ -3,6 +3,8 @@ import csv
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from _config.metrics import import_job
+from _config.reference_cache import reference_cache
 from user_accounts.models import Employee, EmployeeTerritory, Territory
 
 
@@ -19,9 +21,12 @@ class Command(BaseCommand):
     @transaction.atomic
     def handle(self, *args, **kwargs):
         csv_file_path = kwargs["csv_file_path"]
-        with open(csv_file_path, mode="r", newline="", encoding="utf-8") as infile:
+        with (
+            open(csv_file_path, mode="r", newline="", encoding="utf-8") as infile,
+            import_job("populate_employee_territory") as job,
+        ):
             reader = csv.DictReader(infile)
-            for row in reader:
+            for row in job.rows_from(reader):
                 employee_id = row["employee_id"]
                 territory_id = row["territory_id"]
 
@@ -34,17 +39,19 @@ class Command(BaseCommand):
                             f"Employee with id {employee_id} does not exist. Skipping."
                         )
                     )
+                    job.error("employee not found")
                     continue
 
                 # Fetch Territory
                 try:
-                    territory = Territory.objects.get(pk=territory_id)
+                    territory = reference_cache(Territory).get_by_id(territory_id)
                 except Territory.DoesNotExist:
                     self.stdout.write(
                         self.style.WARNING(
                             f"Territory with id {territory_id} does not exist. Skipping."
                         )
                     )
+                    job.error("territory not found")
                     continue
 
                 # Create EmployeeTerritory
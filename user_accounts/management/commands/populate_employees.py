@@ -1,7 +1,10 @@
 import csv
 from datetime import datetime
+
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+
+from _config.metrics import import_job
 from user_accounts.models import Employee, NorthWindUser
 
 
@@ -20,11 +23,14 @@ class Command(BaseCommand):
         csv_file = options["csv_file"]
 
         try:
-            with open(csv_file, newline="", encoding="utf-8") as f:
+            with (
+                open(csv_file, newline="", encoding="utf-8") as f,
+                import_job("populate_employees") as job,
+            ):
                 reader = csv.DictReader(f, delimiter="|")
                 employees = []
 
-                for row in reader:
+                for row in job.rows_from(reader):
                     try:
                         user = NorthWindUser.objects.get(id=row["user_id"])
                     except NorthWindUser.DoesNotExist:
@@ -33,6 +39,7 @@ class Command(BaseCommand):
                                 f"⚠️ Skipping employee {row['employee_id']}: User {row['user_id']} not found"
                             )
                         )
+                        job.error("user not found")
                         continue
 
                     dob = self.parse_date(row.get("dob"))
@@ -58,7 +65,8 @@ class Command(BaseCommand):
                     employees.append((employee, row.get("reports_to_id")))
 
                 # Bulk create all employees without reports_to first
-                Employee.objects.bulk_create([e for e, _ in employees])
+                with job.batch(len(employees)):
+                    Employee.objects.bulk_create([e for e, _ in employees])
 
                 # Set reports_to relationships after employees exist
                 for e, reports_to_id in employees:
@@ -74,6 +82,7 @@ class Command(BaseCommand):
                                     f"⚠️ Employee {e.employee_id}: reports_to {reports_to_id} not found"
                                 )
                             )
+                            job.error("reports_to not found")
 
                 self.stdout.write(
                     self.style.SUCCESS(
@@ -3,6 +3,7 @@ import os
 
 from django.core.management.base import BaseCommand, CommandError
 
+from _config.metrics import import_job
 from user_accounts.models import Region
 
 
@@ -21,9 +22,12 @@ class Command(BaseCommand):
             raise CommandError(f"File not found: {csv_path}")
 
         try:
-            with open(csv_path, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_path, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_regions") as job,
+            ):
                 reader = csv.DictReader(csvfile)
-                for row in reader:
+                for row in job.rows_from(reader):
                     region_description = row.get("region_description") or row.get(
                         "Region Description"
                     )
@@ -46,6 +50,7 @@ class Command(BaseCommand):
                         self.stdout.write(
                             self.style.WARNING("Missing 'region_description' in row")
                         )
+                        job.error("missing region_description")
         except Exception as e:
             raise CommandError(f"Error processing CSV: {e}")
 
@@ -3,6 +3,8 @@ import os
 
 from django.core.management.base import BaseCommand, CommandError
 
+from _config.metrics import import_job
+from _config.reference_cache import reference_cache
 from user_accounts.models import Region, Territory
 
 
@@ -21,9 +23,12 @@ class Command(BaseCommand):
             raise CommandError(f"File not found: {csv_path}")
 
         try:
-            with open(csv_path, newline="", encoding="utf-8") as csvfile:
+            with (
+                open(csv_path, newline="", encoding="utf-8") as csvfile,
+                import_job("populate_territories") as job,
+            ):
                 reader = csv.DictReader(csvfile)
-                for row in reader:
+                for row in job.rows_from(reader):
                     territory_id = row.get("territory_id")
                     territory_description = row.get("territory_description")
                     region_id = row.get("region_id")  # or 'region_id' based on your CSV
@@ -34,17 +39,19 @@ class Command(BaseCommand):
                                 f"Skipping row due to missing data: {row}"
                             )
                         )
+                        job.error("missing data")
                         continue
 
-                    # Find the Region instance by description
+                    # Find the Region instance by id
                     try:
-                        region = Region.objects.get(region_id=region_id.strip())
+                        region = reference_cache(Region).get_by_id(region_id.strip())
                     except Region.DoesNotExist:
                         self.stdout.write(
                             self.style.WARNING(
-                                f"Region not found for description '{region_desc}', skipping territory '{territory_id}'"
+                                f"Region not found for id '{region_id}', skipping territory '{territory_id}'"
                             )
                         )
+                        job.error("region not found")
                         continue
 
                     # Create or update the Territory
@@ -52,7 +59,7 @@ class Command(BaseCommand):
                         territory_id=territory_id.strip(),
                         defaults={
                             "territory_description": territory_description.strip(),
-                            "region_id": region_id,
+                            "region": region,
                         },
                     )
                     if created:
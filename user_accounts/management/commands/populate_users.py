@@ -8,6 +8,8 @@ from django.db import transaction
 from django.utils.timezone import make_aware
 from djclick import command
 
+from _config.metrics import import_job
+
 User = get_user_model()
 
 
@@ -21,22 +23,27 @@ def command(csv_file):
         python manage.py import_users populate_users.csv
     """
 
-    with open(csv_file, newline="", encoding="latin1") as f:
+    with (
+        open(csv_file, newline="", encoding="latin1") as f,
+        import_job("populate_users") as job,
+    ):
         reader = csv.DictReader(f)
         users = []
         created_count = 0
         skipped_count = 0
 
         with transaction.atomic():
-            for row in reader:
+            for row in job.rows_from(reader):
                 email = row.get("email")
                 if not email:
                     skipped_count += 1
+                    job.error("missing email")
                     continue
 
                 # Avoid duplicate imports
                 if User.objects.filter(email=email).exists():
                     skipped_count += 1
+                    job.error("duplicate email")
                     continue
 
                 user = User(
@@ -57,7 +64,8 @@ def command(csv_file):
                 users.append(user)
                 created_count += 1
 
-            User.objects.bulk_create(users)
+            with job.batch(len(users)):
+                User.objects.bulk_create(users)
 
         click.echo(f"✅ Imported {created_count} users, skipped {skipped_count}.")
 
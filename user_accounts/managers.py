@@ -1,8 +1,10 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
+from _config.helpers import TimeStampedQuerySet
 
-class CustomUserManager(BaseUserManager):
+
+class CustomUserManager(BaseUserManager.from_queryset(TimeStampedQuerySet)):
     """
     Custom user model manager where email is the unique identifiers
     for authentication instead of usernames.
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:14
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user_accounts', '0002_remove_northwinduser_custom_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='northwinduser',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='user_created_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='northwinduser',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['updated_at'], name='user_updated_brin'),
+        ),
+    ]
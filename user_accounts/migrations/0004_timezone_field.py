@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:37
+
+import user_accounts.models
+import user_accounts.timezones
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_accounts', '0003_timestamp_brin_and_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='northwinduser',
+            name='timezone',
+            field=user_accounts.timezones.TimeZoneField(choices=user_accounts.models.get_timezone_choices, default='UTC', max_length=50, verbose_name='Timezone'),
+        ),
+    ]
@@ -1,20 +1,19 @@
-import zoneinfo
-
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from _config.helpers import TimeStampedModel
+from _config.helpers import TimeStampedModel, timestamp_brin_indexes
 
 from .managers import CustomUserManager
+from .timezones import TimeZoneField, timezone_choices
 
 
 def get_timezone_choices():
     """
-    Get dynamic timezone choices from available timezones.
+    Get dynamic timezone choices from available timezones, grouped by area.
     Using a function ensures no new migrations are needed when timezone list changes.
     """
-    return [(tz, tz) for tz in sorted(zoneinfo.available_timezones())]
+    return timezone_choices()
 
 
 class NorthWindUser(AbstractUser, TimeStampedModel):
@@ -30,7 +29,7 @@ class NorthWindUser(AbstractUser, TimeStampedModel):
         default=UserType.CUSTOMER,
     )
     email = models.EmailField(_("email address"), unique=True)
-    timezone = models.CharField(
+    timezone = TimeZoneField(
         _("Timezone"),
         max_length=50,
         choices=get_timezone_choices,
@@ -48,6 +47,7 @@ class NorthWindUser(AbstractUser, TimeStampedModel):
         ordering = ["last_name", "first_name"]
         indexes = [
             models.Index(fields=["last_name", "first_name"]),
+            *timestamp_brin_indexes("user"),
         ]
 
 
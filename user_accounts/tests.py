@@ -1,3 +1,126 @@
-from django.test import TestCase
+from django.contrib.admin import site
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from _config.budgets import BudgetTestMixin
+from user_accounts.models import (
+    CustomerContact,
+    Employee,
+    EmployeeTerritory,
+    NorthWindUser,
+    Region,
+    Territory,
+    get_timezone_choices,
+)
+from user_accounts.timezones import SESSION_KEY, TimezoneMiddleware
+
+
+# Primary only: a replica's test mirror cannot see uncommitted rows. No
+# sampling or N+1 checks, whose stack walks would add to the timings.
+@override_settings(DATABASE_PIN="primary", SQL_PROFILE_SAMPLE_RATE=0, NPLUSONE_DETECTION="")
+class PerformanceTests(BudgetTestMixin, TestCase):
+    """Query and latency budgets (perf_baseline.json) on fixed-size data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        regions = [Region.objects.create(region_description=f"Region {n}") for n in range(4)]
+        territories = [
+            Territory.objects.create(
+                territory_id=f"T{n:03}",
+                territory_description=f"Territory {n}",
+                region=regions[n % 4],
+            )
+            for n in range(20)
+        ]
+        manager = None
+        for n in range(20):
+            user = NorthWindUser.objects.create_user(f"employee{n}@example.com", "pw")
+            employee = Employee.objects.create(user=user, reports_to=manager)
+            manager = manager or employee
+            for territory in territories[n::10]:
+                EmployeeTerritory.objects.create(employee=employee, territory=territory)
+        for n in range(20):
+            CustomerContact.objects.create(
+                customer_id=f"C{n:03}",
+                user=NorthWindUser.objects.create_user(f"customer{n}@example.com", "pw"),
+                company_name=f"Customer {n}",
+            )
+        cls.admin = NorthWindUser.objects.create_superuser("admin@example.com", "pw")
+
+    def test_login_flow(self):
+        url = reverse("login")
+
+        def log_in():
+            self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.post(
+                url, {"username": "admin@example.com", "password": "pw"}
+            )
+            self.assertEqual(response.status_code, 302)
+            self.client.logout()
+
+        self.assertWithinBudget("auth.login", log_in)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for model in ("employee", "employeeterritory", "customercontact", "territory"):
+            with self.subTest(model=model):
+                url = reverse(f"admin:user_accounts_{model}_changelist")
+                self.assertWithinBudget(f"admin.{model}.changelist", self.client.get, url)
+
+
+class TimezoneTests(TestCase):
+    def test_choices_are_grouped_and_built_once(self):
+        choices = get_timezone_choices()
+        self.assertIs(choices, get_timezone_choices())
+        self.assertEqual(choices[0], ("UTC", "UTC"))
+        groups = dict(choices[1:])
+        self.assertIn(("America/Halifax", "America/Halifax"), groups["America"])
+        field = NorthWindUser._meta.get_field("timezone")
+        self.assertIn(("Europe/Paris", "Europe/Paris"), field.flatchoices)
+
+    def test_validation(self):
+        user = NorthWindUser(email="tz@example.com", password="x", timezone="Asia/Tokyo")
+        user.full_clean()
+        self.assertEqual(user.get_timezone_display(), "Asia/Tokyo")
+        user.timezone = "Mars/Olympus_Mons"
+        with self.assertRaisesMessage(ValidationError, "is not a valid choice"):
+            user.full_clean()
+
+    def test_login_stores_timezone_in_session(self):
+        NorthWindUser.objects.create_user("tz@example.com", "pw", timezone="Asia/Tokyo")
+        self.client.post(reverse("login"), {"username": "tz@example.com", "password": "pw"})
+        self.assertEqual(self.client.session[SESSION_KEY], "Asia/Tokyo")
+
+    def test_saving_own_timezone_updates_the_session(self):
+        user, other = (
+            NorthWindUser.objects.create_user(email, "pw", timezone="Asia/Tokyo")
+            for email in ("tz@example.com", "other@example.com")
+        )
+        request = RequestFactory().post("/")
+        request.user, request.session = user, {SESSION_KEY: "Asia/Tokyo"}
+        admin = site._registry[NorthWindUser]
+        other.timezone = "Europe/Paris"
+        admin.save_model(request, other, None, change=True)
+        self.assertEqual(request.session[SESSION_KEY], "Asia/Tokyo")
+        user.timezone = "America/Halifax"
+        admin.save_model(request, user, None, change=True)
+        self.assertEqual(request.session[SESSION_KEY], "America/Halifax")
+
+    def test_middleware_activates_session_timezone(self):
+        seen = []
+
+        def view(request):
+            seen.append(timezone.get_current_timezone_name())
+            return HttpResponse()
+
+        middleware = TimezoneMiddleware(view)
+        for stored in ("America/Halifax", "Mars/Olympus_Mons", None):
+            request = RequestFactory().get("/")
+            request.session = {SESSION_KEY: stored} if stored else {}
+            with self.assertNumQueries(0):
+                middleware(request)
+        self.assertEqual(seen, ["America/Halifax", "UTC", "UTC"])
+        self.assertEqual(timezone.get_current_timezone_name(), "UTC")
@@ -0,0 +1,129 @@
+# user_accounts/timezones.py
+"""
+Timezone registry and per-user timezone activation.
+
+``zoneinfo.available_timezones()`` walks the tz database on every call
+(milliseconds), so the names, the grouped form choices built from them
+and the ``ZoneInfo`` objects are computed once per process.
+``TimeZoneField`` validates and displays values with them instead of
+re-reading its choices, which Django normalizes again on every use.
+
+``TimezoneMiddleware`` activates the timezone stored in the session at
+login, so templates and forms show local times without loading the user
+on every request. A user who changes their own timezone in the admin gets
+it in that session at once; their other sessions get it at their next
+login. Sessions without one (anonymous, or from before the middleware)
+use ``settings.TIME_ZONE``.
+"""
+
+import functools
+import zoneinfo
+from itertools import groupby
+
+from django.contrib.auth.signals import user_logged_in
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.fields import BLANK_CHOICE_DASH
+from django.utils import timezone
+
+SESSION_KEY = "_timezone"
+DEFAULT = "UTC"
+
+
+@functools.cache
+def timezone_names():
+    """Every IANA timezone name this system knows."""
+    return frozenset(zoneinfo.available_timezones())
+
+
+def is_valid_timezone(name):
+    return name in timezone_names()
+
+
+@functools.cache
+def timezone_choices():
+    """
+    Choices for a timezone field: UTC first, then the names grouped by
+    area (``Africa``, ``America``, ...), then names without an area.
+    """
+    names = sorted(timezone_names() - {DEFAULT})
+    areas = [name for name in names if "/" in name]
+    other = [(name, name) for name in names if "/" not in name]
+    grouped = [
+        (area, [(name, name) for name in members])
+        for area, members in groupby(areas, key=lambda name: name.split("/", 1)[0])
+    ]
+    return [(DEFAULT, DEFAULT), *grouped, ("Other", other)]
+
+
+@functools.cache
+def flat_timezone_choices():
+    return [(name, name) for name in sorted(timezone_names())]
+
+
+@functools.cache
+def get_timezone(name):
+    """``ZoneInfo`` of ``name``; raises ``ValueError`` for unknown names."""
+    if not is_valid_timezone(name):
+        raise ValueError(f"Unknown timezone: {name!r}")
+    return zoneinfo.ZoneInfo(name)
+
+
+class TimeZoneField(models.CharField):
+    """
+    A CharField of timezone names whose choices are ``timezone_choices()``
+    (pass them as a callable, so tz database updates need no migration).
+    """
+
+    @property
+    def flatchoices(self):
+        return flat_timezone_choices()
+
+    def get_choices(self, include_blank=True, blank_choice=BLANK_CHOICE_DASH, **kwargs):
+        return (list(blank_choice) if include_blank else []) + timezone_choices()
+
+    def validate(self, value, model_instance):
+        # Field.validate, with a set lookup for the choices check.
+        if not self.editable:
+            return
+        if value not in self.empty_values and not is_valid_timezone(value):
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        if value is None and not self.null:
+            raise ValidationError(self.error_messages["null"], code="null")
+        if not self.blank and value in self.empty_values:
+            raise ValidationError(self.error_messages["blank"], code="blank")
+
+
+def remember_timezone(request, user):
+    """Store ``user``'s timezone in the session, for TimezoneMiddleware."""
+    if hasattr(request, "session"):
+        request.session[SESSION_KEY] = user.timezone
+
+
+def _on_login(sender, request, user, **kwargs):
+    remember_timezone(request, user)
+
+
+user_logged_in.connect(_on_login, dispatch_uid="user_accounts.timezones")
+
+
+class TimezoneMiddleware:
+    """Place after SessionMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        name = request.session.get(SESSION_KEY)
+        if name and is_valid_timezone(name):
+            timezone.activate(get_timezone(name))
+        else:
+            timezone.deactivate()
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()